@@ -0,0 +1,27 @@
+from . import bench_compression
+from . import bench_end_to_end
+from . import bench_formatters
+from . import bench_get_logger
+from . import bench_import
+from . import bench_logstash_handler
+from . import bench_serializers
+from . import bench_stackdriver_handler
+from . import bench_timestamps
+
+
+BENCHMARKS = [
+    bench_formatters,
+    bench_serializers,
+    bench_timestamps,
+    bench_get_logger,
+    bench_import,
+    bench_logstash_handler,
+    bench_stackdriver_handler,
+    bench_end_to_end,
+    bench_compression,
+]
+
+
+for benchmark in BENCHMARKS:
+    benchmark.main()
+    print()
@@ -0,0 +1,66 @@
+"""
+Compare CPU cost and bytes saved by compressing Logstash batches, on a
+batch of records as produced by LogstashFormatter.
+"""
+from temlogger.compression import COMPRESSORS
+from temlogger.providers.logstash import LogstashFormatter
+
+from .common import make_record
+from .common import measure
+
+
+ITERATIONS = 200
+BATCH_RECORDS = 100
+LEVELS = {
+    'gzip': [1, 6, 9],
+    'zstd': [1, 3, 9],
+}
+
+
+def make_records():
+    return [
+        make_record(
+            'Trip %d finished' % index,
+            user_id=index,
+            trip_id='b7a1c0de%04d' % index,
+            path='/v1/trips/%d' % index,
+            duration=12.5 + index,
+        )
+        for index in range(BATCH_RECORDS)
+    ]
+
+
+def format_batch(formatter, records):
+    return b''.join(
+        formatter.format(record).encode('utf-8') + b'\n'
+        for record in records
+    )
+
+
+def main():
+    formatter = LogstashFormatter(app_name='bench', environment='production')
+    records = make_records()
+    batch = format_batch(formatter, records)
+
+    print('Compression of a %d records batch (%d bytes)' % (
+        BATCH_RECORDS, len(batch)))
+    rate = measure(lambda: format_batch(formatter, records), ITERATIONS)
+    print('  formatting the batch  %8.1f us/batch (for reference)' % (
+        1e6 / rate))
+
+    for name, compressor_class in COMPRESSORS.items():
+        for level in LEVELS[name]:
+            try:
+                compressor = compressor_class(level)
+            except ImportError:
+                print('  %s: not installed' % name)
+                break
+
+            size = len(compressor.compress(batch))
+            rate = measure(lambda: compressor.compress(batch), ITERATIONS)
+            print('  %s level %d  %8.1f us/batch  %6d bytes  %5.1f%% saved' % (
+                name, level, 1e6 / rate, size, 100.0 * (1 - size / len(batch))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+End-to-end cost of temlogger.getLogger().info() with the logstash provider
+writing to a local TCP sink standing in for Logstash.
+"""
+import temlogger
+
+from temlogger.tests.base import TCPSink
+
+from .common import measure
+from .common import report
+
+
+ITERATIONS = 20000
+
+
+def run(sink, label, **settings):
+    temlogger.config.reset()
+    temlogger.config.set_provider('logstash')
+    temlogger.config.set_url(sink.host)
+    temlogger.config.set_port(sink.port)
+    temlogger.config.set_app_name('bench')
+    temlogger.config.set_environment('bench')
+    for name, value in settings.items():
+        getattr(temlogger.config, 'set_' + name)(value)
+
+    logger = temlogger.getLogger('benchmark-%s' % label)
+
+    def log():
+        logger.info('Benchmark message', extra={'user_id': 42})
+
+    rate = measure(log, ITERATIONS)
+    temlogger.flush()
+    return label, rate, 'records/s'
+
+
+def main():
+    sink = TCPSink()
+
+    report('getLogger().info() to a local TCP sink', [
+        run(sink, 'direct'),
+        run(sink, 'batched', batch_max_records=100),
+        run(sink, 'queue', delivery_mode='queue', batch_max_records=100),
+    ])
+
+    sink.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Per-record cost of every provider formatter, varying the number of extra
+fields and event handlers, with and without an exception.
+"""
+import sys
+
+from temlogger.providers.base import FormatterBase
+from temlogger.providers.console import ConsoleFormatter
+from temlogger.providers.default import DefaultFormatter
+from temlogger.providers.logstash import LogstashFormatter
+from temlogger.providers.stackdriver import StackDriverFormatter
+from temlogger.serializers import SERIALIZERS
+
+from .common import make_record
+from .common import measure
+from .common import measure_allocations
+from .common import report
+
+
+ITERATIONS = 10000
+
+FORMATTERS = [
+    DefaultFormatter,
+    ConsoleFormatter,
+    LogstashFormatter,
+    StackDriverFormatter,
+]
+
+
+def make_event_handler(index):
+    key = 'handler_%d' % index
+
+    def handler(message):
+        message[key] = index
+        return message
+
+    return handler
+
+
+def make_extra(count):
+    return {'extra_%d' % index: 'value %d' % index for index in range(count)}
+
+
+def exception_info():
+    try:
+        raise ValueError('Benchmark exception')
+    except ValueError:
+        return sys.exc_info()
+
+
+def scenarios():
+    yield 'no extras', {}, 0
+    yield '10 extras', make_extra(10), 0
+    yield '50 extras', make_extra(50), 0
+    yield '5 event handlers', {}, 5
+    yield '20 event handlers', {}, 20
+    yield 'exception', {'exc_info': exception_info()}, 0
+
+
+def main():
+    for formatter_class in FORMATTERS:
+        rows = []
+        for label, extra, handler_count in scenarios():
+            formatter = formatter_class(
+                app_name='bench',
+                environment='bench',
+                event_handlers=[make_event_handler(i) for i in range(handler_count)]
+            )
+            record = make_record(**extra)
+
+            def format_record():
+                formatter.format(record)
+
+            rows.append((label, measure(format_record, ITERATIONS), 'records/s'))
+            allocated = measure_allocations(format_record)
+            if allocated is not None:
+                rows.append((label, allocated / 1024, 'KiB peak/record'))
+
+        report(formatter_class.__name__, rows)
+
+    compare_static_envelope()
+
+
+def compare_static_envelope():
+    """
+    Splicing the pre-serialized static envelope versus serializing the
+    whole message, for every installed serializer.
+    """
+    record = make_record(**make_extra(10))
+    rows = []
+    for name in SERIALIZERS:
+        try:
+            formatter = LogstashFormatter(
+                app_name='bench', environment='bench', serializer=name)
+        except ImportError:
+            continue
+
+        def spliced():
+            formatter.format_json(record)
+
+        def whole():
+            formatter.serialize(FormatterBase.format(formatter, record))
+
+        rows.append(('%s spliced envelope' % name,
+                     measure(spliced, ITERATIONS), 'records/s'))
+        rows.append(('%s whole message' % name,
+                     measure(whole, ITERATIONS), 'records/s'))
+
+    report('Static envelope', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Measure temlogger.getLogger() for a logger that is already configured, with
+the provider set programmatically and through TEMLOGGER_PROVIDER.
+"""
+import os
+
+import temlogger
+
+from .common import measure
+from .common import report
+
+
+ITERATIONS = 200000
+
+
+def get_logger():
+    temlogger.getLogger('benchmark')
+
+
+def main():
+    rows = []
+
+    temlogger.config.set_provider('console')
+    get_logger()
+    rows.append(('provider set by config', measure(get_logger, ITERATIONS), 'calls/s'))
+
+    temlogger.config.reset()
+    os.environ['TEMLOGGER_PROVIDER'] = 'console'
+    get_logger()
+    rows.append(('provider set by environment', measure(get_logger, ITERATIONS), 'calls/s'))
+
+    report('getLogger of a configured logger', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Import time of temlogger, measured with `python -X importtime` in a new
+interpreter, compared with the provider SDKs loaded only when needed.
+"""
+import statistics
+
+from temlogger.tests.test_import_time import imported_modules
+
+from .common import report
+
+
+RUNS = 5
+
+SCENARIOS = [
+    ('import temlogger (console)', 'import temlogger', 'temlogger',
+     {'TEMLOGGER_PROVIDER': 'console'}),
+    ('import logstash', 'import logstash', 'logstash', {}),
+    ('import google.cloud.logging', 'import google.cloud.logging',
+     'google.cloud.logging', {}),
+]
+
+
+def main():
+    rows = []
+    for label, code, module, env in SCENARIOS:
+        times = [imported_modules(code, **env)[module] for _ in range(RUNS)]
+        rows.append((label, statistics.median(times) / 1000, 'ms'))
+
+    report('Import time (median of %d runs)' % RUNS, rows)
+
+
+if __name__ == '__main__':
+    main()
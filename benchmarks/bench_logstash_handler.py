@@ -0,0 +1,46 @@
+"""
+Compare records/sec of the per-record python3-logstash TCP handler with the
+batching LogstashTCPHandler, both writing to a local TCP sink.
+"""
+from logstash import TCPLogstashHandler
+
+from temlogger.handlers.logstash import LogstashTCPHandler
+from temlogger.providers.logstash import LogstashFormatter
+from temlogger.tests.base import TCPSink
+
+from .common import make_record
+from .common import measure
+from .common import report
+
+
+ITERATIONS = 50000
+
+
+def run(handler, record):
+    handler.setFormatter(LogstashFormatter(app_name='bench', environment='bench'))
+    rate = measure(lambda: handler.handle(record), ITERATIONS)
+    handler.close()
+    return rate
+
+
+def main():
+    sink = TCPSink()
+    record = make_record(user_id=42, path='/v1/trips')
+
+    rows = [
+        ('TCPLogstashHandler (per record)',
+         run(TCPLogstashHandler(sink.host, sink.port, version=1), record)),
+        ('LogstashTCPHandler max_batch_records=1',
+         run(LogstashTCPHandler(sink.host, sink.port), record)),
+        ('LogstashTCPHandler max_batch_records=100',
+         run(LogstashTCPHandler(sink.host, sink.port, max_batch_records=100), record)),
+        ('LogstashTCPHandler max_batch_bytes=64KiB',
+         run(LogstashTCPHandler(sink.host, sink.port, max_batch_records=10 ** 6), record)),
+    ]
+    sink.stop()
+
+    report('Logstash TCP handlers', [(label, rate, 'records/s') for label, rate in rows])
+
+
+if __name__ == '__main__':
+    main()
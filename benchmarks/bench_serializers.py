@@ -0,0 +1,64 @@
+"""
+Compare the serializers available to FormatterBase on representative
+records: plain, with extra fields and with an exception.
+"""
+import sys
+
+from temlogger.providers.logstash import LogstashFormatter
+from temlogger.serializers import SERIALIZERS
+
+from .common import make_record
+from .common import measure
+from .common import report
+
+
+ITERATIONS = 20000
+
+
+def make_records():
+    try:
+        raise ValueError('Benchmark exception')
+    except ValueError:
+        exc_info = sys.exc_info()
+
+    extra = {
+        'user_id': 42,
+        'trip_id': 'b7a1c0de',
+        'station': {'id': 10, 'name': 'Largo da Batata', 'bikes': [1, 2, 3]},
+        'duration': 12.5,
+        'is_member': True,
+        'tags': ['ride', 'payment', 'pt-BR'],
+    }
+
+    return [
+        ('plain', make_record()),
+        ('with extras', make_record(**extra)),
+        ('with exception', make_record(exc_info=exc_info, **extra)),
+    ]
+
+
+def main():
+    records = make_records()
+
+    for name in SERIALIZERS:
+        try:
+            formatter = LogstashFormatter(serializer=name)
+        except ImportError:
+            print('%s: not installed' % name)
+            continue
+
+        rows = []
+        for label, record in records:
+            message = formatter.format_with_handlers(
+                super(LogstashFormatter, formatter).format(record))
+            rows.append(('serialize %s' % label,
+                         measure(lambda: formatter.serialize(message), ITERATIONS),
+                         'records/s'))
+            rows.append(('format %s' % label,
+                         measure(lambda: formatter.format(record), ITERATIONS),
+                         'records/s'))
+        report(name, rows)
+
+
+if __name__ == '__main__':
+    main()
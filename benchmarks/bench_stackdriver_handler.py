@@ -0,0 +1,57 @@
+"""
+Compare records/sec of google's CloudLoggingHandler with temlogger's
+StackDriverHandler, both writing to a fake logging API, including the time
+to drain pending entries.
+"""
+import time
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.logging import Client
+from google.cloud.logging.handlers import CloudLoggingHandler
+
+from temlogger.handlers.stackdriver import StackDriverHandler
+from temlogger.providers.stackdriver import StackDriverFormatter
+from temlogger.tests.test_stackdriver_handler import FakeLoggingAPI
+
+from .common import make_record
+from .common import report
+
+
+ITERATIONS = 20000
+
+
+def make_client():
+    client = Client(project='bench', credentials=AnonymousCredentials())
+    client._logging_api = FakeLoggingAPI()
+    return client
+
+
+def run(handler, record):
+    handler.setFormatter(StackDriverFormatter(app_name='bench', environment='bench'))
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        handler.handle(record)
+    handler.flush()
+    elapsed = time.perf_counter() - start
+    handler.close()
+    return ITERATIONS / elapsed
+
+
+def main():
+    record = make_record(user_id=42, path='/v1/trips')
+
+    rows = [
+        ('CloudLoggingHandler (background thread)',
+         run(CloudLoggingHandler(make_client()), record)),
+        ('StackDriverHandler max_batch_records=1',
+         run(StackDriverHandler(make_client()), record)),
+        ('StackDriverHandler max_batch_records=500',
+         run(StackDriverHandler(make_client(), max_batch_records=500,
+                                max_batch_bytes=10 ** 6), record)),
+    ]
+
+    report('StackDriver handlers', [(label, rate, 'records/s') for label, rate in rows])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Compare the python3-logstash timestamp formatting with temlogger's
+timestamp formats, for records sharing the same second.
+"""
+import time
+
+from logstash.formatter import LogstashFormatterBase
+
+from temlogger.timestamps import TIMESTAMP_FORMATTERS
+
+from .common import measure
+from .common import report
+
+
+ITERATIONS = 100000
+
+
+def main():
+    created = time.time()
+
+    rows = [('python3-logstash',
+             measure(lambda: LogstashFormatterBase.format_timestamp(created),
+                     ITERATIONS),
+             'calls/s')]
+    for name, formatter_class in TIMESTAMP_FORMATTERS.items():
+        formatter = formatter_class()
+        rows.append((name,
+                     measure(lambda: formatter.format(created), ITERATIONS),
+                     'calls/s'))
+
+    report('Timestamp formatting', rows)
+
+
+if __name__ == '__main__':
+    main()
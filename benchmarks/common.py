@@ -0,0 +1,67 @@
+"""
+Helpers shared by temlogger benchmarks.
+
+Run every benchmark from the repository root with:
+
+    python -m benchmarks
+
+or a single one, e.g.:
+
+    python -m benchmarks.bench_logstash_handler
+"""
+import logging
+import time
+import tracemalloc
+
+
+def make_record(msg='Benchmark message', name='benchmark', **extra):
+    record = logging.makeLogRecord({
+        'msg': msg,
+        'name': name,
+        'levelno': logging.INFO,
+        'levelname': 'INFO',
+        'pathname': __file__,
+    })
+    record.__dict__.update(extra)
+    return record
+
+
+def measure(func, iterations):
+    """Call `func` `iterations` times and return calls per second."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed
+
+
+def measure_allocations(func, iterations=100):
+    """
+    Return the average peak of memory allocated by one call of `func`, in
+    bytes, as traced by tracemalloc. Returns None on Python < 3.9.
+    """
+    if not hasattr(tracemalloc, 'reset_peak'):
+        return None
+
+    func()
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - current
+    finally:
+        tracemalloc.stop()
+
+    return total / iterations
+
+
+def report(title, rows):
+    """Print rows of (label, value, unit) aligned under `title`."""
+    print(title)
+    width = max(len(label) for label, _, _ in rows)
+    for label, value, unit in rows:
+        print('  %s  %12.1f %s' % (label.ljust(width), value, unit))
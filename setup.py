@@ -31,5 +31,10 @@ setup(
     install_requires=[
         'google-cloud-logging>=1.14.0,<2',
         'python3-logstash==0.4.80'
-    ]
+    ],
+    entry_points={
+        'console_scripts': [
+            'temlogger-collector=temlogger.collector:main',
+        ],
+    }
 )
@@ -1,6 +1,7 @@
 """Python logging handler for Logstash and StackDriver"""
 
 from .temlogger import *
+from . import context
 
 __version__ = '0.5.0'
 __license__ = 'MIT'
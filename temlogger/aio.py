@@ -0,0 +1,28 @@
+"""
+asyncio integration.
+
+With `TEMLOGGER_DELIVERY_MODE=asyncio`, Logstash loggers returned by
+`temlogger.getLogger` hand records to a writer task of the running event
+loop instead of writing to the socket in the caller. Await `flush()`
+before the loop stops, e.g. in the shutdown hook of the application, so
+queued records are delivered. Needs Python 3.7+.
+"""
+import asyncio
+
+from .temlogger import getLogger
+
+__all__ = ['getLogger', 'flush']
+
+
+async def flush():
+    """Wait until records buffered by temlogger handlers are delivered."""
+    from .handlers.aio import AsyncLogstashHandler
+    from .handlers.base import tracked_handlers
+
+    loop = asyncio.get_running_loop()
+    for handler in tracked_handlers():
+        if isinstance(handler, AsyncLogstashHandler):
+            await handler.wait_flushed()
+        else:
+            # Synchronous handlers may block, keep them off the loop
+            await loop.run_in_executor(None, handler.flush)
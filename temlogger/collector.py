@@ -0,0 +1,309 @@
+"""
+Local collector process for pre-fork servers.
+
+Workers configured with `TEMLOGGER_DELIVERY_MODE=collector` write
+newline-delimited JSON records to a Unix socket instead of each opening
+their own connection to the provider. The collector reads those records
+and ships them, batched, over a single upstream connection.
+
+Run it with `temlogger-collector --address /tmp/temlogger.sock` before
+starting the workers.
+
+With `--listen HOST:PORT --compression gzip` it accepts TCP connections
+instead, and relays compressed batches sent by `TEMLOGGER_COMPRESSION`
+to Logstash decompressed.
+"""
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+
+from .compression import get_compressor
+from .temlogger import LoggingProvider, config, logger_manager
+
+
+class CollectorRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        decompressor = self.server.get_decompressor()
+        buffered = b''
+
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                break
+            if decompressor is not None:
+                data = decompressor.decompress(data)
+
+            lines = (buffered + data).split(b'\n')
+            buffered = lines.pop()
+            for line in lines:
+                if line.strip():
+                    self.server.sink.write(line + b'\n')
+
+
+class CollectorServer(socketserver.ThreadingMixIn):
+    """
+    Forward newline-delimited records received on `address` to `sink`,
+    decompressing connections first when `compression` is set.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, sink, compression=None):
+        self.sink = sink
+        self.compressor = get_compressor(compression)
+        super().__init__(address, CollectorRequestHandler)
+
+    def get_decompressor(self):
+        if self.compressor is None:
+            return None
+        return self.compressor.decompressor()
+
+    def server_close(self):
+        super().server_close()
+        self.sink.close()
+
+
+class Collector(CollectorServer, socketserver.UnixStreamServer):
+    """Accept worker connections on the Unix socket at `address`."""
+
+    def __init__(self, address, sink, compression=None):
+        if os.path.exists(address):
+            os.unlink(address)
+
+        super().__init__(address, sink, compression)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class TCPCollector(CollectorServer, socketserver.TCPServer):
+    """
+    Accept connections on a TCP `(host, port)`. With `compression`, this is
+    the relay that decompresses batches sent with `TEMLOGGER_COMPRESSION`
+    before they reach Logstash.
+    """
+
+    allow_reuse_address = True
+
+
+class LogstashSink:
+    """Forward records to Logstash over one batched TCP connection."""
+
+    def __init__(self, host, port, max_batch_bytes=65536,
+                 max_batch_records=1, max_linger_ms=0, spool=None):
+        from .handlers.logstash import LogstashTCPHandler
+
+        self.handler = LogstashTCPHandler(
+            host,
+            port,
+            max_batch_bytes=max_batch_bytes,
+            max_batch_records=max_batch_records,
+            max_linger_ms=max_linger_ms,
+            spool=spool
+        )
+
+    def write(self, line):
+        if not line.endswith(b'\n'):
+            line += b'\n'
+
+        self.handler.acquire()
+        try:
+            self.handler.write(line)
+        finally:
+            self.handler.release()
+
+    def flush(self):
+        self.handler.flush()
+
+    def close(self):
+        self.handler.close()
+
+
+class StackDriverSink:
+    """
+    Forward records to StackDriver, committing one `entries.write` call per
+    `max_batch_records` records or every `max_linger_ms`.
+    """
+
+    def __init__(self, client, name='python', max_batch_records=1,
+                 max_linger_ms=0):
+        self.logger = client.logger(name)
+        self.max_batch_records = max_batch_records
+        self.max_linger = max_linger_ms / 1000.0
+
+        self.lock = threading.Lock()
+        self.batch = self.logger.batch()
+        self.batched_records = 0
+
+        self._stopped = threading.Event()
+        self._flusher = None
+        if self.max_linger:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically,
+                name='temlogger-collector-flusher',
+                daemon=True
+            )
+            self._flusher.start()
+
+    def write(self, line):
+        info = json.loads(line)
+
+        with self.lock:
+            self.batch.log_struct(info, severity=info.get('level'))
+            self.batched_records += 1
+
+            if self.batched_records >= self.max_batch_records:
+                self.commit()
+
+    def commit(self):
+        """Send batched entries. Callers must hold the lock."""
+        if not self.batched_records:
+            return
+
+        batch = self.batch
+        self.batch = self.logger.batch()
+        self.batched_records = 0
+        batch.commit()
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.max_linger):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.commit()
+
+    def close(self):
+        self._stopped.set()
+        self.flush()
+
+
+class ConsoleSink:
+    """Write records to stdout, used when no remote provider is set."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout.buffer
+        self.lock = threading.Lock()
+
+    def write(self, line):
+        if not line.endswith(b'\n'):
+            line += b'\n'
+
+        with self.lock:
+            self.stream.write(line)
+
+    def flush(self):
+        with self.lock:
+            self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+def create_sink():
+    """Build the sink for the provider configured in the environment."""
+    provider = config.get_provider()
+    max_batch_records = config.get_batch_max_records()
+    max_linger_ms = config.get_batch_max_linger_ms()
+
+    if provider == LoggingProvider.LOGSTASH:
+        return LogstashSink(
+            config.get_url(),
+            int(config.get_port()),
+            max_batch_bytes=config.get_batch_max_bytes(),
+            max_batch_records=max_batch_records,
+            max_linger_ms=max_linger_ms,
+            spool=logger_manager.create_spool(
+                config.get_url(), config.get_port())
+        )
+
+    if provider == LoggingProvider.STACK_DRIVER:
+        import google.cloud.logging
+        from .helpers import load_google_client
+
+        base64_cred = config.get_google_credentials_base64()
+        if base64_cred:
+            scopes = ['https://www.googleapis.com/auth/cloud-platform']
+            client = load_google_client(base64_cred, scopes=scopes)
+        else:
+            client = google.cloud.logging.Client()
+
+        return StackDriverSink(
+            client,
+            max_batch_records=max_batch_records,
+            max_linger_ms=max_linger_ms
+        )
+
+    return ConsoleSink()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='temlogger-collector',
+        description='Forward logs of local workers to the configured provider.'
+    )
+    parser.add_argument(
+        '--address',
+        default=None,
+        help='Unix socket path (default: TEMLOGGER_COLLECTOR_ADDRESS)'
+    )
+    parser.add_argument(
+        '--listen',
+        default=None,
+        metavar='HOST:PORT',
+        help='accept TCP connections instead of a Unix socket'
+    )
+    parser.add_argument(
+        '--compression',
+        default=None,
+        help='compression of incoming connections: none, gzip or zstd '
+             '(default: none on the Unix socket, TEMLOGGER_COMPRESSION '
+             'with --listen)'
+    )
+    return parser.parse_args(argv)
+
+
+def create_collector(args, sink):
+    """
+    Build the server for the parsed command line `args`. Workers in
+    collector mode write uncompressed records to the Unix socket, so
+    `TEMLOGGER_COMPRESSION` only applies to the TCP relay.
+    """
+    if args.listen:
+        host, _, port = args.listen.rpartition(':')
+        compression = args.compression or config.get_compression()
+        return TCPCollector((host, int(port)), sink, compression)
+
+    address = args.address or config.get_collector_address()
+    return Collector(address, sink, args.compression)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    collector = create_collector(args, create_sink())
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever returns, so it can't run
+        # in the thread that is serving
+        threading.Thread(target=collector.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        collector.serve_forever()
+    finally:
+        collector.server_close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
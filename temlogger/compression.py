@@ -0,0 +1,116 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class CompressionName:
+    NONE = 'none'
+    GZIP = 'gzip'
+    ZSTD = 'zstd'
+
+
+class GzipCompressor:
+    """
+    Compress each batch into a complete gzip member. Members concatenated
+    on a connection form a valid gzip stream, readable with `gunzip`.
+    """
+    name = CompressionName.GZIP
+    default_level = 6
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compress(self, data):
+        # wbits=31 writes a gzip header with mtime 0, so equal batches
+        # compress to equal bytes. `gzip.compress(mtime=...)` is 3.8+.
+        compressobj = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressobj.compress(data) + compressobj.flush()
+
+    @staticmethod
+    def decompressor():
+        return GzipDecompressor()
+
+
+class GzipDecompressor:
+    """Incrementally decompress a stream of concatenated gzip members."""
+
+    def __init__(self):
+        self.decompressobj = zlib.decompressobj(wbits=31)
+
+    def decompress(self, data):
+        output = []
+        while data:
+            output.append(self.decompressobj.decompress(data))
+            if not self.decompressobj.eof:
+                break
+            data = self.decompressobj.unused_data
+            self.decompressobj = zlib.decompressobj(wbits=31)
+        return b''.join(output)
+
+
+class ZstdCompressor:
+    """
+    Compress each batch into a complete zstd frame. Frames concatenated on
+    a connection form a valid zstd stream, readable with `zstd -d`.
+    """
+    name = CompressionName.ZSTD
+    default_level = 3
+
+    def __init__(self, level=None):
+        if zstandard is None:
+            raise ImportError('zstandard is not installed')
+
+        self.level = self.default_level if level is None else level
+        self.compressor = zstandard.ZstdCompressor(level=self.level)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    @staticmethod
+    def decompressor():
+        return ZstdDecompressor()
+
+
+class ZstdDecompressor:
+    """Incrementally decompress a stream of concatenated zstd frames."""
+
+    def __init__(self):
+        if zstandard is None:
+            raise ImportError('zstandard is not installed')
+
+        self.decompressobj = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data):
+        output = []
+        while data:
+            output.append(self.decompressobj.decompress(data))
+            if not self.decompressobj.eof:
+                break
+            data = self.decompressobj.unused_data
+            self.decompressobj = zstandard.ZstdDecompressor().decompressobj()
+        return b''.join(output)
+
+
+COMPRESSORS = {
+    CompressionName.GZIP: GzipCompressor,
+    CompressionName.ZSTD: ZstdCompressor,
+}
+
+
+def get_compressor(name=CompressionName.NONE, level=None):
+    """
+    Return a compressor instance by name, or None for `none`. `level`
+    defaults to the usual level of the algorithm.
+    """
+    if not name or name == CompressionName.NONE:
+        return None
+
+    try:
+        compressor_class = COMPRESSORS[name]
+    except KeyError as err:
+        raise ValueError('Unknown compression "%s"' % name) from err
+
+    return compressor_class(level)
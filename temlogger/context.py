@@ -0,0 +1,79 @@
+"""
+Fields bound to the current context, added to every record logged in it.
+
+    with temlogger.context.bind(tracker_id=request.tracker_id):
+        handle(request)
+
+Fields are kept in a `contextvars.ContextVar`: each thread starts without
+fields, and each asyncio task sees the fields bound where it was created,
+plus its own. Formatters merge them into the message directly, without an
+event handler call per record.
+"""
+import contextlib
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # pragma: no cover
+    ContextVar = None
+
+# Fields of the message built by temlogger, which can't be bound
+RESERVED_FIELDS = frozenset([
+    '@timestamp', 'message', 'path', 'level', 'logger_name', 'payload',
+    'host', 'environment', 'app_name', 'stack_trace', 'lineno', 'process',
+    'thread_name', 'funcName', 'processName', 'truncated',
+])
+
+
+class _ThreadLocalVar:
+    """
+    Stand-in for `ContextVar` on Python 3.6. Fields are per thread, asyncio
+    tasks of a thread share them.
+    """
+
+    def __init__(self, name, default=None):
+        self.local = threading.local()
+        self.default = default
+
+    def get(self):
+        return getattr(self.local, 'value', self.default)
+
+    def set(self, value):
+        token = self.get()
+        self.local.value = value
+        return token
+
+    def reset(self, token):
+        self.local.value = token
+
+
+if ContextVar is not None:
+    _fields = ContextVar('temlogger_context', default=None)
+else:  # pragma: no cover
+    _fields = _ThreadLocalVar('temlogger_context')
+
+
+@contextlib.contextmanager
+def bind(**fields):
+    """
+    Add `fields` to records logged until the block exits. Blocks can be
+    nested, inner fields take precedence.
+    """
+    reserved = RESERVED_FIELDS.intersection(fields)
+    if reserved:
+        raise ValueError(
+            'Fields %s are set by temlogger and can\'t be bound' %
+            ', '.join(sorted(reserved)))
+
+    current = _fields.get()
+    bound = dict(current, **fields) if current else fields
+    token = _fields.set(bound)
+    try:
+        yield bound
+    finally:
+        _fields.reset(token)
+
+
+def get_fields():
+    """Return the fields bound to the current context, or None."""
+    return _fields.get()
@@ -0,0 +1,86 @@
+"""
+Extraction of the extra fields of log records into the message payload.
+"""
+
+# Attributes every LogRecord has, skipped like python3-logstash does
+# https://docs.python.org/library/logging.html#logrecord-attributes
+SKIP_FIELDS = frozenset((
+    'args', 'asctime', 'created', 'exc_info', 'exc_text', 'filename',
+    'funcName', 'id', 'levelname', 'levelno', 'lineno', 'module',
+    'msecs', 'message', 'msg', 'name', 'pathname', 'process',
+    'processName', 'relativeCreated', 'thread', 'threadName', 'extra',
+))
+
+# Values of these types are serialized as they are
+PASSTHROUGH_TYPES = (str, bool, dict, float, int, list, type(None))
+_passthrough = frozenset(PASSTHROUGH_TYPES)
+
+# Converters registered with `register_value_converter`, and the converter
+# resolved for each value type met so far
+_registered = {}
+_resolved = {}
+
+
+def passthrough(value):
+    return value
+
+
+def register_value_converter(value_type, converter):
+    """
+    Convert extra field values of `value_type`, or of its subclasses, with
+    `converter` instead of `repr`, e.g. `register_value_converter(UUID, str)`.
+    Values whose type is exactly one of `PASSTHROUGH_TYPES` are always
+    kept as they are.
+    """
+    _registered[value_type] = converter
+    _resolved.clear()
+
+
+def get_value_converter(value_type):
+    try:
+        return _resolved[value_type]
+    except KeyError:
+        pass
+
+    for base in value_type.__mro__:
+        if base in _registered:
+            converter = _registered[base]
+            break
+    else:
+        if issubclass(value_type, PASSTHROUGH_TYPES):
+            converter = passthrough
+        else:
+            converter = repr
+
+    _resolved[value_type] = converter
+    return converter
+
+
+def get_extra_fields(record, namespace=''):
+    """
+    Return the extra fields of `record`: every attribute that is not a
+    standard LogRecord attribute or, with a `namespace`, the items of the
+    dict passed as `extra={namespace: {...}}`.
+    """
+    if namespace:
+        values = record.__dict__.get(namespace)
+        if not isinstance(values, dict):
+            return {}
+        return convert_values(values.items())
+
+    return convert_values(
+        (key, value) for key, value in record.__dict__.items()
+        if key not in SKIP_FIELDS
+    )
+
+
+def convert_values(items):
+    fields = {}
+    for key, value in items:
+        value_type = type(value)
+        if value_type in _passthrough:
+            fields[key] = value
+        else:
+            fields[key] = get_value_converter(value_type)(value)
+
+    return fields
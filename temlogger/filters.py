@@ -0,0 +1,116 @@
+import logging
+import random
+import threading
+import time
+
+
+SUPPRESSED_MESSAGE = 'Suppressed %d records like %r in the last %d seconds'
+
+# Buckets are discarded when this many distinct templates were seen, which
+# bounds memory when messages are built with string formatting.
+MAX_BUCKETS = 10000
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Rate limit and sample records before they are formatted.
+
+    Each (logger name, message template) pair has a token bucket refilled
+    with `rate` tokens per second, up to `burst`. Records arriving with an
+    empty bucket are suppressed. `sample_rates` maps a level number to the
+    fraction of records of that level kept.
+
+    Suppressed records are counted and, every `summary_interval` seconds,
+    a WARNING summary per template is emitted through `handler`, carrying
+    `suppressed_count` and `suppressed_template` as extra fields. Summaries
+    are checked when records are filtered; counts left when records stop
+    are emitted by `close`, which temlogger calls before closing `handler`.
+    """
+
+    def __init__(self, handler, rate=0, burst=0, sample_rates=None,
+                 summary_interval=60, clock=time.monotonic,
+                 random=random.random):
+        super().__init__()
+        self.handler = handler
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.sample_rates = sample_rates or {}
+        self.summary_interval = summary_interval
+        self.clock = clock
+        self.random = random
+
+        self.buckets = {}
+        self.suppressed = {}
+        self.next_summary = clock() + summary_interval
+        self.lock = threading.Lock()
+
+    def after_fork(self):
+        """The parent reports what it suppressed, the child starts over."""
+        self.lock = threading.Lock()
+        self.suppressed = {}
+
+    def close(self):
+        """Emit summaries of records suppressed since the last ones."""
+        self.emit_summaries(self.clock(), force=True)
+
+    def filter(self, record):
+        if record.msg is SUPPRESSED_MESSAGE:
+            return True
+
+        now = self.clock()
+        if now >= self.next_summary:
+            self.emit_summaries(now)
+
+        if self.allow(record, now):
+            return True
+
+        key = self.get_key(record)
+        with self.lock:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+        return False
+
+    def allow(self, record, now):
+        sample_rate = self.sample_rates.get(record.levelno)
+        if sample_rate is not None and self.random() >= sample_rate:
+            return False
+
+        if not self.rate:
+            return True
+
+        key = self.get_key(record)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= MAX_BUCKETS:
+                    self.buckets.clear()
+                bucket = self.buckets[key] = [self.burst, now]
+
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            bucket[0] = min(tokens, self.burst)
+            bucket[1] = now
+
+            if bucket[0] < 1:
+                return False
+
+            bucket[0] -= 1
+            return True
+
+    @staticmethod
+    def get_key(record):
+        msg = record.msg
+        return record.name, msg if isinstance(msg, str) else repr(msg)
+
+    def emit_summaries(self, now, force=False):
+        with self.lock:
+            if now < self.next_summary and not force:
+                return
+            self.next_summary = now + self.summary_interval
+            suppressed, self.suppressed = self.suppressed, {}
+
+        for (name, template), count in suppressed.items():
+            summary = logging.LogRecord(
+                name, logging.WARNING, '', 0, SUPPRESSED_MESSAGE,
+                (count, template, self.summary_interval), None)
+            summary.suppressed_count = count
+            summary.suppressed_template = template
+            self.handler.handle(summary)
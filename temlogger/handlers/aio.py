@@ -0,0 +1,297 @@
+import asyncio
+import collections
+import logging
+import socket
+import time
+
+from .. import metrics
+from ..temlogger import LoggingProvider
+from ..temlogger import OverflowPolicy
+from .base import track_handler
+
+
+class AsyncLogstashHandler(logging.Handler):
+    """
+    Send newline-delimited JSON records to Logstash from an asyncio task.
+
+    `emit` only formats the record and puts it on an `asyncio.Queue` of the
+    running event loop; a writer task opened with `asyncio.open_connection`
+    batches queued records and awaits `drain()`, so a slow Logstash fills
+    the queue instead of blocking the loop. The loop can't wait for room,
+    so a full queue drops the newest record, or the oldest one with the
+    `drop_oldest` policy.
+
+    Records logged before a loop is running, or from other threads, are
+    handed over once the loop picks them up. Needs Python 3.7+.
+    """
+    provider = LoggingProvider.LOGSTASH
+
+    def __init__(self, host, port, max_batch_bytes=65536,
+                 max_batch_records=1, max_linger_ms=0, max_size=0,
+                 overflow_policy=OverflowPolicy.DROP_NEWEST):
+        if not hasattr(asyncio, 'get_running_loop'):
+            raise RuntimeError(
+                'The asyncio delivery mode needs Python 3.7+, use the '
+                'direct or queue delivery mode instead')
+
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_records = max_batch_records
+        self.max_linger = max_linger_ms / 1000.0
+        self.max_size = max_size
+        self.overflow_policy = overflow_policy
+
+        self.dropped_newest = 0
+        self.dropped_oldest = 0
+        self.send_errors = 0
+        self.connections = 0
+        self.reset()
+
+        track_handler(self)
+
+    def reset(self):
+        self.loop = None
+        self.queue = None
+        self.task = None
+        self.writer = None
+        # Records emitted while no loop was bound
+        self.pending = collections.deque()
+
+    def emit(self, record):
+        try:
+            data = self.format(record).encode('utf-8') + b'\n'
+        except Exception:
+            self.handleError(record)
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is not None and running is not self.loop:
+            if self.loop is None or self.loop.is_closed():
+                self.bind(running)
+
+        if running is not None and running is self.loop:
+            if self.pending:
+                self.enqueue_pending()
+            self.enqueue(data)
+        elif self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.enqueue, data)
+        else:
+            self.add_pending(data)
+
+    def bind(self, loop):
+        """Start the writer task on `loop`. Called from the loop thread."""
+        pending = self.pending
+        if self.queue is not None:
+            # Records left by a previous, closed loop
+            pending.extend(self.drain_queue())
+
+        self.loop = loop
+        self.queue = asyncio.Queue(self.max_size)
+        self.writer = None
+        self.task = loop.create_task(self.write_forever())
+
+        self.enqueue_pending()
+
+    def add_pending(self, data):
+        """
+        Keep a record until a loop picks it up, applying `max_size` and the
+        overflow policy as the queue does.
+        """
+        if self.max_size and len(self.pending) >= self.max_size:
+            metrics.increment(self.provider, metrics.DROPPED)
+            if self.overflow_policy != OverflowPolicy.DROP_OLDEST:
+                self.dropped_newest += 1
+                return
+            self.pending.popleft()
+            self.dropped_oldest += 1
+
+        self.pending.append(data)
+
+        loop = self.loop
+        if len(self.pending) == 1 and loop is not None and not loop.is_closed():
+            # The bound loop is idle, e.g. between two run_until_complete
+            # calls: hand the records over as soon as it runs again
+            try:
+                loop.call_soon_threadsafe(self.enqueue_pending)
+            except RuntimeError:
+                # Closed meanwhile, the records wait for the next loop
+                pass
+
+    def enqueue_pending(self):
+        """Move pending records to the queue, in order. Called from the loop."""
+        if asyncio.get_running_loop() is not self.loop:
+            # Scheduled on a loop the handler was since unbound from
+            return
+
+        while self.pending:
+            self.enqueue(self.pending.popleft())
+
+    def enqueue(self, data):
+        try:
+            self.queue.put_nowait(data)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        metrics.increment(self.provider, metrics.DROPPED)
+        if self.overflow_policy != OverflowPolicy.DROP_OLDEST:
+            self.dropped_newest += 1
+            return
+
+        self.queue.get_nowait()
+        self.queue.task_done()
+        self.queue.put_nowait(data)
+        self.dropped_oldest += 1
+
+    def get_queue_depth(self):
+        depth = len(self.pending)
+        if self.queue is not None:
+            depth += self.queue.qsize()
+        return depth
+
+    def drain_queue(self):
+        records = []
+        while not self.queue.empty():
+            records.append(self.queue.get_nowait())
+            self.queue.task_done()
+        return records
+
+    async def write_forever(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            data = await self.queue.get()
+            batch = [data]
+            size = len(data)
+            deadline = loop.time() + self.max_linger
+
+            while (len(batch) < self.max_batch_records and
+                    size < self.max_batch_bytes):
+                try:
+                    data = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        data = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+                batch.append(data)
+                size += len(data)
+
+            start = time.perf_counter()
+            try:
+                if await self.send(b''.join(batch)):
+                    metrics.observe(
+                        self.provider, metrics.SEND_TIME,
+                        time.perf_counter() - start)
+            except asyncio.CancelledError:
+                # The loop is shutting down, `close()` sends the batch
+                self.pending.extend(batch)
+                raise
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def send(self, data):
+        """
+        Write `data`, reconnecting once if the connection was lost. Return
+        True when it was written.
+        """
+        for _ in range(2):
+            try:
+                if self.writer is None:
+                    await self.connect()
+                self.writer.write(data)
+                await self.writer.drain()
+                return True
+            except OSError:
+                self.close_writer()
+
+        self.send_errors += 1
+        metrics.increment(self.provider, metrics.DROPPED, data.count(b'\n'))
+        return False
+
+    async def connect(self):
+        _, self.writer = await asyncio.open_connection(self.host, self.port)
+        if self.connections:
+            metrics.increment(self.provider, metrics.RECONNECTS)
+        self.connections += 1
+
+    def close_writer(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def wait_flushed(self):
+        """Wait until every queued record was written to the connection."""
+        if self.queue is None or self.loop is None or self.loop.is_closed():
+            return
+
+        if asyncio.get_running_loop() is self.loop:
+            await self.queue.join()
+        else:
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(self.queue.join(), self.loop))
+
+    def flush(self):
+        """
+        Block until queued records are written. Does nothing on the loop
+        thread, where waiting would deadlock; use `temlogger.aio.flush()`.
+        """
+        loop = self.loop
+        if loop is None or not loop.is_running():
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return
+
+        asyncio.run_coroutine_threadsafe(self.queue.join(), loop).result()
+
+    def close(self):
+        """
+        Stop the writer task. Records still queued when the loop is gone,
+        e.g. at interpreter exit, are sent with a blocking socket.
+        """
+        loop = self.loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self.stop_writer)
+        else:
+            records = list(self.pending)
+            self.pending.clear()
+            if self.queue is not None:
+                records.extend(self.drain_queue())
+            if records:
+                self.send_blocking(b''.join(records))
+            self.reset()
+        super().close()
+
+    def stop_writer(self):
+        if self.task is not None:
+            self.task.cancel()
+        self.close_writer()
+
+    def send_blocking(self, data):
+        try:
+            with socket.create_connection((self.host, self.port)) as sock:
+                sock.sendall(data)
+        except OSError:
+            self.send_errors += 1
+            metrics.increment(self.provider, metrics.DROPPED, data.count(b'\n'))
+
+    def after_fork(self):
+        """The parent's loop and writer task do not exist in the child."""
+        self.connections = 0
+        self.reset()
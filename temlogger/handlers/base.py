@@ -0,0 +1,74 @@
+import atexit
+import os
+import warnings
+import weakref
+
+UNBOUNDED_BATCH_MESSAGE = (
+    'max_batch_records=%d without max_linger_ms: records are held until '
+    'the batch fills or the handler is flushed'
+)
+
+
+# Weak references to handlers created by temlogger, in creation order.
+_handler_refs = []
+
+
+def track_handler(handler):
+    """Register a temlogger-owned handler to be flushed and closed on exit."""
+    _handler_refs.append(weakref.ref(handler, _handler_refs.remove))
+    return handler
+
+
+def check_batch_linger(max_batch_records, max_linger_ms):
+    """Warn when batching leaves a lone record waiting indefinitely."""
+    if max_batch_records > 1 and not max_linger_ms:
+        warnings.warn(
+            UNBOUNDED_BATCH_MESSAGE % max_batch_records, RuntimeWarning,
+            stacklevel=3)
+
+
+def tracked_handlers():
+    """Return live temlogger-owned handlers, newest first."""
+    handlers = (ref() for ref in reversed(list(_handler_refs)))
+    return [handler for handler in handlers if handler is not None]
+
+
+def close_filters(handler):
+    """Let filters of `handler` emit the records they hold before it closes."""
+    for item in handler.filters:
+        close = getattr(item, 'close', None)
+        if close is not None:
+            close()
+
+
+def flush_handlers():
+    for handler in tracked_handlers():
+        handler.flush()
+
+
+def close_handlers():
+    """
+    Close newest handlers first, so wrappers drain into their targets
+    before the targets themselves are closed.
+    """
+    for handler in tracked_handlers():
+        close_filters(handler)
+        handler.close()
+
+
+def reinit_handlers_after_fork():
+    """
+    Drop connections, buffers and background threads a child process
+    inherited from its parent. Handlers rebuild them on their next use.
+    """
+    for handler in tracked_handlers():
+        for item in [handler] + handler.filters:
+            after_fork = getattr(item, 'after_fork', None)
+            if after_fork is not None:
+                after_fork()
+
+
+atexit.register(close_handlers)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reinit_handlers_after_fork)
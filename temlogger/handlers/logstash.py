@@ -0,0 +1,337 @@
+import copy
+import threading
+import time
+
+from logging.handlers import DatagramHandler
+from logging.handlers import SocketHandler
+
+from .. import metrics
+from ..temlogger import LoggingProvider
+from .base import check_batch_linger
+from .base import track_handler
+
+TRUNCATED_SUFFIX = '...'
+REPLAY_CHUNK_BYTES = 65536
+
+
+class LogstashTCPHandler(SocketHandler):
+    """
+    Send newline-delimited JSON records to Logstash over TCP.
+
+    Serialized records are accumulated in a single buffer which is written
+    with one `sendall` once `max_batch_bytes` or `max_batch_records` is
+    reached. When `max_linger_ms` is set, a background thread also flushes
+    the buffer at that interval, bounding how long a record waits. With
+    `max_batch_records=1` every record is sent as soon as it is emitted;
+    above that, leaving `max_linger_ms` unset holds records until the batch
+    fills and raises a `RuntimeWarning`.
+
+    With a `spool` (see `temlogger.spool.DiskSpool`), batches that can't be
+    sent are written to disk instead of being lost, and a background thread
+    replays them in order every `spool_retry_ms` until Logstash is back.
+    New records go to the spool as long as it is not empty, preserving order.
+
+    With a `compressor` (see `temlogger.compression`), each batch is sent as
+    one compressed frame; Logstash needs a decompressing relay in front of
+    it, such as `temlogger-collector --listen`.
+    """
+    # Key of the self-metrics of this handler
+    provider = LoggingProvider.LOGSTASH
+
+    def __init__(self, host, port, max_batch_bytes=65536,
+                 max_batch_records=1, max_linger_ms=0, spool=None,
+                 spool_retry_ms=1000, compressor=None):
+        super().__init__(host, port)
+        check_batch_linger(max_batch_records, max_linger_ms)
+
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_records = max_batch_records
+        self.max_linger = max_linger_ms / 1000.0
+        self.spool = spool
+        self.spool_retry = spool_retry_ms / 1000.0
+        self.compressor = compressor
+
+        self.buffer = bytearray()
+        self.buffered_records = 0
+        self.connections = 0
+
+        self._flusher = None
+        self._replayer = None
+        self._stopped = threading.Event()
+
+        track_handler(self)
+
+    def makeSocket(self, timeout=1):
+        sock = super().makeSocket(timeout)
+        if self.connections:
+            metrics.increment(self.provider, metrics.RECONNECTS)
+        self.connections += 1
+        return sock
+
+    def makePickle(self, record):
+        return self.format(record).encode('utf-8') + b'\n'
+
+    def emit(self, record):
+        try:
+            data = self.makePickle(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        if data is not None:
+            self.write(data)
+
+    def write(self, data):
+        """
+        Buffer one serialized, newline terminated record. Callers must hold
+        the handler lock.
+        """
+        self.buffer += data
+        self.buffered_records += 1
+
+        if (len(self.buffer) >= self.max_batch_bytes or
+                self.buffered_records >= self.max_batch_records):
+            self.flush_buffer()
+        elif self.max_linger and self._flusher is None:
+            self.start_flusher()
+
+    def flush_buffer(self):
+        """Write buffered records. Callers must hold the handler lock."""
+        if not self.buffer:
+            return
+
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        self.buffered_records = 0
+
+        start = time.perf_counter()
+        if self.send(data):
+            metrics.observe(
+                self.provider, metrics.SEND_TIME, time.perf_counter() - start)
+
+    def get_queue_depth(self):
+        return self.buffered_records
+
+    def encode(self, data):
+        if self.compressor is None:
+            return data
+        return self.compressor.compress(data)
+
+    def send(self, data):
+        """
+        Send `data`, or spool it when Logstash is unavailable. Without a
+        spool it is dropped. Return True when it was sent.
+        """
+        if self.spool is None or self.spool.closed:
+            if self.send_now(data):
+                return True
+            records = data.count(b'\n')
+            metrics.increment(self.provider, metrics.DROPPED, records)
+            return False
+
+        if self.spool.is_empty() and self.send_now(data):
+            return True
+
+        self.spool.append(data)
+        if self._replayer is None and not self._stopped.is_set():
+            self.start_replayer()
+        return False
+
+    def send_now(self, data):
+        """Send `data`, returning False instead of losing it on failure."""
+        if self.sock is None:
+            self.createSocket()
+        if self.sock is None:
+            return False
+
+        try:
+            self.sock.sendall(self.encode(data))
+            return True
+        except OSError:
+            self.sock.close()
+            self.sock = None
+            return False
+
+    def start_replayer(self):
+        self._replayer = threading.Thread(
+            target=self._replay_periodically,
+            name='temlogger-logstash-replayer',
+            daemon=True
+        )
+        self._replayer.start()
+
+    def _replay_periodically(self):
+        while not self.replay():
+            if self._stopped.wait(self.spool_retry):
+                return
+
+    def replay(self):
+        """
+        Send spooled records in order. Return True once the spool is empty,
+        False when Logstash is still unavailable.
+        """
+        while True:
+            self.acquire()
+            try:
+                if self.spool.closed:
+                    self._replayer = None
+                    return True
+                data = self.spool.peek(REPLAY_CHUNK_BYTES)
+                if not data:
+                    self._replayer = None
+                    return True
+                if not self.send_now(data):
+                    return False
+                self.spool.consume(data)
+            finally:
+                self.release()
+
+    def start_flusher(self):
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            name='temlogger-logstash-flusher',
+            daemon=True
+        )
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.max_linger):
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            self.flush_buffer()
+            spooled = (self.spool is not None and not self.spool.closed and
+                       not self.spool.is_empty())
+        finally:
+            self.release()
+
+        if spooled:
+            # One attempt only, Logstash may still be unavailable
+            self.replay()
+
+    def after_fork(self):
+        """
+        Forget the parent's connection, buffered records and flusher thread.
+        The connection is reopened by the next `send`.
+        """
+        if self.sock is not None:
+            try:
+                # Only closes the child's copy of the descriptor
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.retryTime = None
+        self.connections = 0
+
+        self.buffer = bytearray()
+        self.buffered_records = 0
+        self._flusher = None
+        self._replayer = None
+        self._stopped = threading.Event()
+
+        if self.spool is not None:
+            self.spool = self.spool.reopen()
+
+    def close(self):
+        self._stopped.set()
+        self.flush()
+        if self.spool is not None:
+            self.acquire()
+            try:
+                self.spool.close()
+            finally:
+                self.release()
+        super().close()
+
+
+class LogstashDatagramHandler(LogstashTCPHandler):
+    """
+    Send newline-delimited JSON records to Logstash over UDP, or to a Unix
+    datagram socket at `host` when `port` is None.
+
+    Buffered records are packed into datagrams of at most
+    `max_datagram_bytes`. A record that doesn't fit in a datagram on its own
+    has its message shortened, and is dropped if that is not enough.
+    Delivery is fire and forget: the socket never blocks, and a datagram
+    that can't be sent is dropped. `truncated` and `dropped` count the
+    affected records.
+    """
+
+    def __init__(self, host, port, max_datagram_bytes=8192,
+                 max_batch_records=1, max_linger_ms=0):
+        super().__init__(
+            host,
+            port,
+            max_batch_bytes=max_datagram_bytes,
+            max_batch_records=max_batch_records,
+            max_linger_ms=max_linger_ms
+        )
+        self.truncated = 0
+        self.dropped = 0
+
+    def makeSocket(self):
+        sock = DatagramHandler.makeSocket(self)
+        sock.setblocking(False)
+        return sock
+
+    def makePickle(self, record):
+        data = super().makePickle(record)
+        if len(data) <= self.max_batch_bytes:
+            return data
+
+        return self.truncate(record, data)
+
+    def truncate(self, record, data):
+        """
+        Shorten the message of `record` until it is serialized within
+        `max_batch_bytes`. Return None if it can't be.
+        """
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.args = None
+
+        # Dropping a character shrinks the output by at least one byte,
+        # more when it was escaped, so this converges in one or two steps
+        while True:
+            keep = (len(message) - (len(data) - self.max_batch_bytes) -
+                    len(TRUNCATED_SUFFIX))
+            if keep <= 0:
+                self.dropped += 1
+                metrics.increment(self.provider, metrics.DROPPED)
+                return None
+
+            message = message[:keep]
+            record.msg = message + TRUNCATED_SUFFIX
+            data = super().makePickle(record)
+            if len(data) <= self.max_batch_bytes:
+                self.truncated += 1
+                return data
+
+    def write(self, data):
+        if len(self.buffer) + len(data) > self.max_batch_bytes:
+            self.flush_buffer()
+        super().write(data)
+
+    def send(self, data):
+        if self.sock is None:
+            self.createSocket()
+
+        try:
+            if self.sock is None:
+                raise OSError('Could not create the socket')
+            self.sock.sendto(data, self.address)
+            return True
+        except OSError:
+            records = data.count(b'\n')
+            self.dropped += records
+            metrics.increment(self.provider, metrics.DROPPED, records)
+            return False
+
+    def get_counters(self):
+        return {
+            'truncated': self.truncated,
+            'dropped': self.dropped,
+        }
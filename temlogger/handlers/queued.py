@@ -0,0 +1,164 @@
+import queue
+import threading
+
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+
+from .. import metrics
+from ..temlogger import OverflowPolicy
+from .base import track_handler
+
+
+class _BlockingQueueListener(QueueListener):
+
+    def enqueue_sentinel(self):
+        # A full queue must still receive the sentinel, otherwise stop()
+        # would raise instead of draining pending records.
+        self.queue.put(self._sentinel)
+
+
+class QueuedHandler(QueueHandler):
+    """
+    Put records on a bounded queue and let a background thread format
+    and ship them through `target`.
+
+    Records are handed over without being formatted, so the caller only
+    pays for a queue insertion. When the queue is full, `overflow_policy`
+    decides whether the caller blocks, the new record is dropped or the
+    oldest queued record is discarded to make room. Once closed, e.g. by
+    the atexit hook, nothing drains the queue and records are dropped.
+    """
+
+    def __init__(self, target, max_size=0,
+                 overflow_policy=OverflowPolicy.BLOCK):
+        super().__init__(queue.Queue(max_size))
+        self.target = target
+        self.overflow_policy = overflow_policy
+
+        self.blocked = 0
+        self.dropped_newest = 0
+        self.dropped_oldest = 0
+        self.dropped_closed = 0
+        self._overflow_lock = threading.Lock()
+
+        self.listener = _BlockingQueueListener(
+            self.queue, target, respect_handler_level=True)
+        self.listener.start()
+        self._running = True
+        self._forked = False
+        self._start_lock = threading.Lock()
+
+        track_handler(self)
+
+    @property
+    def provider(self):
+        return getattr(self.target, 'provider', None)
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if not self._running:
+            with self._overflow_lock:
+                self.dropped_closed += 1
+            metrics.increment(self.provider, metrics.DROPPED)
+            return
+
+        if self._forked:
+            self.restart_listener()
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.handle_overflow(record)
+
+    def handle_overflow(self, record):
+        policy = self.overflow_policy
+
+        if policy == OverflowPolicy.DROP_NEWEST:
+            with self._overflow_lock:
+                self.dropped_newest += 1
+            metrics.increment(self.provider, metrics.DROPPED)
+            return
+
+        if policy == OverflowPolicy.DROP_OLDEST:
+            with self._overflow_lock:
+                self._replace_oldest(record)
+            return
+
+        with self._overflow_lock:
+            self.blocked += 1
+        self.queue.put(record)
+
+    def _replace_oldest(self, record):
+        try:
+            oldest = self.queue.get_nowait()
+        except queue.Empty:
+            oldest = None
+        else:
+            self.queue.task_done()
+
+        if oldest is self.listener._sentinel:
+            # Never discard the stop request of the listener
+            self.queue.put(oldest)
+            self.dropped_newest += 1
+            metrics.increment(self.provider, metrics.DROPPED)
+            return
+
+        if oldest is not None:
+            self.dropped_oldest += 1
+            metrics.increment(self.provider, metrics.DROPPED)
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_newest += 1
+            metrics.increment(self.provider, metrics.DROPPED)
+
+    def after_fork(self):
+        """
+        Discard records queued by the parent, whose listener thread does not
+        exist in this process. A new listener starts on the next record.
+        """
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.listener = _BlockingQueueListener(
+            self.queue, self.target, respect_handler_level=True)
+        self._overflow_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._forked = self._running
+
+    def restart_listener(self):
+        with self._start_lock:
+            if self._forked:
+                self.listener.start()
+                self._forked = False
+
+    @property
+    def dropped(self):
+        return self.dropped_newest + self.dropped_oldest + self.dropped_closed
+
+    def get_queue_depth(self):
+        return self.queue.qsize()
+
+    def get_counters(self):
+        return {
+            'queue_size': self.queue.qsize(),
+            'blocked': self.blocked,
+            'dropped_newest': self.dropped_newest,
+            'dropped_oldest': self.dropped_oldest,
+            'dropped_closed': self.dropped_closed,
+        }
+
+    def flush(self):
+        """Wait until every queued record was handed to `target`."""
+        if self._running and not self._forked:
+            self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        if self._running:
+            self._running = False
+            if not self._forked:
+                self.listener.stop()
+            self.target.close()
+        super().close()
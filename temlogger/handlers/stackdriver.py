@@ -0,0 +1,323 @@
+import collections
+import json
+import logging
+import threading
+import time
+
+from .base import check_batch_linger
+from .base import track_handler
+from .. import metrics
+from ..serializers import get_serializer
+from ..temlogger import LoggingProvider
+from ..timestamps import Rfc3339NanosFormatter
+
+# entries.write rejects requests above 10 MB, leave room for the envelope
+MAX_REQUEST_BYTES = 9437184
+REPLAY_CHUNK_BYTES = 1048576
+
+SEVERITIES = {
+    logging.CRITICAL: 'CRITICAL',
+    logging.ERROR: 'ERROR',
+    logging.WARNING: 'WARNING',
+    logging.INFO: 'INFO',
+    logging.DEBUG: 'DEBUG',
+}
+
+
+def reset_client_channels(client):
+    """
+    Make a google logging client inherited through `os.fork` open its own
+    API channels, HTTP/gRPC channels must not be shared across processes.
+    Both are rebuilt lazily by the client on the next API call.
+    """
+    client._http_internal = None
+    client._logging_api = None
+
+
+def reinit_cloud_logging_handler(handler):
+    """
+    Give a `CloudLoggingHandler` inherited through `os.fork` its own API
+    channels and background transport. The parent's worker thread does not
+    exist in the child.
+    """
+    reset_client_channels(handler.client)
+    handler.transport = type(handler.transport)(handler.client, handler.name)
+
+
+class StackDriverHandler(logging.Handler):
+    """
+    Send records to StackDriver as structured entries, written with
+    `entries.write` by a background thread.
+
+    The dict built by the formatter is the `jsonPayload` of the entry as is,
+    with `severity` and `timestamp` taken from the record. Entries are
+    written once `max_batch_bytes` or `max_batch_records` is reached, and
+    after at most `max_linger_ms`, which must be set when
+    `max_batch_records` is above 1. Entries accumulated while
+    a write is in flight go together in the next one, so a slow API means
+    fewer, larger requests. Beyond `max_pending_records` waiting entries,
+    new records are dropped.
+
+    With a `spool` (see `temlogger.spool.DiskSpool`), batches that can't be
+    written are kept on disk and replayed in order every `spool_retry_ms`.
+    Without one they are dropped. `get_counters` reports both.
+    """
+    provider = LoggingProvider.STACK_DRIVER
+
+    def __init__(self, client, log_name='python', resource=None, labels=None,
+                 max_batch_bytes=65536, max_batch_records=1,
+                 max_linger_ms=0, max_pending_records=10000, spool=None,
+                 spool_retry_ms=1000, serializer=None):
+        super().__init__()
+        check_batch_linger(max_batch_records, max_linger_ms)
+
+        self.client = client
+        self.log_name = log_name
+        self.logger_name = 'projects/%s/logs/%s' % (client.project, log_name)
+        self.resource = resource or {'type': 'global'}
+        self.labels = labels
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_records = max_batch_records
+        self.max_linger = max_linger_ms / 1000.0
+        self.max_pending_records = max_pending_records
+        self.spool = spool
+        self.spool_retry = spool_retry_ms / 1000.0
+        self.serializer = serializer or get_serializer()
+        self.timestamp_formatter = Rfc3339NanosFormatter()
+
+        self.written = 0
+        self.dropped = 0
+        self.reset()
+
+        track_handler(self)
+
+    def reset(self):
+        self.condition = threading.Condition()
+        # Taken by whichever thread writes, so batches keep their order
+        self.write_lock = threading.Lock()
+        self.pending = collections.deque()
+        self.pending_bytes = 0
+        self.pending_since = 0
+        # Records left in the spool by a previous process are replayed too
+        self.spooled = self.spool is not None
+        self.retry_at = 0
+        self._writer = None
+        self._stopped = False
+
+    def make_entry(self, record, message):
+        if not isinstance(message, dict):
+            message = {'message': message}
+
+        return {
+            'jsonPayload': message,
+            'severity': SEVERITIES.get(record.levelno, 'DEFAULT'),
+            'timestamp': self.timestamp_formatter.format(record.created),
+        }
+
+    def emit(self, record):
+        try:
+            entry = self.make_entry(record, self.format(record))
+            size = len(self.serializer.dumps(entry))
+        except Exception:
+            self.handleError(record)
+            return
+
+        metrics.increment(self.provider, metrics.BYTES, size)
+        self.enqueue(entry, size)
+
+    def enqueue(self, entry, size):
+        """Queue one entry of about `size` bytes for the writer thread."""
+        with self.condition:
+            if len(self.pending) >= self.max_pending_records:
+                self.count_dropped(1)
+                return
+
+            if not self.pending:
+                self.pending_since = time.monotonic()
+            self.pending.append((entry, size))
+            self.pending_bytes += size
+
+            if self._writer is None and not self._stopped:
+                self.start_writer()
+            self.condition.notify()
+
+    def start_writer(self):
+        self._writer = threading.Thread(
+            target=self._write_continuously,
+            name='temlogger-stackdriver-writer',
+            daemon=True
+        )
+        self._writer.start()
+
+    def batch_ready(self, now):
+        """Callers must hold the condition."""
+        if self.spooled and now >= self.retry_at:
+            return True
+        if not self.pending:
+            return False
+
+        return (len(self.pending) >= self.max_batch_records or
+                self.pending_bytes >= self.max_batch_bytes or
+                bool(self.max_linger) and
+                now - self.pending_since >= self.max_linger)
+
+    def wait_timeout(self, now):
+        """Seconds until the next batch is due. Callers must hold the condition."""
+        deadlines = []
+        if self.spooled:
+            deadlines.append(self.retry_at)
+        if self.pending and self.max_linger:
+            deadlines.append(self.pending_since + self.max_linger)
+
+        if not deadlines:
+            return None
+        return max(min(deadlines) - now, 0)
+
+    def _write_continuously(self):
+        while True:
+            with self.condition:
+                now = time.monotonic()
+                while not self._stopped and not self.batch_ready(now):
+                    self.condition.wait(self.wait_timeout(now))
+                    now = time.monotonic()
+
+                if self._stopped:
+                    # close() writes what is left
+                    self._writer = None
+                    return
+
+            self.write_pending()
+
+    def take_batch(self):
+        """Remove and return pending entries fitting in one request."""
+        with self.condition:
+            entries = []
+            size = 0
+            while self.pending:
+                entry_size = self.pending[0][1]
+                if entries and size + entry_size > MAX_REQUEST_BYTES:
+                    break
+                entry, _ = self.pending.popleft()
+                entries.append(entry)
+                size += entry_size
+
+            self.pending_bytes -= size
+            self.pending_since = time.monotonic()
+
+        return entries
+
+    def write_pending(self):
+        """Write every pending entry, replaying the spool first."""
+        with self.write_lock:
+            if self.spooled:
+                self.replay()
+
+            while True:
+                entries = self.take_batch()
+                if not entries:
+                    return
+                self.write_batch(entries)
+
+    def write_batch(self, entries):
+        """Callers must hold the write lock."""
+        if self.spooled:
+            # Keep order until the spool is drained
+            self.spool_entries(entries)
+            return
+
+        try:
+            self.write_entries(entries)
+        except Exception:
+            if self.spool is None or self.spool.closed:
+                self.count_dropped(len(entries))
+            else:
+                self.spool_entries(entries)
+
+    def write_entries(self, entries):
+        start = time.perf_counter()
+        self.client.logging_api.write_entries(
+            entries,
+            logger_name=self.logger_name,
+            resource=self.resource,
+            labels=self.labels
+        )
+        metrics.observe(
+            self.provider, metrics.SEND_TIME, time.perf_counter() - start)
+        self.written += len(entries)
+
+    def count_dropped(self, records):
+        self.dropped += records
+        metrics.increment(self.provider, metrics.DROPPED, records)
+
+    def spool_entries(self, entries):
+        """Callers must hold the write lock."""
+        if self.spool is None or self.spool.closed:
+            self.count_dropped(len(entries))
+            return
+
+        data = ''.join(
+            self.serializer.dumps(entry) + '\n' for entry in entries)
+        self.spool.append(data.encode('utf-8'))
+        if not self.spooled:
+            self.spooled = True
+            self.retry_at = time.monotonic() + self.spool_retry
+
+    def replay(self):
+        """
+        Write spooled entries in order. Return True once the spool is empty,
+        False when StackDriver is still unavailable. Callers must hold the
+        write lock.
+        """
+        while not self.spool.closed:
+            data = self.spool.peek(REPLAY_CHUNK_BYTES)
+            if not data:
+                break
+
+            try:
+                self.write_entries(
+                    [json.loads(line) for line in data.splitlines()])
+            except Exception:
+                self.retry_at = time.monotonic() + self.spool_retry
+                return False
+            self.spool.consume(data)
+
+        self.spooled = False
+        return True
+
+    def flush(self):
+        """Write pending entries now, with one attempt to replay the spool."""
+        self.write_pending()
+
+    def get_queue_depth(self):
+        return len(self.pending)
+
+    def get_counters(self):
+        with self.condition:
+            pending = len(self.pending)
+
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'pending': pending,
+        }
+
+    def after_fork(self):
+        """
+        Forget the parent's API channels, pending entries and writer thread.
+        They are rebuilt on the next record.
+        """
+        reset_client_channels(self.client)
+        if self.spool is not None:
+            self.spool = self.spool.reopen()
+        self.reset()
+
+    def close(self):
+        with self.condition:
+            self._stopped = True
+            self.condition.notify()
+
+        self.flush()
+        if self.spool is not None:
+            with self.write_lock:
+                self.spool.close()
+        super().close()
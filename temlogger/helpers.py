@@ -1,8 +1,6 @@
 import base64
-import tempfile
+import json
 
-
-from google.cloud.logging import Client as LoggingClient
 from importlib import import_module
 
 
@@ -43,18 +41,21 @@ def import_string_list(dotted_path_list=[]):
 
 
 def load_google_client(base64_data, scopes=[]):
+    """
+    Build a logging client from base64 encoded service account credentials,
+    decoded in memory.
+    """
+    from google.cloud.logging import Client as LoggingClient
+    from google.oauth2 import service_account
+
     if not base64_data:
         return ''
 
-    decoded = base64.b64decode(base64_data).decode('utf-8')
-
-    # From: https://github.com/googleapis/google-cloud-python/issues/7291#issuecomment-461135696
-    with tempfile.NamedTemporaryFile() as temp:
-        temp.write(decoded.encode('ascii'))
-        temp.flush()
-        client = LoggingClient.from_service_account_json(temp.name)
+    info = json.loads(base64.b64decode(base64_data).decode('utf-8'))
+    credentials = service_account.Credentials.from_service_account_info(
+        info, scopes=scopes or None)
 
-    return client
+    return LoggingClient(project=info.get('project_id'), credentials=credentials)
 
 
 def encode_file_as_base64(file_path):
@@ -0,0 +1,118 @@
+import math
+
+TRUNCATED_MARKER = '...'
+
+# Rough serialized size of keys and of values that are not strings
+ITEM_OVERHEAD = 4
+SCALAR_SIZE = 8
+
+
+class Truncation:
+    __slots__ = ('remaining', 'truncated')
+
+    def __init__(self, remaining):
+        self.remaining = remaining
+        self.truncated = False
+
+
+class PayloadLimits:
+    """
+    Size caps applied to messages before they are serialized.
+
+    Strings longer than `max_message_length` (the log message) or
+    `max_field_length` (extra fields and stack traces) are cut, lists and
+    dicts keep at most `max_list_length` items, and containers nested
+    deeper than `max_payload_depth` in the payload are replaced by a
+    marker. `max_record_bytes` bounds the whole record: sizes are estimated
+    while walking the message, counting characters of strings, so an
+    oversized value is cut without being serialized first.
+
+    A limit of 0 disables it. Truncated messages get `truncated: true`.
+    """
+
+    def __init__(self, max_message_length=0, max_field_length=0,
+                 max_payload_depth=0, max_list_length=0, max_record_bytes=0):
+        self.max_message_length = max_message_length
+        self.max_field_length = max_field_length
+        self.max_payload_depth = max_payload_depth
+        self.max_list_length = max_list_length
+        self.max_record_bytes = max_record_bytes
+
+    def __bool__(self):
+        return bool(
+            self.max_message_length or self.max_field_length or
+            self.max_payload_depth or self.max_list_length or
+            self.max_record_bytes
+        )
+
+    def apply(self, message):
+        """Truncate `message` in place. Return True if anything was cut."""
+        state = Truncation(self.max_record_bytes or math.inf)
+
+        text = message.get('message')
+        if isinstance(text, str):
+            message['message'] = self.cut_string(
+                text, self.max_message_length, state)
+
+        stack_trace = message.get('stack_trace')
+        if isinstance(stack_trace, str):
+            message['stack_trace'] = self.cut_string(
+                stack_trace, self.max_field_length, state)
+
+        if 'payload' in message:
+            message['payload'] = self.limit_value(message['payload'], 1, state)
+
+        if state.truncated:
+            message['truncated'] = True
+        return state.truncated
+
+    def cut_string(self, value, max_length, state):
+        limit = min(max_length or math.inf, max(state.remaining, 0))
+        if len(value) > limit:
+            value = value[:int(limit)] + TRUNCATED_MARKER
+            state.truncated = True
+
+        state.remaining -= len(value) + ITEM_OVERHEAD
+        return value
+
+    def limit_value(self, value, depth, state):
+        if isinstance(value, str):
+            return self.cut_string(value, self.max_field_length, state)
+
+        if not isinstance(value, (dict, list)):
+            state.remaining -= SCALAR_SIZE
+            return value
+
+        if self.max_payload_depth and depth > self.max_payload_depth:
+            state.truncated = True
+            state.remaining -= len(TRUNCATED_MARKER) + ITEM_OVERHEAD
+            return TRUNCATED_MARKER
+
+        if isinstance(value, dict):
+            return self.limit_dict(value, depth, state)
+        return self.limit_list(value, depth, state)
+
+    def limit_dict(self, value, depth, state):
+        result = {}
+        for index, (key, item) in enumerate(value.items()):
+            if state.remaining <= 0 or (
+                    self.max_list_length and index >= self.max_list_length):
+                state.truncated = True
+                break
+
+            state.remaining -= len(str(key)) + ITEM_OVERHEAD
+            result[key] = self.limit_value(item, depth + 1, state)
+
+        return result
+
+    def limit_list(self, value, depth, state):
+        result = []
+        for index, item in enumerate(value):
+            if state.remaining <= 0 or (
+                    self.max_list_length and index >= self.max_list_length):
+                state.truncated = True
+                break
+
+            result.append(self.limit_value(item, depth + 1, state))
+
+        return result
@@ -0,0 +1,222 @@
+"""
+Self-metrics of the logging pipeline, read with `temlogger.stats()`.
+
+Every thread updates its own counters, so recording a value takes no lock;
+counters of all threads are added up when they are read.
+"""
+import bisect
+import os
+import threading
+
+RECORDS = 'records'
+BYTES = 'bytes'
+DROPPED = 'dropped'
+RECONNECTS = 'reconnects'
+FORMAT_TIME = 'format_time'
+EVENT_HANDLER_TIME = 'event_handler_time'
+SEND_TIME = 'send_time'
+
+COUNTERS = (RECORDS, BYTES, DROPPED, RECONNECTS)
+HISTOGRAMS = (FORMAT_TIME, EVENT_HANDLER_TIME, SEND_TIME)
+
+# Upper bounds of histogram buckets, in seconds
+BUCKETS = (
+    0.000001, 0.0000025, 0.000005,
+    0.00001, 0.000025, 0.00005,
+    0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0, float('inf'),
+)
+
+
+def _new_histogram():
+    # [count, sum, per bucket counts...]
+    return [0, 0.0] + [0] * len(BUCKETS)
+
+
+class _Slot:
+    """Metrics of one provider updated by one thread."""
+    __slots__ = ('thread', 'provider') + COUNTERS + HISTOGRAMS
+
+    def __init__(self, thread, provider):
+        self.thread = thread
+        self.provider = provider
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        for name in HISTOGRAMS:
+            setattr(self, name, _new_histogram())
+
+    def merge(self, other):
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in HISTOGRAMS:
+            # The copy is taken atomically, the owner may keep updating
+            values = list(getattr(other, name))
+            setattr(self, name, [a + b for a, b in zip(getattr(self, name), values)])
+
+
+_local = threading.local()
+_slots = []
+_slots_lock = threading.Lock()
+# Totals of threads that exited, per provider
+_retired = {}
+
+
+def _get_slot(provider):
+    try:
+        return _local.slots[provider]
+    except AttributeError:
+        _local.slots = {}
+    except KeyError:
+        pass
+
+    slot = _local.slots[provider] = _Slot(threading.current_thread(), provider)
+    with _slots_lock:
+        # Threads come and go in thread-per-request servers, fold the slots
+        # of exited ones so the list only holds live threads
+        _retire_exited()
+        _slots.append(slot)
+    return slot
+
+
+def _retire_exited():
+    """
+    Add the slots of exited threads to the totals of their provider.
+    Callers must hold the slots lock.
+    """
+    exited = [slot for slot in _slots if not slot.thread.is_alive()]
+    for slot in exited:
+        retired = _retired.get(slot.provider)
+        if retired is None:
+            retired = _retired[slot.provider] = _Slot(None, slot.provider)
+        retired.merge(slot)
+        _slots.remove(slot)
+
+
+def _observe(histogram, seconds):
+    histogram[0] += 1
+    histogram[1] += seconds
+    histogram[2 + bisect.bisect_left(BUCKETS, seconds)] += 1
+
+
+def increment(provider, name, value=1):
+    slot = _get_slot(provider)
+    setattr(slot, name, getattr(slot, name) + value)
+
+
+def observe(provider, name, seconds):
+    _observe(getattr(_get_slot(provider), name), seconds)
+
+
+def record_format(provider, seconds, size=0):
+    """Count one record formatted in `seconds` into `size` serialized bytes."""
+    slot = _get_slot(provider)
+    slot.records += 1
+    slot.bytes += size
+    _observe(slot.format_time, seconds)
+
+
+def _collect():
+    """
+    Add up the slots of every thread per provider, retiring those of
+    exited threads.
+    """
+    totals = {}
+
+    with _slots_lock:
+        _retire_exited()
+        for slot in _slots:
+            total = totals.get(slot.provider)
+            if total is None:
+                total = totals[slot.provider] = _Slot(None, slot.provider)
+            total.merge(slot)
+
+        for provider, retired in _retired.items():
+            total = totals.get(provider)
+            if total is None:
+                total = totals[provider] = _Slot(None, provider)
+            total.merge(retired)
+
+    return totals
+
+
+def _histogram(values):
+    cumulative = 0
+    buckets = []
+    for bound, count in zip(BUCKETS, values[2:]):
+        cumulative += count
+        buckets.append((bound, cumulative))
+
+    return {'count': values[0], 'sum': values[1], 'buckets': buckets}
+
+
+# Current depth of `handlers` given to `snapshot`
+DEPTHS = ('queue_depth', 'spool_bytes', 'spool_records')
+
+
+def snapshot(handlers=()):
+    """
+    Return metrics per provider. `queue_depth` is the number of records
+    waiting in memory in `handlers` right now, `spool_bytes` and
+    `spool_records` what waits in their disk spools.
+    """
+    providers = {}
+    for provider, total in _collect().items():
+        stats = providers[provider] = {}
+        for name in COUNTERS:
+            stats[name] = getattr(total, name)
+        for name in DEPTHS:
+            stats[name] = 0
+        for name in HISTOGRAMS:
+            stats[name] = _histogram(getattr(total, name))
+
+    for handler in handlers:
+        get_queue_depth = getattr(handler, 'get_queue_depth', None)
+        provider = getattr(handler, 'provider', None)
+        if get_queue_depth is None or provider is None:
+            continue
+        if provider not in providers:
+            providers[provider] = _empty_stats()
+        stats = providers[provider]
+        stats['queue_depth'] += get_queue_depth()
+
+        spool = getattr(handler, 'spool', None)
+        if spool is not None and not spool.closed:
+            stats['spool_bytes'] += spool.size
+            stats['spool_records'] += spool.records
+
+    return providers
+
+
+def _empty_stats():
+    stats = dict.fromkeys(COUNTERS + DEPTHS, 0)
+    for name in HISTOGRAMS:
+        stats[name] = _histogram(_new_histogram())
+    return stats
+
+
+def reset():
+    """Forget every metric."""
+    global _local, _retired
+
+    with _slots_lock:
+        _slots.clear()
+        _local = threading.local()
+        _retired = {}
+
+
+def _reset_after_fork():
+    """
+    Metrics of the parent are not the child's. The lock may have been held
+    by another thread of the parent, so it is replaced instead of taken.
+    """
+    global _slots_lock
+
+    _slots_lock = threading.Lock()
+    reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,61 @@
+def static_event_handler(handler):
+    """
+    Mark an event handler whose fields do not depend on the message, e.g.
+    one adding a constant `tracker_id`. It is called once, with an empty
+    dict, when the pipeline is compiled and its result is merged into every
+    message instead of calling it per record.
+    """
+    handler.static = True
+    return handler
+
+
+def is_static_event_handler(handler):
+    return getattr(handler, 'static', False) is True
+
+
+class EventHandlerPipeline:
+    """
+    Event handlers compiled into a list of steps. Each step is either a
+    dict of precomputed static fields or a handler to call.
+    """
+    __slots__ = ('handlers', 'steps')
+
+    def __init__(self, handlers=(), profiler=None, slow_threshold_ms=0):
+        self.handlers = tuple(handlers)
+        self.steps = self.compile(self.handlers, profiler, slow_threshold_ms)
+
+    @staticmethod
+    def compile(handlers, profiler=None, slow_threshold_ms=0):
+        """
+        With a `profiler` (see `temlogger.profiling`), handlers called per
+        record are wrapped to be timed. Static handlers are not, they only
+        run here.
+        """
+        steps = []
+        for handler in handlers:
+            if not is_static_event_handler(handler):
+                if profiler is not None:
+                    handler = profiler.wrap(handler, slow_threshold_ms)
+                steps.append((None, handler))
+                continue
+
+            fields = dict(handler({}))
+            if steps and steps[-1][0] is not None:
+                # Consecutive static handlers become a single update
+                steps[-1][0].update(fields)
+            else:
+                steps.append((fields, None))
+
+        return tuple(steps)
+
+    def __call__(self, message):
+        for fields, handler in self.steps:
+            if fields is None:
+                message = handler(message)
+            else:
+                message.update(fields)
+
+        return message
+
+    def __len__(self):
+        return len(self.steps)
@@ -0,0 +1,138 @@
+"""
+Timing of event handlers, enabled with `TEMLOGGER_PROFILE_EVENT_HANDLERS`
+and read with `temlogger.event_handler_stats()`.
+"""
+import collections
+import math
+import os
+import threading
+import time
+import warnings
+
+# Recent call durations kept per handler to estimate the p99
+SAMPLES = 1024
+
+SLOW_HANDLER_MESSAGE = (
+    'Event handler %s took %.1f ms, above the %g ms threshold '
+    '(TEMLOGGER_SLOW_EVENT_HANDLER_MS). It runs for every record logged.'
+)
+
+
+class SlowEventHandlerWarning(RuntimeWarning):
+    pass
+
+
+def handler_path(handler):
+    """Dotted path of an event handler, e.g. `myapp.logging.add_user`."""
+    target = handler
+    if not hasattr(target, '__qualname__'):
+        # Callable instance
+        target = type(handler)
+
+    return '%s.%s' % (getattr(target, '__module__', '?'), target.__qualname__)
+
+
+class HandlerProfile:
+    """Calls and durations of one event handler."""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow_calls = 0
+        self.warned = False
+        self.samples = collections.deque(maxlen=SAMPLES)
+
+    def get_p99(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        return samples[math.ceil(len(samples) * 0.99) - 1]
+
+    def as_dict(self):
+        return {
+            'path': self.path,
+            'calls': self.calls,
+            'total': self.total,
+            'mean': self.total / self.calls if self.calls else 0.0,
+            'p99': self.get_p99(),
+            'max': self.max,
+            'slow_calls': self.slow_calls,
+        }
+
+
+class EventHandlerProfiler:
+    """
+    Time event handlers wrapped with `wrap`, per dotted path. A handler
+    taking longer than `slow_threshold_ms` counts a slow call, and the first
+    one raises a `SlowEventHandlerWarning`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profiles = {}
+
+    def wrap(self, handler, slow_threshold_ms=0):
+        path = handler_path(handler)
+        slow_threshold = slow_threshold_ms / 1000.0
+
+        def profiled(message):
+            start = time.perf_counter()
+            try:
+                return handler(message)
+            finally:
+                self.record(path, time.perf_counter() - start, slow_threshold)
+
+        return profiled
+
+    def record(self, path, seconds, slow_threshold=0):
+        with self.lock:
+            profile = self.profiles.get(path)
+            if profile is None:
+                profile = self.profiles[path] = HandlerProfile(path)
+
+            profile.calls += 1
+            profile.total += seconds
+            profile.samples.append(seconds)
+            if seconds > profile.max:
+                profile.max = seconds
+
+            slow = bool(slow_threshold) and seconds > slow_threshold
+            warn = slow and not profile.warned
+            if slow:
+                profile.slow_calls += 1
+                profile.warned = True
+
+        if warn:
+            warnings.warn(
+                SLOW_HANDLER_MESSAGE % (
+                    profile.path, seconds * 1000, slow_threshold * 1000),
+                SlowEventHandlerWarning
+            )
+
+    def report(self, top=None):
+        """
+        Return the profile of every handler called, slowest cumulative time
+        first, limited to `top` entries when given. Times are in seconds.
+        """
+        with self.lock:
+            profiles = [profile.as_dict() for profile in self.profiles.values()]
+
+        profiles.sort(key=lambda profile: profile['total'], reverse=True)
+        return profiles[:top] if top is not None else profiles
+
+    def reset(self):
+        with self.lock:
+            self.profiles.clear()
+
+    def after_fork(self):
+        """The lock may have been held by another thread of the parent."""
+        self.lock = threading.Lock()
+        self.profiles = {}
+
+
+profiler = EventHandlerProfiler()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=profiler.after_fork)
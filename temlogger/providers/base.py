@@ -1,44 +1,146 @@
-import itertools
+import logging
+import socket
+import time
+import traceback
 
-from logstash.formatter import LogstashFormatterBase
 from temlogger import config
 
+from .. import metrics
+from ..context import get_fields as get_context_fields
+from ..extra_fields import get_extra_fields
 from ..helpers import import_string_list
+from ..limits import PayloadLimits
+from ..pipeline import EventHandlerPipeline
+from ..serializers import get_serializer
+from ..temlogger import LoggingProvider
+from ..timestamps import get_timestamp_formatter
 
 
-class FormatterBase(LogstashFormatterBase):
+class FormatterBase(logging.Formatter):
+    """
+    Build the message of a record, in the format of python3-logstash's
+    `LogstashFormatterBase`, without importing python3-logstash, so
+    providers that don't ship to Logstash don't pay for it.
+    """
+    # Key of the self-metrics of records formatted here
+    provider = LoggingProvider.DEFAULT
 
     def __init__(self, fqdn=False, app_name='', environment='',
-                 event_handlers=[], *args, **kwargs):
-        super().__init__(message_type='', fqdn=fqdn, *args, **kwargs)
+                 event_handlers=[], serializer='', timestamp_format='',
+                 extra_namespace='', limits=None, tags=None):
+        super().__init__()
+        self.message_type = ''
+        self.tags = tags if tags is not None else []
+        self.host = socket.getfqdn() if fqdn else socket.gethostname()
         self.app_name = app_name
         self.environment = environment
         self.event_handlers = import_string_list(event_handlers)
+        self.pipeline = None
+        self.pipeline_version = None
+        self.serializer = get_serializer(serializer or config.get_serializer())
+        self.timestamp_formatter = get_timestamp_formatter(
+            timestamp_format or config.get_timestamp_format())
+        self.extra_namespace = extra_namespace or config.get_extra_namespace()
+        if limits is None:
+            limits = PayloadLimits(
+                max_message_length=config.get_max_message_length(),
+                max_field_length=config.get_max_field_length(),
+                max_payload_depth=config.get_max_payload_depth(),
+                max_list_length=config.get_max_list_length(),
+                max_record_bytes=config.get_max_record_bytes()
+            )
+        self.limits = limits
+
+        # Fields identical for every record, serialized once. Formatters
+        # producing JSON splice the fragment in front of per-record fields.
+        self.static_fields = {
+            'host': self.host,
+            'environment': self.environment,
+            'app_name': self.app_name,
+        }
+        self.static_fragment = self.serialize(self.static_fields)[1:-1]
+        self.static_prefix = '{%s%s' % (
+            self.static_fragment, self.serializer.item_separator)
+
+    def serialize(self, message):
+        return self.serializer.dumps(message)
+
+    def format_timestamp(self, time):
+        return self.timestamp_formatter.format(time)
+
+    def get_extra_fields(self, record):
+        return get_extra_fields(record, self.extra_namespace)
+
+    def get_debug_fields(self, record):
+        fields = {
+            'stack_trace': self.format_exception(record.exc_info),
+            'lineno': record.lineno,
+            'process': record.process,
+            'thread_name': record.threadName,
+        }
+
+        # Kept from python3-logstash, which only adds these when empty
+        if not getattr(record, 'funcName', None):
+            fields['funcName'] = record.funcName
+        if not getattr(record, 'processName', None):
+            fields['processName'] = record.processName
+
+        return fields
+
+    @staticmethod
+    def format_exception(exc_info):
+        if not exc_info:
+            return ''
+        return ''.join(traceback.format_exception(*exc_info))
+
+    def get_pipeline(self):
+        """
+        Return global and local event handlers compiled into one pipeline,
+        rebuilt only after `config.setup_event_handlers` is called or
+        profiling settings change.
+        """
+        version = config.get_event_handlers_version()
+        if self.pipeline_version != version:
+            handlers = config.get_event_handlers() + self.event_handlers
+            profiler = None
+            if config.get_profile_event_handlers():
+                from ..profiling import profiler
+            self.pipeline = EventHandlerPipeline(
+                handlers, profiler, config.get_slow_event_handler_ms())
+            self.pipeline_version = version
+
+        return self.pipeline
 
     def format_with_handlers(self, message):
-        default_handlers = config.get_event_handlers()
-        handlers = itertools.chain(default_handlers, self.event_handlers)
+        pipeline = self.get_pipeline()
+        if not pipeline:
+            return message
 
-        for handle in handlers:
-            message = handle(message)
+        start = time.perf_counter()
+        message = pipeline(message)
+        metrics.observe(
+            self.provider, metrics.EVENT_HANDLER_TIME,
+            time.perf_counter() - start)
 
         return message
 
-    def format(self, record):
-        # Create message dict
+    def get_record_fields(self, record):
+        """Fields of the message that change from record to record."""
         message = {
             '@timestamp': self.format_timestamp(record.created),
             'message': record.getMessage(),
-            'host': self.host,
             'path': record.pathname,
-            'environment': self.environment,
-            'app_name': self.app_name,
 
             # Extra Fields
             'level': record.levelname,
             'logger_name': record.name,
         }
 
+        # Add fields bound with `temlogger.context.bind`
+        context_fields = get_context_fields()
+        if context_fields:
+            message.update(context_fields)
+
         # Add extra fields
         payload_fields = self.get_extra_fields(record)
         message.update(payload=payload_fields)
@@ -47,6 +149,83 @@ class FormatterBase(LogstashFormatterBase):
         if record.exc_info:
             message.update(self.get_debug_fields(record))
 
+        if self.limits:
+            self.limits.apply(message)
+
+        return message
+
+    def get_message(self, record):
+        # Create message dict
+        message = self.get_record_fields(record)
+        message.update(self.static_fields)
+
         message = self.format_with_handlers(message)
 
         return message
+
+    def format(self, record):
+        start = time.perf_counter()
+        message = self.get_message(record)
+        metrics.record_format(self.provider, time.perf_counter() - start)
+
+        return message
+
+    def format_json(self, record):
+        """
+        Return the message of `record` serialized. Without event handlers,
+        which may read or replace any field, only per-record fields are
+        serialized and the static fragment is spliced in front of them.
+        """
+        start = time.perf_counter()
+        if self.get_pipeline():
+            data = self.serialize(self.get_message(record))
+        else:
+            fields = self.serialize(self.get_record_fields(record))
+            data = self.static_prefix + fields[1:]
+
+        metrics.record_format(
+            self.provider, time.perf_counter() - start, len(data))
+
+        return data
+
+
+class FormatterRouter(logging.Formatter):
+    """
+    Formatter of a handler shared by several loggers. Records are formatted
+    by the formatter registered for their logger, or for its closest parent,
+    so per-logger event handlers still apply.
+    """
+
+    def __init__(self, default):
+        super().__init__()
+        self.default = default
+        self.formatters = {}
+        self.routes = {}
+
+    def add(self, name, formatter):
+        self.formatters[name] = formatter
+        self.routes = {}
+
+    def remove(self, name):
+        self.formatters.pop(name, None)
+        self.routes = {}
+
+    def get_formatter(self, name):
+        try:
+            return self.routes[name]
+        except KeyError:
+            pass
+
+        formatter = self.default
+        candidate = name
+        while candidate:
+            if candidate in self.formatters:
+                formatter = self.formatters[candidate]
+                break
+            candidate = candidate.rpartition('.')[0]
+
+        self.routes[name] = formatter
+        return formatter
+
+    def format(self, record):
+        return self.get_formatter(record.name).format(record)
@@ -0,0 +1,13 @@
+from .base import FormatterBase
+from ..temlogger import DeliveryMode
+
+
+class CollectorFormatter(FormatterBase):
+    """
+    Serialize records sent to the local collector process, which forwards
+    them to the configured provider.
+    """
+    provider = DeliveryMode.COLLECTOR
+
+    def format(self, record):
+        return self.format_json(record)
@@ -1,8 +1,9 @@
 from .base import FormatterBase
+from ..temlogger import LoggingProvider
 
 
 class LogstashFormatter(FormatterBase):
+    provider = LoggingProvider.LOGSTASH
 
     def format(self, record):
-        message = super().format(record)
-        return self.serialize(message)
+        return self.format_json(record)
@@ -1,7 +1,9 @@
 from .base import FormatterBase
+from ..temlogger import LoggingProvider
 
 
 class StackDriverFormatter(FormatterBase):
+    provider = LoggingProvider.STACK_DRIVER
 
     def format(self, record):
         message = super().format(record)
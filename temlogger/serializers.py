@@ -0,0 +1,114 @@
+import json
+import math
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+def has_non_finite(value):
+    """Whether `value` holds a NaN or infinite float, at any depth."""
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(has_non_finite(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(has_non_finite(item) for item in value)
+    return False
+
+
+class SerializerName:
+    AUTO = 'auto'
+    JSON = 'json'
+    ORJSON = 'orjson'
+    UJSON = 'ujson'
+
+
+class JsonSerializer:
+    """Standard library encoder, used whenever a faster one is unavailable."""
+    name = SerializerName.JSON
+    # Written by `dumps` between the items of an object
+    item_separator = ', '
+
+    def dumps(self, message):
+        return json.dumps(message)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """
+    Values orjson encodes differently from the standard library (datetimes,
+    dataclasses, integers above 64 bits, NaN and infinite floats, which it
+    writes as null) fall back to `json.dumps`, so the same records succeed
+    or fail, and keep their values, as before.
+    """
+    name = SerializerName.ORJSON
+    item_separator = ','
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('orjson is not installed')
+
+        self.option = (
+            orjson.OPT_NON_STR_KEYS |
+            orjson.OPT_PASSTHROUGH_DATETIME |
+            orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+
+    def dumps(self, message):
+        try:
+            data = orjson.dumps(message, option=self.option)
+        except TypeError:
+            return json.dumps(message)
+
+        # Only messages with a null can hold a non-finite float
+        if b'null' in data and has_non_finite(message):
+            return json.dumps(message)
+        return data.decode('utf-8')
+
+
+class UjsonSerializer(JsonSerializer):
+    name = SerializerName.UJSON
+    item_separator = ','
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError('ujson is not installed')
+
+    def dumps(self, message):
+        try:
+            return ujson.dumps(message, escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            return json.dumps(message)
+
+
+SERIALIZERS = {
+    SerializerName.JSON: JsonSerializer,
+    SerializerName.ORJSON: OrjsonSerializer,
+    SerializerName.UJSON: UjsonSerializer,
+}
+
+
+def get_serializer(name=SerializerName.AUTO):
+    """
+    Return a serializer instance by name. `auto` picks orjson, then ujson,
+    then the standard library, depending on what is installed.
+    """
+    if name == SerializerName.AUTO:
+        if orjson is not None:
+            return OrjsonSerializer()
+        if ujson is not None:
+            return UjsonSerializer()
+        return JsonSerializer()
+
+    try:
+        serializer_class = SERIALIZERS[name]
+    except KeyError as err:
+        raise ValueError('Unknown serializer "%s"' % name) from err
+
+    return serializer_class()
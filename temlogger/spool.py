@@ -0,0 +1,213 @@
+import itertools
+import mmap
+import os
+
+from . import metrics
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+SEGMENT_SUFFIX = '.seg'
+LOCK_FILE = 'lock'
+
+
+class DiskSpool:
+    """
+    Append-only, size bounded spool of newline-delimited records on disk.
+
+    Records are appended to segment files of at most `segment_bytes`. When
+    the spool grows beyond `max_bytes` its oldest segments are deleted.
+    Segments are read back in order through `mmap` and deleted once every
+    record they hold was consumed, so records survive a restart of the
+    process and are delivered at least once.
+
+    Each spool instance locks a numbered directory under `directory`, so
+    processes sharing `directory` never write to the same segments and a
+    new process picks up what a dead one left behind.
+
+    Records deleted to stay within `max_bytes` are counted as dropped in
+    the self-metrics of `provider`.
+    """
+
+    def __init__(self, directory, max_bytes=104857600,
+                 segment_bytes=4194304, provider=None):
+        self.root = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.provider = provider
+
+        self.directory = None
+        self.lock_file = None
+        self.closed = False
+        self.segments = []
+        self.writer = None
+        self.writer_size = 0
+        self.read_offset = 0
+
+        self.size = 0
+        self.records = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+
+    def open(self):
+        if self.closed:
+            raise ValueError('I/O operation on closed spool')
+        if self.directory is not None:
+            return
+
+        for index in itertools.count():
+            directory = os.path.join(self.root, str(index))
+            os.makedirs(directory, exist_ok=True)
+            lock_file = open(os.path.join(directory, LOCK_FILE), 'ab')
+            if fcntl is None:
+                break
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                lock_file.close()
+
+        self.directory = directory
+        self.lock_file = lock_file
+        self.segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        for segment in self.segments:
+            with open(self.segment_path(segment), 'rb') as fh:
+                data = fh.read()
+            self.size += len(data)
+            self.records += data.count(b'\n')
+
+    def segment_path(self, segment):
+        name = '%020d%s' % (segment, SEGMENT_SUFFIX)
+        return os.path.join(self.directory, name)
+
+    def is_empty(self):
+        self.open()
+        return not self.size
+
+    def append(self, data):
+        """Append newline terminated records."""
+        self.open()
+
+        if self.writer is None or (
+                self.writer_size and
+                self.writer_size + len(data) > self.segment_bytes):
+            self.rotate()
+
+        self.writer.write(data)
+        self.writer_size += len(data)
+
+        records = data.count(b'\n')
+        self.size += len(data)
+        self.records += records
+        self.spooled += records
+
+        while self.size > self.max_bytes and len(self.segments) > 1:
+            self.drop_oldest()
+
+    def rotate(self):
+        if self.writer is not None:
+            self.writer.close()
+
+        segment = self.segments[-1] + 1 if self.segments else 0
+        self.segments.append(segment)
+        self.writer = open(self.segment_path(segment), 'ab', buffering=0)
+        self.writer_size = 0
+
+    def drop_oldest(self):
+        segment = self.segments.pop(0)
+        path = self.segment_path(segment)
+        with open(path, 'rb') as fh:
+            fh.seek(self.read_offset)
+            data = fh.read()
+        os.unlink(path)
+
+        records = data.count(b'\n')
+        self.size -= len(data)
+        self.records -= records
+        self.dropped += records
+        self.read_offset = 0
+        if self.provider is not None:
+            metrics.increment(self.provider, metrics.DROPPED, records)
+
+    def peek(self, max_bytes=65536):
+        """
+        Return the oldest records, about `max_bytes` of them, without
+        consuming them. Return empty bytes when the spool is empty.
+        """
+        self.open()
+        if not self.segments:
+            return b''
+
+        with open(self.segment_path(self.segments[0]), 'rb') as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size <= self.read_offset:
+                return b''
+
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = min(size, self.read_offset + max_bytes)
+                if end < size:
+                    newline = mm.rfind(b'\n', self.read_offset, end)
+                    if newline < 0:
+                        newline = mm.find(b'\n', end)
+                    end = newline + 1
+                return mm[self.read_offset:end]
+
+    def consume(self, data):
+        """Forget `data`, as returned by `peek`, once it was delivered."""
+        records = data.count(b'\n')
+        self.read_offset += len(data)
+        self.size -= len(data)
+        self.records -= records
+        self.replayed += records
+
+        segment = self.segments[0]
+        if self.read_offset < os.path.getsize(self.segment_path(segment)):
+            return
+
+        if len(self.segments) == 1 and self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.segments.pop(0)
+        os.unlink(self.segment_path(segment))
+        self.read_offset = 0
+
+    def get_counters(self):
+        if not self.closed:
+            self.open()
+        return {
+            'spool_bytes': self.size,
+            'spool_records': self.records,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'dropped': self.dropped,
+        }
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+        self.directory = None
+        self.closed = True
+        self.segments = []
+        self.size = 0
+        self.records = 0
+        self.read_offset = 0
+
+    def reopen(self):
+        """
+        Return a new spool on the same directory, used by a forked child
+        whose parent keeps the current one.
+        """
+        self.close()
+        return DiskSpool(
+            self.root, self.max_bytes, self.segment_bytes, self.provider)
@@ -1,9 +1,13 @@
+import functools
 import logging
 import os
+import threading
 import warnings
 
 from .helpers import import_string_list
 from .helpers import load_google_client
+from .extra_fields import register_value_converter
+from .pipeline import static_event_handler
 
 
 DEPRECATE_MESSAGE = (
@@ -12,6 +16,23 @@ DEPRECATE_MESSAGE = (
 )
 
 DEFAULT_LOG_LEVEL = 'INFO'
+DEFAULT_HANDLER_LOG_LEVEL = 'NOTSET'
+DEFAULT_RATE_LIMIT = 0
+DEFAULT_COLLECTOR_ADDRESS = '/tmp/temlogger.sock'
+DEFAULT_DATAGRAM_MAX_BYTES = 8192
+DEFAULT_SPOOL_MAX_BYTES = 104857600
+DEFAULT_COMPRESSION = 'none'
+DEFAULT_TIMESTAMP_FORMAT = 'iso8601'
+DEFAULT_SLOW_EVENT_HANDLER_MS = 10
+DEFAULT_RATE_LIMIT_SUMMARY_INTERVAL = 60
+DEFAULT_QUEUE_MAX_SIZE = 10000
+DEFAULT_BATCH_MAX_BYTES = 65536
+DEFAULT_BATCH_MAX_RECORDS = 1
+DEFAULT_BATCH_MAX_LINGER_MS = 0
+# Linger when batches hold more than one record, so a lone record is not
+# held until the batch fills
+DEFAULT_BATCHED_LINGER_MS = 200
+DEFAULT_SERIALIZER = 'auto'
 
 
 class LoggingProvider:
@@ -21,73 +42,678 @@ class LoggingProvider:
     DEFAULT = 'default'
 
 
+class DeliveryMode:
+    DIRECT = 'direct'
+    QUEUE = 'queue'
+    COLLECTOR = 'collector'
+    ASYNCIO = 'asyncio'
+
+
+class Transport:
+    TCP = 'tcp'
+    UDP = 'udp'
+    UNIX = 'unix'
+
+
+class OverflowPolicy:
+    BLOCK = 'block'
+    DROP_NEWEST = 'drop_newest'
+    DROP_OLDEST = 'drop_oldest'
+
+
+def parse_bool(value):
+    """Parse booleans given as bool or strings such as 'true' and '1'."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+    return bool(value)
+
+
+def parse_log_levels(value):
+    """
+    Parse per-logger levels given as a dict or as a string such as
+    'payments=DEBUG,urllib3=WARNING' into a dict of name to level number.
+    """
+    if isinstance(value, str):
+        pairs = (item.split('=', 1) for item in value.split(',') if '=' in item)
+        value = {name.strip(): level.strip() for name, level in pairs}
+
+    return {
+        name: logging.getLevelName(str(level).upper())
+        if not isinstance(level, int) else level
+        for name, level in value.items()
+    }
+
+
+def parse_sample_rates(value):
+    """
+    Parse sample rates given as a dict or as a string such as
+    'DEBUG=0.1,INFO=0.5' into a dict of level number to rate.
+    """
+    if isinstance(value, str):
+        pairs = (item.split('=', 1) for item in value.split(',') if '=' in item)
+        value = {level.strip(): rate.strip() for level, rate in pairs}
+
+    return {
+        logging.getLevelName(str(level).upper())
+        if not isinstance(level, int) else level: float(rate)
+        for level, rate in value.items()
+    }
+
+
+class ResolvedConfig:
+    """
+    Immutable snapshot of the effective configuration, merging values set
+    programmatically with TEMLOGGER_* environment variables.
+    """
+    __slots__ = (
+        'provider',
+        'url',
+        'port',
+        'environment',
+        'google_credentials_base64',
+        'log_level',
+        'log_level_parsed',
+        'log_levels',
+        'log_level_cache',
+        'handler_log_level',
+        'handler_log_level_parsed',
+        'app_name',
+        'delivery_mode',
+        'queue_max_size',
+        'queue_overflow_policy',
+        'batch_max_bytes',
+        'batch_max_records',
+        'batch_max_linger_ms',
+        'serializer',
+        'rate_limit',
+        'rate_limit_burst',
+        'rate_limit_summary_interval',
+        'sample_rates',
+        'shared_handlers',
+        'collector_address',
+        'datagram_max_bytes',
+        'transport',
+        'spool_dir',
+        'spool_max_bytes',
+        'compression',
+        'compression_level',
+        'timestamp_format',
+        'extra_namespace',
+        'max_message_length',
+        'max_field_length',
+        'max_payload_depth',
+        'max_list_length',
+        'max_record_bytes',
+        'profile_event_handlers',
+        'slow_event_handler_ms',
+        'stackdriver_batching',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ResolvedConfig is immutable')
+
+
 class LoggingConfig:
+    """
+    Environment variables are read once, when the configuration is first
+    used. The snapshot is rebuilt after any `set_*` call, `reset()` or an
+    explicit `reload()`.
+    """
     _provider = ''
     _url = ''
     _port = ''
     _environment = ''
     _google_credentials_base64 = ''
     _event_handlers = []
+    _event_handlers_version = 0
     _log_level = ''
+    _log_levels = ''
+    _handler_log_level = ''
     _app_name = ''
+    _delivery_mode = ''
+    _queue_max_size = ''
+    _queue_overflow_policy = ''
+    _batch_max_bytes = ''
+    _batch_max_records = ''
+    _batch_max_linger_ms = ''
+    _serializer = ''
+    _rate_limit = ''
+    _rate_limit_burst = ''
+    _rate_limit_summary_interval = ''
+    _sample_rates = ''
+    _shared_handlers = ''
+    _collector_address = ''
+    _datagram_max_bytes = ''
+    _transport = ''
+    _spool_dir = ''
+    _spool_max_bytes = ''
+    _compression = ''
+    _compression_level = ''
+    _timestamp_format = ''
+    _extra_namespace = ''
+    _max_message_length = ''
+    _max_field_length = ''
+    _max_payload_depth = ''
+    _max_list_length = ''
+    _max_record_bytes = ''
+    _profile_event_handlers = ''
+    _slow_event_handler_ms = ''
+    _stackdriver_batching = ''
+    _resolved = None
+
+    def resolved(self):
+        """Return the current :class:`ResolvedConfig`."""
+        resolved = self._resolved
+        if resolved is None:
+            resolved = self._resolved = self.resolve()
+        return resolved
+
+    def reload(self):
+        """Discard the snapshot so environment variables are read again."""
+        self._resolved = None
+
+    def resolve(self):
+        provider = self._provider or os.getenv('TEMLOGGER_PROVIDER', '')
+        log_level = self._log_level or os.getenv('TEMLOGGER_LOG_LEVEL', '')
+        log_level = (log_level or DEFAULT_LOG_LEVEL).upper()
+        log_levels = self._log_levels or os.getenv('TEMLOGGER_LOG_LEVELS', '')
+        handler_log_level = (
+            self._handler_log_level or
+            os.getenv('TEMLOGGER_HANDLER_LOG_LEVEL', ''))
+        handler_log_level = (
+            handler_log_level or DEFAULT_HANDLER_LOG_LEVEL).upper()
+        delivery_mode = (
+            self._delivery_mode or os.getenv('TEMLOGGER_DELIVERY_MODE', ''))
+        queue_max_size = (
+            self._queue_max_size or os.getenv('TEMLOGGER_QUEUE_MAX_SIZE', ''))
+        queue_overflow_policy = (
+            self._queue_overflow_policy or
+            os.getenv('TEMLOGGER_QUEUE_OVERFLOW_POLICY', ''))
+        batch_max_bytes = (
+            self._batch_max_bytes or os.getenv('TEMLOGGER_BATCH_MAX_BYTES', ''))
+        batch_max_records = (
+            self._batch_max_records or
+            os.getenv('TEMLOGGER_BATCH_MAX_RECORDS', ''))
+        batch_max_linger_ms = (
+            self._batch_max_linger_ms or
+            os.getenv('TEMLOGGER_BATCH_MAX_LINGER_MS', ''))
+        batch_max_records = int(batch_max_records or DEFAULT_BATCH_MAX_RECORDS)
+        if not batch_max_linger_ms and batch_max_records > 1:
+            batch_max_linger_ms = DEFAULT_BATCHED_LINGER_MS
+        serializer = self._serializer or os.getenv('TEMLOGGER_SERIALIZER', '')
+        rate_limit = self._rate_limit or os.getenv('TEMLOGGER_RATE_LIMIT', '')
+        rate_limit_burst = (
+            self._rate_limit_burst or
+            os.getenv('TEMLOGGER_RATE_LIMIT_BURST', ''))
+        rate_limit_summary_interval = (
+            self._rate_limit_summary_interval or
+            os.getenv('TEMLOGGER_RATE_LIMIT_SUMMARY_INTERVAL', ''))
+        sample_rates = (
+            self._sample_rates or os.getenv('TEMLOGGER_SAMPLE_RATES', ''))
+        shared_handlers = (
+            self._shared_handlers or
+            os.getenv('TEMLOGGER_SHARED_HANDLERS', ''))
+        collector_address = (
+            self._collector_address or
+            os.getenv('TEMLOGGER_COLLECTOR_ADDRESS', ''))
+        datagram_max_bytes = (
+            self._datagram_max_bytes or
+            os.getenv('TEMLOGGER_DATAGRAM_MAX_BYTES', ''))
+        transport = self._transport or os.getenv('TEMLOGGER_TRANSPORT', '')
+        spool_dir = self._spool_dir or os.getenv('TEMLOGGER_SPOOL_DIR', '')
+        spool_max_bytes = (
+            self._spool_max_bytes or
+            os.getenv('TEMLOGGER_SPOOL_MAX_BYTES', ''))
+        compression = (
+            self._compression or
+            os.getenv('TEMLOGGER_COMPRESSION', ''))
+        compression_level = (
+            self._compression_level or
+            os.getenv('TEMLOGGER_COMPRESSION_LEVEL', ''))
+        timestamp_format = (
+            self._timestamp_format or
+            os.getenv('TEMLOGGER_TIMESTAMP_FORMAT', ''))
+        extra_namespace = (
+            self._extra_namespace or
+            os.getenv('TEMLOGGER_EXTRA_NAMESPACE', ''))
+        max_message_length = (
+            self._max_message_length or
+            os.getenv('TEMLOGGER_MAX_MESSAGE_LENGTH', ''))
+        max_field_length = (
+            self._max_field_length or
+            os.getenv('TEMLOGGER_MAX_FIELD_LENGTH', ''))
+        max_payload_depth = (
+            self._max_payload_depth or
+            os.getenv('TEMLOGGER_MAX_PAYLOAD_DEPTH', ''))
+        max_list_length = (
+            self._max_list_length or
+            os.getenv('TEMLOGGER_MAX_LIST_LENGTH', ''))
+        max_record_bytes = (
+            self._max_record_bytes or
+            os.getenv('TEMLOGGER_MAX_RECORD_BYTES', ''))
+        profile_event_handlers = (
+            self._profile_event_handlers or
+            os.getenv('TEMLOGGER_PROFILE_EVENT_HANDLERS', ''))
+        slow_event_handler_ms = (
+            self._slow_event_handler_ms or
+            os.getenv('TEMLOGGER_SLOW_EVENT_HANDLER_MS', ''))
+        stackdriver_batching = (
+            self._stackdriver_batching or
+            os.getenv('TEMLOGGER_STACKDRIVER_BATCHING', ''))
+
+        return ResolvedConfig(
+            provider=(provider or LoggingProvider.DEFAULT).lower(),
+            url=self._url or os.getenv('TEMLOGGER_URL', ''),
+            port=self._port or os.getenv('TEMLOGGER_PORT', ''),
+            environment=(
+                self._environment or os.getenv('TEMLOGGER_ENVIRONMENT', '')),
+            google_credentials_base64=(
+                self._google_credentials_base64 or
+                os.getenv('TEMLOGGER_GOOGLE_CREDENTIALS_BASE64', '')),
+            log_level=log_level,
+            log_level_parsed=logging.getLevelName(log_level),
+            log_levels=parse_log_levels(log_levels),
+            log_level_cache={},
+            handler_log_level=handler_log_level,
+            handler_log_level_parsed=logging.getLevelName(handler_log_level),
+            app_name=self._app_name or os.getenv('TEMLOGGER_APP_NAME', ''),
+            delivery_mode=(delivery_mode or DeliveryMode.DIRECT).lower(),
+            queue_max_size=int(queue_max_size or DEFAULT_QUEUE_MAX_SIZE),
+            queue_overflow_policy=(
+                queue_overflow_policy or OverflowPolicy.BLOCK).lower(),
+            batch_max_bytes=int(batch_max_bytes or DEFAULT_BATCH_MAX_BYTES),
+            batch_max_records=batch_max_records,
+            batch_max_linger_ms=int(
+                batch_max_linger_ms or DEFAULT_BATCH_MAX_LINGER_MS),
+            serializer=(serializer or DEFAULT_SERIALIZER).lower(),
+            rate_limit=float(rate_limit or DEFAULT_RATE_LIMIT),
+            rate_limit_burst=int(rate_limit_burst or 0),
+            rate_limit_summary_interval=int(
+                rate_limit_summary_interval or
+                DEFAULT_RATE_LIMIT_SUMMARY_INTERVAL),
+            sample_rates=parse_sample_rates(sample_rates),
+            shared_handlers=parse_bool(shared_handlers),
+            collector_address=collector_address or DEFAULT_COLLECTOR_ADDRESS,
+            datagram_max_bytes=int(
+                datagram_max_bytes or DEFAULT_DATAGRAM_MAX_BYTES),
+            transport=(transport or Transport.TCP).lower(),
+            spool_dir=spool_dir,
+            spool_max_bytes=int(spool_max_bytes or DEFAULT_SPOOL_MAX_BYTES),
+            compression=(compression or DEFAULT_COMPRESSION).lower(),
+            compression_level=(
+                int(compression_level) if compression_level else None),
+            timestamp_format=(timestamp_format or DEFAULT_TIMESTAMP_FORMAT).lower(),
+            extra_namespace=extra_namespace,
+            max_message_length=int(max_message_length or 0),
+            max_field_length=int(max_field_length or 0),
+            max_payload_depth=int(max_payload_depth or 0),
+            max_list_length=int(max_list_length or 0),
+            max_record_bytes=int(max_record_bytes or 0),
+            profile_event_handlers=parse_bool(profile_event_handlers),
+            slow_event_handler_ms=float(
+                slow_event_handler_ms or DEFAULT_SLOW_EVENT_HANDLER_MS),
+            stackdriver_batching=parse_bool(stackdriver_batching),
+        )
 
     def set_provider(self, value):
         self._provider = value
+        self.reload()
 
     def get_provider(self):
-        provider = self._provider or os.getenv('TEMLOGGER_PROVIDER', '')
-        return (provider or LoggingProvider.DEFAULT).lower()
+        return self.resolved().provider
 
     def set_url(self, value):
         self._url = value
+        self.reload()
 
     def get_url(self):
-        return self._url or os.getenv('TEMLOGGER_URL', '')
+        return self.resolved().url
 
     def set_port(self, value):
         self._port = value
+        self.reload()
 
     def get_port(self):
-        return self._port or os.getenv('TEMLOGGER_PORT', '')
+        return self.resolved().port
 
     def set_environment(self, value):
         self._environment = value
+        self.reload()
 
     def get_environment(self):
-        return self._environment or os.getenv('TEMLOGGER_ENVIRONMENT', '')
+        return self.resolved().environment
 
     def set_google_credentials_base64(self, value):
         self._google_credentials_base64 = value
+        self.reload()
 
     def get_google_credentials_base64(self):
-        google_cred = self._google_credentials_base64
-        return google_cred or os.getenv('TEMLOGGER_GOOGLE_CREDENTIALS_BASE64', '')
+        return self.resolved().google_credentials_base64
 
     def get_event_handlers(self):
         return self._event_handlers
 
+    def get_event_handlers_version(self):
+        """Changes every time the global event handlers are replaced."""
+        return self._event_handlers_version
+
     def setup_event_handlers(self, event_handlers=[]):
         self._event_handlers = import_string_list(event_handlers)
+        self._event_handlers_version += 1
 
     def set_log_level(self, value):
         """Acceptable parameters: DEBUG, INFO, WARNING, ERROR, FATAL, CRITICAL"""
         self._log_level = value
+        self.reload()
+        logger_manager.refresh_log_levels()
 
     def get_log_level(self):
-        env_log_level = os.getenv('TEMLOGGER_LOG_LEVEL', '')
-        log_level = self._log_level or env_log_level
-        return (log_level or DEFAULT_LOG_LEVEL).upper()
+        return self.resolved().log_level
 
     def get_log_level_parsed(self):
         """Return instance logging.INFO"""
-        log_level_upper = self.get_log_level().upper()
-        return logging.getLevelName(log_level_upper)
+        return self.resolved().log_level_parsed
+
+    def set_log_levels(self, value):
+        """
+        Per-logger level overrides, as a dict or a string such as
+        'payments=DEBUG,urllib3=WARNING'. Child loggers inherit the level of
+        the closest configured parent.
+        """
+        self._log_levels = value
+        self.reload()
+        logger_manager.refresh_log_levels()
+
+    def get_log_levels(self):
+        """Return a dict of logger name to parsed level."""
+        return self.resolved().log_levels
+
+    def get_log_level_for(self, name):
+        """Return the parsed level of logger `name`."""
+        resolved = self.resolved()
+        cache = resolved.log_level_cache
+        try:
+            return cache[name]
+        except KeyError:
+            pass
+
+        level = resolved.log_level_parsed
+        candidate = name
+        while candidate:
+            if candidate in resolved.log_levels:
+                level = resolved.log_levels[candidate]
+                break
+            candidate = candidate.rpartition('.')[0]
+
+        cache[name] = level
+        return level
+
+    def set_handler_log_level(self, value):
+        """Level of the handlers attached by temlogger, NOTSET by default."""
+        self._handler_log_level = value
+        self.reload()
+        logger_manager.refresh_log_levels()
+
+    def get_handler_log_level(self):
+        return self.resolved().handler_log_level
+
+    def get_handler_log_level_parsed(self):
+        return self.resolved().handler_log_level_parsed
 
     def set_app_name(self, value):
         self._app_name = value
+        self.reload()
 
     def get_app_name(self):
-        return self._app_name or os.getenv('TEMLOGGER_APP_NAME', '')
+        return self.resolved().app_name
+
+    def set_delivery_mode(self, value):
+        """Acceptable parameters: direct, queue, collector, asyncio"""
+        self._delivery_mode = value
+        self.reload()
+
+    def get_delivery_mode(self):
+        return self.resolved().delivery_mode
+
+    def set_queue_max_size(self, value):
+        self._queue_max_size = value
+        self.reload()
+
+    def get_queue_max_size(self):
+        return self.resolved().queue_max_size
+
+    def set_queue_overflow_policy(self, value):
+        """Acceptable parameters: block, drop_newest, drop_oldest"""
+        self._queue_overflow_policy = value
+        self.reload()
+
+    def get_queue_overflow_policy(self):
+        return self.resolved().queue_overflow_policy
+
+    def set_batch_max_bytes(self, value):
+        self._batch_max_bytes = value
+        self.reload()
+
+    def get_batch_max_bytes(self):
+        return self.resolved().batch_max_bytes
+
+    def set_batch_max_records(self, value):
+        self._batch_max_records = value
+        self.reload()
+
+    def get_batch_max_records(self):
+        return self.resolved().batch_max_records
+
+    def set_batch_max_linger_ms(self, value):
+        """
+        Longest wait of a batch before it is sent. Defaults to 200 ms when
+        batches hold more than one record.
+        """
+        self._batch_max_linger_ms = value
+        self.reload()
+
+    def get_batch_max_linger_ms(self):
+        return self.resolved().batch_max_linger_ms
+
+    def set_serializer(self, value):
+        """Acceptable parameters: auto, json, orjson, ujson"""
+        self._serializer = value
+        self.reload()
+
+    def get_serializer(self):
+        return self.resolved().serializer
+
+    def set_rate_limit(self, value):
+        """
+        Records per second allowed for each logger and message template.
+        0 disables rate limiting.
+        """
+        self._rate_limit = value
+        self.reload()
+
+    def get_rate_limit(self):
+        return self.resolved().rate_limit
+
+    def set_rate_limit_burst(self, value):
+        """Records allowed at once before the rate applies."""
+        self._rate_limit_burst = value
+        self.reload()
+
+    def get_rate_limit_burst(self):
+        return self.resolved().rate_limit_burst
+
+    def set_rate_limit_summary_interval(self, value):
+        """Seconds between summaries of suppressed records."""
+        self._rate_limit_summary_interval = value
+        self.reload()
+
+    def get_rate_limit_summary_interval(self):
+        return self.resolved().rate_limit_summary_interval
+
+    def set_sample_rates(self, value):
+        """
+        Fraction of records kept per level, as a dict or a string such as
+        'DEBUG=0.1,INFO=0.5'.
+        """
+        self._sample_rates = value
+        self.reload()
+
+    def get_sample_rates(self):
+        """Return a dict of level number to sample rate."""
+        return self.resolved().sample_rates
+
+    def set_shared_handlers(self, value):
+        """
+        When enabled, console and logstash loggers with the same handler
+        configuration share one handler instead of one per logger name.
+        """
+        self._shared_handlers = value
+        self.reload()
+
+    def get_shared_handlers(self):
+        return self.resolved().shared_handlers
+
+    def set_collector_address(self, value):
+        """Unix socket path of the collector used in `collector` delivery mode."""
+        self._collector_address = value
+        self.reload()
+
+    def get_collector_address(self):
+        return self.resolved().collector_address
+
+    def set_datagram_max_bytes(self, value):
+        self._datagram_max_bytes = value
+        self.reload()
+
+    def get_datagram_max_bytes(self):
+        return self.resolved().datagram_max_bytes
+
+    def set_transport(self, value):
+        """Acceptable parameters: tcp, udp, unix"""
+        self._transport = value
+        self.reload()
+
+    def get_transport(self):
+        return self.resolved().transport
+
+    def set_spool_dir(self, value):
+        """Directory of the disk spool, disabled when empty"""
+        self._spool_dir = value
+        self.reload()
+
+    def get_spool_dir(self):
+        return self.resolved().spool_dir
+
+    def set_spool_max_bytes(self, value):
+        self._spool_max_bytes = value
+        self.reload()
+
+    def get_spool_max_bytes(self):
+        return self.resolved().spool_max_bytes
+
+    def set_compression(self, value):
+        """Acceptable parameters: none, gzip, zstd"""
+        self._compression = value
+        self.reload()
+
+    def get_compression(self):
+        return self.resolved().compression
+
+    def set_compression_level(self, value):
+        self._compression_level = value
+        self.reload()
+
+    def get_compression_level(self):
+        return self.resolved().compression_level
+
+    def set_timestamp_format(self, value):
+        """Acceptable parameters: iso8601, epoch_millis, rfc3339_nanos"""
+        self._timestamp_format = value
+        self.reload()
+
+    def get_timestamp_format(self):
+        return self.resolved().timestamp_format
+
+    def set_extra_namespace(self, value):
+        """Take extra fields only from extra={value: {...}}"""
+        self._extra_namespace = value
+        self.reload()
+
+    def get_extra_namespace(self):
+        return self.resolved().extra_namespace
+
+    def set_max_message_length(self, value):
+        self._max_message_length = value
+        self.reload()
+
+    def get_max_message_length(self):
+        return self.resolved().max_message_length
+
+    def set_max_field_length(self, value):
+        self._max_field_length = value
+        self.reload()
+
+    def get_max_field_length(self):
+        return self.resolved().max_field_length
+
+    def set_max_payload_depth(self, value):
+        self._max_payload_depth = value
+        self.reload()
+
+    def get_max_payload_depth(self):
+        return self.resolved().max_payload_depth
+
+    def set_max_list_length(self, value):
+        self._max_list_length = value
+        self.reload()
+
+    def get_max_list_length(self):
+        return self.resolved().max_list_length
+
+    def set_max_record_bytes(self, value):
+        self._max_record_bytes = value
+        self.reload()
+
+    def get_max_record_bytes(self):
+        return self.resolved().max_record_bytes
+
+    def set_profile_event_handlers(self, value):
+        """Time every event handler, see `temlogger.event_handler_stats`."""
+        self._profile_event_handlers = value
+        self._event_handlers_version += 1
+        self.reload()
+
+    def get_profile_event_handlers(self):
+        return self.resolved().profile_event_handlers
+
+    def set_slow_event_handler_ms(self, value):
+        """
+        Profiled event handlers slower than this warn once. `0` disables
+        the warning.
+        """
+        self._slow_event_handler_ms = str(value)
+        self._event_handlers_version += 1
+        self.reload()
+
+    def get_slow_event_handler_ms(self):
+        return self.resolved().slow_event_handler_ms
+
+    def set_stackdriver_batching(self, value):
+        """
+        Write StackDriver entries in batches with temlogger's
+        StackDriverHandler, instead of the handler google picks for the
+        environment.
+        """
+        self._stackdriver_batching = value
+        self.reload()
+
+    def get_stackdriver_batching(self):
+        return self.resolved().stackdriver_batching
 
     def reset(self):
         self._provider = ''
@@ -96,8 +722,46 @@ class LoggingConfig:
         self._environment = ''
         self._google_credentials_base64 = ''
         self._event_handlers = []
+        self._event_handlers_version += 1
         self._log_level = ''
+        self._log_levels = ''
+        self._handler_log_level = ''
         self._app_name = ''
+        self._delivery_mode = ''
+        self._queue_max_size = ''
+        self._queue_overflow_policy = ''
+        self._batch_max_bytes = ''
+        self._batch_max_records = ''
+        self._batch_max_linger_ms = ''
+        self._serializer = ''
+        self._rate_limit = ''
+        self._rate_limit_burst = ''
+        self._rate_limit_summary_interval = ''
+        self._sample_rates = ''
+        self._shared_handlers = ''
+        self._collector_address = ''
+        self._datagram_max_bytes = ''
+        self._transport = ''
+        self._spool_dir = ''
+        self._spool_max_bytes = ''
+        self._compression = ''
+        self._compression_level = ''
+        self._timestamp_format = ''
+        self._extra_namespace = ''
+        self._max_message_length = ''
+        self._max_field_length = ''
+        self._max_payload_depth = ''
+        self._max_list_length = ''
+        self._max_record_bytes = ''
+        self._profile_event_handlers = ''
+        self._slow_event_handler_ms = ''
+        self._stackdriver_batching = ''
+        self.reload()
+
+
+def get_level_settings(resolved):
+    """Settings of `resolved` that `refresh_log_levels` applies."""
+    return (resolved.log_level, resolved.log_levels, resolved.handler_log_level)
 
 
 class LoggerManager:
@@ -110,24 +774,159 @@ class LoggerManager:
             LoggingProvider.CONSOLE: self.get_logger_console,
         }
 
+        # Level settings last applied by refresh_log_levels
+        self.applied_levels = None
+        self.shared_handlers = {}
+        self.lock = threading.Lock()
+
+    def after_fork(self):
+        # Another thread of the parent may have held the lock while forking
+        self.lock = threading.Lock()
+
     def get_logger(self, name, event_handlers=[]):
-        logging_provider = config.get_provider()
+        resolved = config.resolved()
+        logging_provider = resolved.provider
+
+        # Levels set through the environment are applied on the next
+        # getLogger. Other settings changing must not reset the level of
+        # loggers set by the application.
+        if get_level_settings(resolved) != self.applied_levels:
+            self.refresh_log_levels()
 
         logger = logging.getLogger(name)
         has_log_provider = hasattr(logger, 'logging_provider')
         if has_log_provider and logger.logging_provider == logging_provider:
             return logger
 
-        logger.handlers.clear()
+        self.detach_handlers(logger)
 
         func = self.logger_map.get(logging_provider, self.get_logger_default)
 
+        collected = (LoggingProvider.LOGSTASH, LoggingProvider.STACK_DRIVER)
+        if (resolved.delivery_mode == DeliveryMode.COLLECTOR and
+                logging_provider in collected):
+            func = self.get_logger_collector
+
         return func(name, event_handlers)
 
+    def add_handler(self, logger, handler):
+        if hasattr(handler, 'logging_provider'):
+            # Shared handler already set up by another logger
+            logger.addHandler(handler)
+            return
+
+        handler.setLevel(config.get_handler_log_level_parsed())
+        handler.logging_provider = logger.logging_provider
+
+        if config.get_rate_limit() or config.get_sample_rates():
+            from .filters import RateLimitFilter
+            from .handlers.base import track_handler
+            from .handlers.base import tracked_handlers
+
+            if handler not in tracked_handlers():
+                # Summaries pending at exit are emitted before closing
+                track_handler(handler)
+
+            handler.addFilter(RateLimitFilter(
+                handler,
+                rate=config.get_rate_limit(),
+                burst=config.get_rate_limit_burst(),
+                sample_rates=config.get_sample_rates(),
+                summary_interval=config.get_rate_limit_summary_interval()
+            ))
+
+        logger.addHandler(handler)
+
+    def detach_handlers(self, logger):
+        """
+        Remove handlers from `logger`, closing the ones temlogger created for
+        it. Handlers added by the application are detached but left open.
+        """
+        from .handlers.base import close_filters
+
+        for handler in logger.handlers:
+            if not hasattr(handler, 'logging_provider'):
+                continue
+
+            if getattr(handler, 'shared', False):
+                handler.router.remove(logger.name)
+            else:
+                close_filters(handler)
+                handler.close()
+
+        logger.handlers.clear()
+
+    def get_handler(self, name, key, factory, formatter):
+        """
+        Return a handler for logger `name`. With shared handlers enabled,
+        loggers whose handler configuration has the same `key` share one
+        handler, otherwise `factory` builds a new one.
+        """
+        if not config.get_shared_handlers():
+            return factory(formatter)
+
+        handler = self.get_shared_handler(key, factory, formatter)
+        handler.router.add(name, formatter)
+
+        return handler
+
+    def get_shared_handler(self, key, factory, formatter):
+        """
+        Return the handler stored under `key`, calling `factory` with a
+        FormatterRouter on first use. The router formats records with the
+        formatter of each logger attached to the handler.
+        """
+        from .providers.base import FormatterRouter
+
+        with self.lock:
+            handler = self.shared_handlers.get(key)
+            if handler is None:
+                router = FormatterRouter(formatter)
+                handler = factory(router)
+                handler.router = router
+                handler.shared = True
+                self.shared_handlers[key] = handler
+
+        return handler
+
+    def clear_shared_handlers(self):
+        """Forget shared handlers, so new loggers create them again."""
+        with self.lock:
+            self.shared_handlers.clear()
+
+    def refresh_log_levels(self):
+        """
+        Apply the configured levels to loggers and handlers created by
+        temlogger and to loggers named in the per-logger overrides.
+        `Logger.setLevel` also clears the `isEnabledFor` cache.
+        Unknown level names are left for `getLogger` to report.
+        """
+        self.applied_levels = get_level_settings(config.resolved())
+        handler_level = config.get_handler_log_level_parsed()
+
+        for name, level in config.get_log_levels().items():
+            if isinstance(level, int):
+                logging.getLogger(name).setLevel(level)
+
+        for logger in list(logging.Logger.manager.loggerDict.values()):
+            if not hasattr(logger, 'logging_provider'):
+                continue
+
+            level = config.get_log_level_for(logger.name)
+            if isinstance(level, int):
+                logger.setLevel(level)
+
+            if not isinstance(handler_level, int):
+                continue
+
+            for handler in logger.handlers:
+                if hasattr(handler, 'logging_provider'):
+                    handler.setLevel(handler_level)
+
     def get_logger_default(self, name, event_handlers=[]):
 
         logger = logging.getLogger(name)
-        logger.setLevel(config.get_log_level_parsed())
+        logger.setLevel(config.get_log_level_for(name))
         logger.logging_provider = LoggingProvider.DEFAULT
 
         return logger
@@ -139,53 +938,272 @@ class LoggerManager:
         app_name = config.get_app_name()
 
         logger = logging.getLogger(name)
-        logger.setLevel(config.get_log_level_parsed())
+        logger.setLevel(config.get_log_level_for(name))
         logger.logging_provider = LoggingProvider.CONSOLE
 
-        handler = logging.StreamHandler()
-        handler.setFormatter(ConsoleFormatter(
+        formatter = ConsoleFormatter(
             app_name=app_name,
             environment=logging_environment,
             event_handlers=event_handlers
-        ))
-        logger.addHandler(handler)
+        )
+        handler = self.get_handler(
+            name,
+            (LoggingProvider.CONSOLE,),
+            self.create_console_handler,
+            formatter
+        )
+        self.add_handler(logger, handler)
 
         return logger
 
+    def create_console_handler(self, formatter):
+        handler = logging.StreamHandler()
+        handler.setFormatter(formatter)
+        return handler
+
     def get_logger_logstash(self, name, event_handlers=[]):
-        from logstash import TCPLogstashHandler
         from .providers.logstash import LogstashFormatter
 
-        logging_url = config.get_url()
-        logging_port = config.get_port()
         logging_environment = config.get_environment()
         app_name = config.get_app_name()
 
         logger = logging.getLogger(name)
-        logger.setLevel(config.get_log_level_parsed())
+        logger.setLevel(config.get_log_level_for(name))
         logger.logging_provider = LoggingProvider.LOGSTASH
 
-        handler = TCPLogstashHandler(logging_url, logging_port, version=1)
-        handler.setFormatter(LogstashFormatter(
+        formatter = LogstashFormatter(
             app_name=app_name,
             environment=logging_environment,
             event_handlers=event_handlers
-        ))
-        logger.addHandler(handler)
+        )
+        resolved = config.resolved()
+        key = (
+            LoggingProvider.LOGSTASH,
+            resolved.url,
+            resolved.port,
+            resolved.transport,
+            resolved.datagram_max_bytes,
+            resolved.spool_dir,
+            resolved.spool_max_bytes,
+            resolved.compression,
+            resolved.compression_level,
+            resolved.delivery_mode,
+            resolved.queue_max_size,
+            resolved.queue_overflow_policy,
+            resolved.batch_max_bytes,
+            resolved.batch_max_records,
+            resolved.batch_max_linger_ms,
+        )
+        handler = self.get_handler(
+            name, key, self.create_logstash_handler, formatter)
+        self.add_handler(logger, handler)
 
         return logger
 
+    def create_logstash_handler(self, formatter):
+        from .compression import get_compressor
+        from .handlers.logstash import LogstashTCPHandler
+
+        if config.get_transport() != Transport.TCP:
+            return self.create_logstash_datagram_handler(formatter)
+
+        if config.get_delivery_mode() == DeliveryMode.ASYNCIO:
+            return self.create_async_logstash_handler(formatter)
+
+        handler = LogstashTCPHandler(
+            config.get_url(),
+            config.get_port(),
+            max_batch_bytes=config.get_batch_max_bytes(),
+            max_batch_records=config.get_batch_max_records(),
+            max_linger_ms=config.get_batch_max_linger_ms(),
+            spool=self.create_spool(config.get_url(), config.get_port()),
+            compressor=get_compressor(
+                config.get_compression(), config.get_compression_level())
+        )
+        handler.setFormatter(formatter)
+
+        return self.wrap_delivery(handler)
+
+    def create_spool(self, host, port, provider=LoggingProvider.LOGSTASH):
+        """
+        Disk spool for records that can't be delivered to `host:port` (or to
+        StackDriver project `port`), or None when `TEMLOGGER_SPOOL_DIR` is
+        not set. Records it drops are counted in the metrics of `provider`.
+        """
+        spool_dir = config.get_spool_dir()
+        if not spool_dir:
+            return None
+
+        from .spool import DiskSpool
+
+        return DiskSpool(
+            os.path.join(spool_dir, '%s-%s' % (host, port)),
+            max_bytes=config.get_spool_max_bytes(),
+            provider=provider
+        )
+
+    def create_logstash_datagram_handler(self, formatter):
+        """
+        Fire and forget delivery over UDP, or to a Unix datagram socket at
+        `url` with the `unix` transport.
+        """
+        from .handlers.logstash import LogstashDatagramHandler
+
+        transport = config.get_transport()
+        if transport == Transport.UNIX:
+            port = None
+        elif transport == Transport.UDP:
+            port = int(config.get_port())
+        else:
+            raise ValueError('Unknown transport %r' % transport)
+
+        handler = LogstashDatagramHandler(
+            config.get_url(),
+            port,
+            max_datagram_bytes=config.get_datagram_max_bytes(),
+            max_batch_records=config.get_batch_max_records(),
+            max_linger_ms=config.get_batch_max_linger_ms()
+        )
+        handler.setFormatter(formatter)
+
+        return self.wrap_delivery(handler)
+
+    def create_async_logstash_handler(self, formatter):
+        from .handlers.aio import AsyncLogstashHandler
+
+        overflow_policy = config.get_queue_overflow_policy()
+        if overflow_policy == OverflowPolicy.BLOCK:
+            # Blocking would stall the event loop
+            overflow_policy = OverflowPolicy.DROP_NEWEST
+
+        handler = AsyncLogstashHandler(
+            config.get_url(),
+            config.get_port(),
+            max_batch_bytes=config.get_batch_max_bytes(),
+            max_batch_records=config.get_batch_max_records(),
+            max_linger_ms=config.get_batch_max_linger_ms(),
+            max_size=config.get_queue_max_size(),
+            overflow_policy=overflow_policy
+        )
+        handler.setFormatter(formatter)
+
+        return handler
+
+    def wrap_delivery(self, handler):
+        """
+        Route records through a background queue when delivery mode is
+        `queue`, so the caller thread never waits on network I/O.
+        """
+        if config.get_delivery_mode() != DeliveryMode.QUEUE:
+            return handler
+
+        from .handlers.queued import QueuedHandler
+
+        return QueuedHandler(
+            handler,
+            max_size=config.get_queue_max_size(),
+            overflow_policy=config.get_queue_overflow_policy()
+        )
+
+    def get_logger_collector(self, name, event_handlers=[]):
+        """
+        Send records to the local collector process, which ships them to
+        the configured provider on behalf of every worker of the host.
+        """
+        from .providers.collector import CollectorFormatter
+
+        logging_environment = config.get_environment()
+        app_name = config.get_app_name()
+
+        logger = logging.getLogger(name)
+        logger.setLevel(config.get_log_level_for(name))
+        logger.logging_provider = config.get_provider()
+
+        formatter = CollectorFormatter(
+            app_name=app_name,
+            environment=logging_environment,
+            event_handlers=event_handlers
+        )
+        resolved = config.resolved()
+        key = (
+            DeliveryMode.COLLECTOR,
+            resolved.collector_address,
+            resolved.batch_max_bytes,
+            resolved.batch_max_records,
+            resolved.batch_max_linger_ms,
+        )
+        handler = self.get_handler(
+            name, key, self.create_collector_handler, formatter)
+        self.add_handler(logger, handler)
+
+        return logger
+
+    def create_collector_handler(self, formatter):
+        from .handlers.logstash import LogstashTCPHandler
+
+        # A port of None makes SocketHandler connect to a Unix socket
+        handler = LogstashTCPHandler(
+            config.get_collector_address(),
+            None,
+            max_batch_bytes=config.get_batch_max_bytes(),
+            max_batch_records=config.get_batch_max_records(),
+            max_linger_ms=config.get_batch_max_linger_ms()
+        )
+        handler.provider = DeliveryMode.COLLECTOR
+        handler.setFormatter(formatter)
+
+        return handler
+
     def get_logger_stackdriver(self, name, event_handlers=[]):
         """
         Docs: https://googleapis.dev/python/logging/latest/handlers.html
+
+        Loggers using the same credentials and delivery settings share one
+        client and handler. With batching enabled, the handler writes
+        structured entries in batches.
         """
-        import google.cloud.logging
         from .providers.stackdriver import StackDriverFormatter
 
         app_name = config.get_app_name()
         logging_environment = config.get_environment()
         base64_cred = config.get_google_credentials_base64()
 
+        logger = logging.getLogger(name)
+        logger.setLevel(config.get_log_level_for(name))
+        logger.logging_provider = LoggingProvider.STACK_DRIVER
+
+        formatter = StackDriverFormatter(
+            app_name=app_name,
+            environment=logging_environment,
+            event_handlers=event_handlers
+        )
+        resolved = config.resolved()
+        key = (
+            LoggingProvider.STACK_DRIVER,
+            base64_cred,
+            resolved.stackdriver_batching,
+            resolved.spool_dir,
+            resolved.spool_max_bytes,
+            resolved.queue_max_size,
+            resolved.batch_max_bytes,
+            resolved.batch_max_records,
+            resolved.batch_max_linger_ms,
+        )
+        handler = self.get_shared_handler(
+            key,
+            lambda router: self.create_stackdriver_handler(base64_cred, router),
+            formatter
+        )
+
+        # Setup logger explicitly with this handler
+        handler.router.add(name, formatter)
+        self.add_handler(logger, handler)
+
+        return logger
+
+    def create_stackdriver_handler(self, base64_cred, formatter):
+        import google.cloud.logging
+
         if base64_cred:
             scopes = ['https://www.googleapis.com/auth/cloud-platform']
             client = load_google_client(base64_cred, scopes=scopes)
@@ -193,27 +1211,53 @@ class LoggerManager:
             client = google.cloud.logging.Client()
             warnings.warn(DEPRECATE_MESSAGE, DeprecationWarning, stacklevel=2)
 
-        logger = logging.getLogger(name)
-        logger.setLevel(config.get_log_level_parsed())
-        logger.logging_provider = LoggingProvider.STACK_DRIVER
+        if config.get_stackdriver_batching():
+            handler = self.create_stackdriver_batch_handler(client)
+        else:
+            handler = self.create_stackdriver_default_handler(client)
+        handler.setFormatter(formatter)
 
-        handler = client.get_default_handler()
+        return handler
 
-        # Setup logger explicitly with this handler
-        handler.setFormatter(StackDriverFormatter(
-            app_name=app_name,
-            environment=logging_environment,
-            event_handlers=event_handlers)
-        )
+    def create_stackdriver_default_handler(self, client):
+        """
+        Handler picked by google for the environment, which sets the
+        monitored resource and labels of App Engine and GKE entries.
+        """
+        from .handlers.base import track_handler
+        from .handlers.stackdriver import reinit_cloud_logging_handler
 
-        logger.addHandler(handler)
+        handler = client.get_default_handler()
 
-        return logger
+        if hasattr(handler, 'transport'):
+            handler.after_fork = functools.partial(
+                reinit_cloud_logging_handler, handler)
+            track_handler(handler)
+
+        return handler
+
+    def create_stackdriver_batch_handler(self, client):
+        from .handlers.stackdriver import StackDriverHandler
+        from .serializers import get_serializer
+
+        return StackDriverHandler(
+            client,
+            max_batch_bytes=config.get_batch_max_bytes(),
+            max_batch_records=config.get_batch_max_records(),
+            max_linger_ms=config.get_batch_max_linger_ms(),
+            max_pending_records=config.get_queue_max_size(),
+            spool=self.create_spool(
+                'stackdriver', client.project, LoggingProvider.STACK_DRIVER),
+            serializer=get_serializer(config.get_serializer())
+        )
 
 
 config = LoggingConfig()
 logger_manager = LoggerManager()
 
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=logger_manager.after_fork)
+
 
 def getLogger(name: str, event_handlers=[]):
     """Creates a logger with .
@@ -230,7 +1274,49 @@ def getLogger(name: str, event_handlers=[]):
     return logger_manager.get_logger(name, event_handlers)
 
 
+def flush():
+    """Block until records buffered by temlogger handlers are delivered."""
+    from .handlers.base import flush_handlers
+
+    flush_handlers()
+
+
+def stats():
+    """
+    Return self-metrics of temlogger, per provider:
+
+    - `records`, `bytes`: records formatted and their serialized size
+    - `dropped`: records lost to full queues or failed deliveries
+    - `reconnects`: connections opened again after one was lost
+    - `queue_depth`: records waiting in memory right now
+    - `format_time`, `event_handler_time`, `send_time`: histograms with
+      `count`, `sum` and cumulative `buckets` of (upper bound, count),
+      in seconds
+    """
+    from . import metrics
+    from .handlers.base import tracked_handlers
+
+    return metrics.snapshot(tracked_handlers())
+
+
+def event_handler_stats(top=None):
+    """
+    Return calls, `total`, `mean`, `p99` and `max` time in seconds, and
+    `slow_calls`, of every event handler timed since profiling was enabled
+    with `config.set_profile_event_handlers(True)`, slowest cumulative time
+    first. `top` limits the number of handlers returned.
+    """
+    from .profiling import profiler
+
+    return profiler.report(top)
+
+
 __all__ = [
     'getLogger',
     'config',
+    'flush',
+    'stats',
+    'event_handler_stats',
+    'static_event_handler',
+    'register_value_converter',
 ]
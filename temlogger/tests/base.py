@@ -1,4 +1,8 @@
+import logging
 import os
+import socketserver
+import threading
+import time
 import temlogger
 
 
@@ -11,18 +15,101 @@ def clean_temlogger_config():
     environments_to_clean = [
         'TEMLOGGER_PROVIDER',
         'TEMLOGGER_URL',
-        'TEMLOGGER_PORT'
+        'TEMLOGGER_PORT',
         'TEMLOGGER_ENVIRONMENT',
+        'TEMLOGGER_GOOGLE_CREDENTIALS_BASE64',
         'TEMLOGGER_LOG_LEVEL',
+        'TEMLOGGER_LOG_LEVELS',
+        'TEMLOGGER_HANDLER_LOG_LEVEL',
         'TEMLOGGER_APP_NAME',
+        'TEMLOGGER_DELIVERY_MODE',
+        'TEMLOGGER_QUEUE_MAX_SIZE',
+        'TEMLOGGER_QUEUE_OVERFLOW_POLICY',
+        'TEMLOGGER_BATCH_MAX_BYTES',
+        'TEMLOGGER_BATCH_MAX_RECORDS',
+        'TEMLOGGER_BATCH_MAX_LINGER_MS',
+        'TEMLOGGER_SERIALIZER',
+        'TEMLOGGER_RATE_LIMIT',
+        'TEMLOGGER_RATE_LIMIT_BURST',
+        'TEMLOGGER_RATE_LIMIT_SUMMARY_INTERVAL',
+        'TEMLOGGER_SAMPLE_RATES',
+        'TEMLOGGER_SHARED_HANDLERS',
+        'TEMLOGGER_COLLECTOR_ADDRESS',
+        'TEMLOGGER_DATAGRAM_MAX_BYTES',
+        'TEMLOGGER_TRANSPORT',
+        'TEMLOGGER_SPOOL_DIR',
+        'TEMLOGGER_SPOOL_MAX_BYTES',
+        'TEMLOGGER_COMPRESSION',
+        'TEMLOGGER_COMPRESSION_LEVEL',
+        'TEMLOGGER_TIMESTAMP_FORMAT',
+        'TEMLOGGER_EXTRA_NAMESPACE',
+        'TEMLOGGER_MAX_MESSAGE_LENGTH',
+        'TEMLOGGER_MAX_FIELD_LENGTH',
+        'TEMLOGGER_MAX_PAYLOAD_DEPTH',
+        'TEMLOGGER_MAX_LIST_LENGTH',
+        'TEMLOGGER_MAX_RECORD_BYTES',
+        'TEMLOGGER_PROFILE_EVENT_HANDLERS',
+        'TEMLOGGER_SLOW_EVENT_HANDLER_MS',
+        'TEMLOGGER_STACKDRIVER_BATCHING',
     ]
     for env in environments_to_clean:
         if env in os.environ:
             del os.environ[env]
 
     temlogger.config.reset()
+    temlogger.temlogger.logger_manager.clear_shared_handlers()
+
+
+def make_record(msg):
+    return logging.makeLogRecord({'msg': msg, 'levelno': logging.INFO})
 
 
 def add_tracker_id_to_message(message):
     message['tracker_id_global'] = 'tracker_id_value_global'
     return message
+
+
+class ReusableTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+
+
+class TCPSink:
+    """Local TCP server standing in for Logstash in tests and benchmarks."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        sink = self
+        self.data = bytearray()
+        self.connections = 0
+        self.lock = threading.Lock()
+
+        class RequestHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with sink.lock:
+                    sink.connections += 1
+                while True:
+                    chunk = self.request.recv(65536)
+                    if not chunk:
+                        break
+                    with sink.lock:
+                        sink.data += chunk
+
+        self.server = ReusableTCPServer((host, port), RequestHandler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def lines(self):
+        with self.lock:
+            return bytes(self.data).decode('utf-8').splitlines()
+
+    def wait_for_lines(self, count, timeout=5):
+        deadline = time.time() + timeout
+        while len(self.lines()) < count and time.time() < deadline:
+            time.sleep(0.01)
+        return self.lines()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import sys
+import unittest
+
+import temlogger
+import temlogger.aio
+
+from .base import TCPSink
+from .base import add_tracker_id_to_message
+from .base import clean_temlogger_config
+from ..handlers.aio import AsyncLogstashHandler
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'asyncio delivery needs 3.7+')
+class TestAsyncioDelivery(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.sink = TCPSink()
+        self.addCleanup(self.sink.stop)
+
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_url(self.sink.host)
+        temlogger.config.set_port(str(self.sink.port))
+        temlogger.config.set_environment('test')
+        temlogger.config.set_delivery_mode('asyncio')
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def get_logger(self, name, **kwargs):
+        logger = temlogger.aio.getLogger(name, **kwargs)
+        self.addCleanup(logger.handlers[0].close)
+        return logger
+
+    def close_loop(self, loop):
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(
+            asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+    def messages(self, count):
+        return [json.loads(line) for line in self.sink.wait_for_lines(count)]
+
+    def test_uses_async_handler(self):
+        logger = self.get_logger('aio-handler')
+
+        self.assertIsInstance(logger.handlers[0], AsyncLogstashHandler)
+
+    def test_flush_delivers_records_logged_in_coroutines(self):
+        logger = self.get_logger(
+            'aio-flush',
+            event_handlers=[add_tracker_id_to_message])
+
+        async def main():
+            for index in range(10):
+                logger.info('message %d', index)
+            await temlogger.aio.flush()
+
+        asyncio.run(main())
+
+        messages = self.messages(10)
+        self.assertEqual(
+            [message['message'] for message in messages],
+            ['message %d' % index for index in range(10)])
+        self.assertEqual(messages[0]['environment'], 'test')
+        self.assertEqual(
+            messages[0]['tracker_id_global'], 'tracker_id_value_global')
+
+    def test_batches_records(self):
+        temlogger.config.set_batch_max_records(100)
+        temlogger.config.set_batch_max_linger_ms(20)
+        logger = self.get_logger('aio-batch')
+
+        async def main():
+            for index in range(5):
+                logger.info('message %d', index)
+            await temlogger.aio.flush()
+
+        asyncio.run(main())
+
+        self.assertEqual(len(self.messages(5)), 5)
+        self.assertEqual(self.sink.connections, 1)
+
+    def test_records_logged_before_the_loop_are_delivered(self):
+        logger = self.get_logger('aio-pending')
+        logger.info('before loop')
+
+        async def main():
+            logger.info('in loop')
+            await temlogger.aio.flush()
+
+        asyncio.run(main())
+
+        self.assertEqual(
+            [message['message'] for message in self.messages(2)],
+            ['before loop', 'in loop'])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        temlogger.config.set_queue_max_size(2)
+        logger = self.get_logger('aio-overflow')
+        handler = logger.handlers[0]
+
+        async def main():
+            # The writer task can't run before the coroutine yields
+            for index in range(5):
+                logger.info('message %d', index)
+            await temlogger.aio.flush()
+
+        asyncio.run(main())
+
+        self.assertEqual(handler.dropped_newest, 3)
+        self.assertEqual(
+            [message['message'] for message in self.messages(2)],
+            ['message 0', 'message 1'])
+
+    def test_drop_oldest(self):
+        temlogger.config.set_queue_max_size(2)
+        temlogger.config.set_queue_overflow_policy('drop_oldest')
+        logger = self.get_logger('aio-drop-oldest')
+        handler = logger.handlers[0]
+
+        async def main():
+            for index in range(5):
+                logger.info('message %d', index)
+            await temlogger.aio.flush()
+
+        asyncio.run(main())
+
+        self.assertEqual(handler.dropped_oldest, 3)
+        self.assertEqual(
+            [message['message'] for message in self.messages(2)],
+            ['message 3', 'message 4'])
+
+    def test_close_sends_records_left_by_a_stopped_loop(self):
+        logger = self.get_logger('aio-close')
+
+        async def main():
+            logger.info('not flushed')
+
+        asyncio.run(main())
+        logger.handlers[0].close()
+
+        self.assertEqual(
+            [message['message'] for message in self.messages(1)],
+            ['not flushed'])
+
+    def test_records_logged_while_the_loop_is_idle_are_delivered(self):
+        logger = self.get_logger('aio-idle')
+        handler = logger.handlers[0]
+        loop = asyncio.new_event_loop()
+        self.addCleanup(self.close_loop, loop)
+
+        async def main(message):
+            if message:
+                logger.info(message)
+            await temlogger.aio.flush()
+
+        loop.run_until_complete(main('first'))
+        logger.info('idle loop')
+        loop.run_until_complete(main(None))
+
+        self.assertEqual(len(handler.pending), 0)
+        self.assertEqual(
+            [message['message'] for message in self.messages(2)],
+            ['first', 'idle loop'])
+
+        logger.info('idle again')
+        loop.run_until_complete(main('second'))
+
+        self.assertEqual(
+            [message['message'] for message in self.messages(4)[2:]],
+            ['idle again', 'second'])
+
+    def test_pending_records_are_bounded(self):
+        temlogger.config.set_queue_max_size(2)
+        logger = self.get_logger('aio-pending-overflow')
+        handler = logger.handlers[0]
+
+        for index in range(5):
+            logger.info('message %d', index)
+
+        self.assertEqual(len(handler.pending), 2)
+        self.assertEqual(handler.dropped_newest, 3)
+
+    def test_handler_rebinds_to_a_new_loop(self):
+        logger = self.get_logger('aio-rebind')
+
+        async def main(message):
+            logger.info(message)
+            await temlogger.aio.flush()
+
+        asyncio.run(main('first loop'))
+        asyncio.run(main('second loop'))
+
+        self.assertEqual(
+            [message['message'] for message in self.messages(2)],
+            ['first loop', 'second loop'])
+
+
+@unittest.skipUnless(sys.version_info < (3, 7), 'asyncio delivery works')
+class TestAsyncioDeliveryUnsupported(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_get_logger_raises(self):
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_delivery_mode('asyncio')
+
+        with self.assertRaises(RuntimeError):
+            temlogger.getLogger('aio-unsupported')
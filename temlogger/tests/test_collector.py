@@ -0,0 +1,174 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+import temlogger
+
+from .base import TCPSink
+from .base import clean_temlogger_config
+from ..collector import Collector
+from ..collector import LogstashSink
+from ..collector import StackDriverSink
+from ..collector import create_collector
+from ..collector import create_sink
+from ..collector import parse_args
+from ..compression import GzipCompressor
+
+
+class TestCollector(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.sink = TCPSink()
+        self.addCleanup(self.sink.stop)
+
+        directory = tempfile.mkdtemp()
+        self.address = os.path.join(directory, 'temlogger.sock')
+        self.addCleanup(os.rmdir, directory)
+
+        self.collector = Collector(
+            self.address,
+            LogstashSink(self.sink.host, self.sink.port)
+        )
+        thread = threading.Thread(
+            target=self.collector.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.collector.server_close)
+        self.addCleanup(self.collector.shutdown)
+
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_environment('test')
+        temlogger.config.set_delivery_mode('collector')
+        temlogger.config.set_collector_address(self.address)
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_worker_logs_are_forwarded_to_logstash(self):
+        logger = temlogger.getLogger('collector-worker')
+        logger.info('from worker')
+        temlogger.flush()
+
+        lines = self.sink.wait_for_lines(1)
+        self.assertEqual(len(lines), 1)
+        message = json.loads(lines[0])
+        self.assertEqual(message['message'], 'from worker')
+        self.assertEqual(message['environment'], 'test')
+
+    def test_logger_keeps_configured_provider(self):
+        logger = temlogger.getLogger('collector-provider')
+
+        self.assertEqual(logger.logging_provider, 'logstash')
+        self.assertEqual(logger.handlers[0].port, None)
+        self.assertEqual(logger.handlers[0].host, self.address)
+
+    def test_many_workers_share_one_upstream_connection(self):
+        logger = temlogger.getLogger('collector-workers')
+        logger.info('first')
+        temlogger.flush()
+        self.sink.wait_for_lines(1)
+
+        # Another worker process has its own connection to the collector
+        logger.handlers[0].close()
+        logger.handlers[0].sock = None
+        logger.info('second')
+        temlogger.flush()
+
+        self.assertEqual(len(self.sink.wait_for_lines(2)), 2)
+        self.assertEqual(self.sink.connections, 1)
+
+
+class TestCollectorCompression(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.sink = TCPSink()
+        self.addCleanup(self.sink.stop)
+
+        directory = tempfile.mkdtemp()
+        self.address = os.path.join(directory, 'temlogger.sock')
+        self.addCleanup(os.rmdir, directory)
+
+        os.environ['TEMLOGGER_COMPRESSION'] = 'gzip'
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def serve(self, argv):
+        collector = create_collector(
+            parse_args(argv), LogstashSink(self.sink.host, self.sink.port))
+        thread = threading.Thread(
+            target=collector.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(collector.server_close)
+        self.addCleanup(collector.shutdown)
+        return collector
+
+    def test_unix_socket_ignores_compression_of_environment(self):
+        collector = self.serve(['--address', self.address])
+
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_delivery_mode('collector')
+        temlogger.config.set_collector_address(self.address)
+        logger = temlogger.getLogger('collector-compression-env')
+        logger.info('from worker')
+        temlogger.flush()
+
+        self.assertIsNone(collector.compressor)
+        message = json.loads(self.sink.wait_for_lines(1)[0])
+        self.assertEqual(message['message'], 'from worker')
+
+    def test_relay_uses_compression_of_environment(self):
+        collector = self.serve(['--listen', '127.0.0.1:0'])
+
+        self.assertIsInstance(collector.compressor, GzipCompressor)
+
+
+class TestStackDriverSink(unittest.TestCase):
+
+    def test_commit_batches_on_max_batch_records(self):
+        client = mock.Mock()
+        batch = client.logger.return_value.batch.return_value
+
+        sink = StackDriverSink(client, max_batch_records=2)
+        sink.write(b'{"message": "first", "level": "INFO"}\n')
+        self.assertEqual(batch.commit.call_count, 0)
+        sink.write(b'{"message": "second", "level": "ERROR"}\n')
+
+        self.assertEqual(batch.commit.call_count, 1)
+        batch.log_struct.assert_called_with(
+            {'message': 'second', 'level': 'ERROR'}, severity='ERROR')
+
+    def test_close_commits_pending_records(self):
+        client = mock.Mock()
+        batch = client.logger.return_value.batch.return_value
+
+        sink = StackDriverSink(client, max_batch_records=10)
+        sink.write(b'{"message": "first", "level": "INFO"}\n')
+        sink.close()
+
+        self.assertEqual(batch.commit.call_count, 1)
+
+
+class TestCreateSink(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_logstash_provider(self):
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_url('localhost')
+        temlogger.config.set_port('5000')
+
+        sink = create_sink()
+        self.addCleanup(sink.close)
+
+        self.assertIsInstance(sink, LogstashSink)
+        self.assertEqual(sink.handler.port, 5000)
@@ -0,0 +1,120 @@
+import gzip
+import json
+import threading
+import unittest
+
+import temlogger
+
+from .base import TCPSink
+from .base import clean_temlogger_config
+from ..collector import LogstashSink
+from ..collector import TCPCollector
+from ..compression import GzipCompressor
+from ..compression import ZstdCompressor
+from ..compression import get_compressor
+from ..compression import zstandard
+
+
+class TestGetCompressor(unittest.TestCase):
+
+    def test_none(self):
+        self.assertIsNone(get_compressor('none'))
+        self.assertIsNone(get_compressor(''))
+
+    def test_gzip_with_level(self):
+        compressor = get_compressor('gzip', 1)
+
+        self.assertIsInstance(compressor, GzipCompressor)
+        self.assertEqual(compressor.level, 1)
+
+    def test_gzip_default_level(self):
+        self.assertEqual(get_compressor('gzip').level, 6)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            get_compressor('lz4')
+
+    @unittest.skipIf(zstandard is not None, 'zstandard is installed')
+    def test_zstd_not_installed(self):
+        with self.assertRaises(ImportError):
+            get_compressor('zstd')
+
+
+class TestStreamDecompression(unittest.TestCase):
+
+    def roundtrip(self, compressor):
+        stream = b''.join(
+            compressor.compress(b'batch %d\n' % index) for index in range(5))
+        decompressor = compressor.decompressor()
+
+        # Feed the stream in chunks that split frames
+        output = b''.join(
+            decompressor.decompress(stream[start:start + 7])
+            for start in range(0, len(stream), 7))
+
+        self.assertEqual(
+            output, b''.join(b'batch %d\n' % index for index in range(5)))
+
+    def test_gzip(self):
+        compressor = GzipCompressor()
+        self.roundtrip(compressor)
+
+        # Concatenated members are a regular gzip stream
+        stream = compressor.compress(b'a\n') + compressor.compress(b'b\n')
+        self.assertEqual(gzip.decompress(stream), b'a\nb\n')
+
+    def test_gzip_is_deterministic(self):
+        compressor = GzipCompressor()
+
+        self.assertEqual(compressor.compress(b'a\n'), compressor.compress(b'a\n'))
+        # Header mtime
+        self.assertEqual(compressor.compress(b'a\n')[4:8], b'\0\0\0\0')
+
+    @unittest.skipIf(zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        self.roundtrip(ZstdCompressor())
+
+
+class TestCompressedDelivery(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.sink = TCPSink()
+        self.addCleanup(self.sink.stop)
+
+        self.relay = TCPCollector(
+            ('127.0.0.1', 0),
+            LogstashSink(self.sink.host, self.sink.port),
+            compression='gzip'
+        )
+        thread = threading.Thread(
+            target=self.relay.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.relay.server_close)
+        self.addCleanup(self.relay.shutdown)
+
+        host, port = self.relay.server_address
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_url(host)
+        temlogger.config.set_port(str(port))
+        temlogger.config.set_compression('gzip')
+        temlogger.config.set_compression_level('1')
+        temlogger.config.set_batch_max_records(3)
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_relay_decompresses_batches(self):
+        logger = temlogger.getLogger('compressed')
+        handler = logger.handlers[0]
+        self.addCleanup(handler.close)
+
+        self.assertEqual(handler.compressor.level, 1)
+        for index in range(7):
+            logger.info('message %d', index)
+        temlogger.flush()
+
+        lines = self.sink.wait_for_lines(7)
+        self.assertEqual(
+            [json.loads(line)['message'] for line in lines],
+            ['message %d' % index for index in range(7)])
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import threading
+import unittest
+
+import temlogger
+
+from .base import clean_temlogger_config
+from .base import make_record
+from .. import context
+from ..providers.logstash import LogstashFormatter
+
+
+class TestBind(unittest.TestCase):
+
+    def test_fields_are_bound_inside_the_block(self):
+        self.assertIsNone(context.get_fields())
+
+        with temlogger.context.bind(tracker_id='abc'):
+            self.assertEqual(context.get_fields(), {'tracker_id': 'abc'})
+
+        self.assertIsNone(context.get_fields())
+
+    def test_nested_blocks(self):
+        with context.bind(tracker_id='abc', user_id=1):
+            with context.bind(user_id=2, trip_id=3):
+                self.assertEqual(context.get_fields(), {
+                    'tracker_id': 'abc', 'user_id': 2, 'trip_id': 3})
+
+            self.assertEqual(
+                context.get_fields(), {'tracker_id': 'abc', 'user_id': 1})
+
+    def test_fields_are_unbound_on_error(self):
+        with self.assertRaises(KeyError):
+            with context.bind(tracker_id='abc'):
+                raise KeyError()
+
+        self.assertIsNone(context.get_fields())
+
+    def test_reserved_fields_are_rejected(self):
+        with self.assertRaises(ValueError):
+            with context.bind(message='replaced'):
+                pass
+
+    def test_new_threads_start_without_fields(self):
+        seen = []
+        thread = threading.Thread(
+            target=lambda: seen.append(context.get_fields()))
+
+        with context.bind(tracker_id='abc'):
+            thread.start()
+            thread.join()
+
+        self.assertEqual(seen, [None])
+
+    def test_threads_are_isolated(self):
+        seen = {}
+        bound = threading.Barrier(2)
+
+        def log(name):
+            with context.bind(tracker_id=name):
+                bound.wait(5)
+                seen[name] = context.get_fields()['tracker_id']
+
+        threads = [threading.Thread(target=log, args=(name,))
+                   for name in ('first', 'second')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(seen, {'first': 'first', 'second': 'second'})
+
+    @unittest.skipIf(context.ContextVar is None, 'contextvars is 3.7+')
+    def test_asyncio_tasks_are_isolated(self):
+        async def handle(name):
+            with context.bind(request=name):
+                # Let the other task bind its own fields meanwhile
+                await asyncio.sleep(0.01)
+                return context.get_fields()
+
+        async def main():
+            with context.bind(tracker_id='abc'):
+                first = asyncio.ensure_future(handle('first'))
+                second = asyncio.ensure_future(handle('second'))
+            return await asyncio.gather(first, second)
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        first, second = loop.run_until_complete(main())
+
+        # Tasks keep the fields bound where they were created
+        self.assertEqual(first, {'tracker_id': 'abc', 'request': 'first'})
+        self.assertEqual(second, {'tracker_id': 'abc', 'request': 'second'})
+
+
+class TestFormatters(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.formatter = LogstashFormatter(app_name='app')
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_fields_are_merged(self):
+        with context.bind(tracker_id='abc'):
+            message = self.formatter.get_message(make_record('inside'))
+
+        self.assertEqual(message['tracker_id'], 'abc')
+        self.assertEqual(message['message'], 'inside')
+        self.assertEqual(message['app_name'], 'app')
+
+        message = self.formatter.get_message(make_record('outside'))
+        self.assertNotIn('tracker_id', message)
+
+    def test_fields_are_serialized(self):
+        with context.bind(tracker_id='abc'):
+            message = json.loads(self.formatter.format(make_record('inside')))
+
+        self.assertEqual(message['tracker_id'], 'abc')
+        self.assertEqual(message['app_name'], 'app')
+
+    def test_event_handlers_see_fields(self):
+        def add_tracker_path(message):
+            message['tracker_path'] = '/%s' % message['tracker_id']
+            return message
+
+        formatter = LogstashFormatter(event_handlers=[add_tracker_path])
+        with context.bind(tracker_id='abc'):
+            message = formatter.get_message(make_record('inside'))
+
+        self.assertEqual(message['tracker_path'], '/abc')
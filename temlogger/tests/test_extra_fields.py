@@ -0,0 +1,92 @@
+import collections
+import datetime
+import decimal
+import enum
+import json
+import logging
+import unittest
+import uuid
+
+from logstash.formatter import LogstashFormatterBase
+
+import temlogger
+
+from .base import clean_temlogger_config
+from .. import extra_fields
+from ..extra_fields import get_extra_fields
+from ..extra_fields import register_value_converter
+from ..providers.logstash import LogstashFormatter
+
+
+class Color(enum.IntEnum):
+    RED = 1
+
+
+def make_record(**extra):
+    logger = logging.getLogger('extra-fields')
+    return logger.makeRecord(
+        logger.name, logging.INFO, __file__, 1, 'message', None, None,
+        extra=extra)
+
+
+class TestGetExtraFields(unittest.TestCase):
+
+    def tearDown(self):
+        extra_fields._registered.clear()
+        extra_fields._resolved.clear()
+
+    def test_matches_python3_logstash(self):
+        record = make_record(
+            text='value', flag=True, number=1, ratio=0.5, nothing=None,
+            items=[1, 2], mapping={'a': 1}, ordered=collections.OrderedDict(a=1),
+            color=Color.RED, when=datetime.datetime(2020, 3, 6),
+            amount=decimal.Decimal('1.5'), pair=(1, 2),
+        )
+
+        self.assertEqual(
+            get_extra_fields(record),
+            LogstashFormatterBase().get_extra_fields(record))
+
+    def test_keep_subclasses_of_passthrough_types(self):
+        fields = get_extra_fields(make_record(color=Color.RED))
+
+        self.assertIs(fields['color'], Color.RED)
+
+    def test_registered_converter(self):
+        identifier = uuid.UUID('12345678123456781234567812345678')
+        register_value_converter(uuid.UUID, str)
+        register_value_converter(datetime.date, lambda value: value.isoformat())
+
+        fields = get_extra_fields(make_record(
+            id_=identifier, when=datetime.datetime(2020, 3, 6, 21, 29)))
+
+        self.assertEqual(fields['id_'], '12345678-1234-5678-1234-567812345678')
+        self.assertEqual(fields['when'], '2020-03-06T21:29:00')
+
+    def test_namespace(self):
+        record = make_record(fields={'user_id': 42, 'pair': (1, 2)}, other=1)
+
+        self.assertEqual(
+            get_extra_fields(record, 'fields'),
+            {'user_id': 42, 'pair': '(1, 2)'})
+
+    def test_namespace_missing(self):
+        self.assertEqual(get_extra_fields(make_record(other=1), 'fields'), {})
+
+
+class TestExtraNamespaceSetting(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_formatter_uses_configured_namespace(self):
+        temlogger.config.set_extra_namespace('fields')
+
+        formatter = LogstashFormatter()
+        message = json.loads(formatter.format(
+            make_record(fields={'user_id': 42}, other=1)))
+
+        self.assertEqual(message['payload'], {'user_id': 42})
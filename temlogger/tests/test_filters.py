@@ -0,0 +1,205 @@
+import logging
+import unittest
+
+from unittest import mock
+
+import temlogger
+
+from .base import clean_temlogger_config
+from ..filters import RateLimitFilter
+from ..handlers.base import close_handlers
+from ..handlers.base import tracked_handlers
+from ..temlogger import config
+from ..temlogger import parse_sample_rates
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_record(msg='Hot loop warning %s', name='rate-limit', level=logging.WARNING):
+    return logging.makeLogRecord({
+        'msg': msg, 'args': (1,), 'name': name,
+        'levelno': level, 'levelname': logging.getLevelName(level),
+    })
+
+
+class TestRateLimitFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.handler = ListHandler()
+
+    def add_filter(self, **kwargs):
+        kwargs.setdefault('clock', self.clock)
+        rate_limit = RateLimitFilter(self.handler, **kwargs)
+        self.handler.addFilter(rate_limit)
+        return rate_limit
+
+    def test_burst_then_rate(self):
+        self.add_filter(rate=2, burst=3)
+
+        for _ in range(10):
+            self.handler.handle(make_record())
+        self.assertEqual(len(self.handler.records), 3)
+
+        self.clock.now = 1.0
+        for _ in range(10):
+            self.handler.handle(make_record())
+        self.assertEqual(len(self.handler.records), 5)
+
+    def test_buckets_per_logger_and_template(self):
+        self.add_filter(rate=1)
+
+        self.handler.handle(make_record())
+        self.handler.handle(make_record())
+        self.handler.handle(make_record(msg='Other template'))
+        self.handler.handle(make_record(name='other-logger'))
+
+        self.assertEqual(len(self.handler.records), 3)
+
+    def test_summary_of_suppressed_records(self):
+        rate_limit = self.add_filter(rate=1, summary_interval=10)
+
+        for _ in range(5):
+            self.handler.handle(make_record())
+
+        self.clock.now = 10.0
+        self.handler.handle(make_record(msg='After interval %s'))
+
+        messages = [record.getMessage() for record in self.handler.records]
+        summary = self.handler.records[1]
+
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(summary.levelno, logging.WARNING)
+        self.assertEqual(summary.suppressed_count, 4)
+        self.assertEqual(summary.suppressed_template, 'Hot loop warning %s')
+        self.assertIn('Suppressed 4 records', messages[1])
+        self.assertEqual(messages[2], 'After interval 1')
+        self.assertEqual(rate_limit.suppressed, {})
+
+    def test_close_emits_pending_summaries(self):
+        rate_limit = self.add_filter(rate=1, summary_interval=10)
+
+        for _ in range(5):
+            self.handler.handle(make_record())
+        rate_limit.close()
+
+        self.assertEqual(len(self.handler.records), 2)
+        self.assertEqual(self.handler.records[1].suppressed_count, 4)
+        self.assertEqual(rate_limit.suppressed, {})
+
+        rate_limit.close()
+        self.assertEqual(len(self.handler.records), 2)
+
+    def test_sample_rates_per_level(self):
+        values = iter([0.05, 0.5, 0.95])
+        self.add_filter(
+            sample_rates={logging.DEBUG: 0.1}, random=lambda: next(values))
+
+        for _ in range(3):
+            self.handler.handle(make_record(level=logging.DEBUG))
+        self.handler.handle(make_record(level=logging.INFO))
+
+        levels = [record.levelno for record in self.handler.records]
+        self.assertEqual(levels, [logging.DEBUG, logging.INFO])
+
+
+class TestRateLimitConfig(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Clean config between tests
+        """
+        clean_temlogger_config()
+
+    def test_parse_sample_rates(self):
+        self.assertEqual(
+            parse_sample_rates('DEBUG=0.1, info=0.5'),
+            {logging.DEBUG: 0.1, logging.INFO: 0.5})
+
+    def test_filter_not_attached_by_default(self):
+        config.set_provider('console')
+
+        logger = temlogger.getLogger('rate-limit-config-1')
+
+        self.assertEqual(logger.handlers[0].filters, [])
+
+    def test_filter_attached_when_configured(self):
+        config.set_provider('console')
+        config.set_rate_limit(5)
+        config.set_rate_limit_burst(10)
+        config.set_sample_rates('DEBUG=0.1')
+
+        logger = temlogger.getLogger('rate-limit-config-2')
+        rate_limit = logger.handlers[0].filters[0]
+
+        self.assertIsInstance(rate_limit, RateLimitFilter)
+        self.assertEqual(rate_limit.rate, 5)
+        self.assertEqual(rate_limit.burst, 10)
+        self.assertEqual(rate_limit.sample_rates, {logging.DEBUG: 0.1})
+
+    def test_suppressed_records_are_not_formatted(self):
+        config.set_provider('console')
+        config.set_rate_limit(1)
+
+        logger = temlogger.getLogger('rate-limit-config-3')
+        handler = logger.handlers[0]
+
+        with mock.patch.object(handler, 'emit') as emit:
+            for _ in range(5):
+                logger.warning('Hot loop')
+
+        emit.assert_called_once()
+
+    def test_switching_provider_emits_pending_summaries(self):
+        config.set_provider('console')
+        config.set_rate_limit(1)
+
+        logger = temlogger.getLogger('rate-limit-config-4')
+        handler = logger.handlers[0]
+
+        with mock.patch.object(handler, 'emit') as emit:
+            for _ in range(5):
+                logger.warning('Hot loop')
+
+            config.set_provider('default')
+            temlogger.getLogger('rate-limit-config-4')
+
+        summary = emit.call_args[0][0]
+        self.assertEqual(emit.call_count, 2)
+        self.assertEqual(summary.suppressed_count, 4)
+
+    def test_exit_emits_pending_summaries(self):
+        config.set_provider('console')
+        config.set_rate_limit(1)
+
+        logger = temlogger.getLogger('rate-limit-config-5')
+        handler = logger.handlers[0]
+
+        self.assertIn(handler, tracked_handlers())
+
+        with mock.patch.object(handler, 'emit') as emit, \
+                mock.patch('temlogger.handlers.base.tracked_handlers',
+                           return_value=[handler]):
+            for _ in range(5):
+                logger.warning('Hot loop')
+            close_handlers()
+
+        self.assertEqual(emit.call_count, 2)
+        self.assertEqual(emit.call_args[0][0].suppressed_count, 4)
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import unittest
+
+from unittest import mock
+
+import temlogger
+
+from .base import TCPSink
+from .base import clean_temlogger_config
+from ..handlers.base import reinit_handlers_after_fork
+from ..handlers.stackdriver import StackDriverHandler
+from ..handlers.stackdriver import reinit_cloud_logging_handler
+
+CHILDREN = 4
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'os.fork is not available')
+class TestForkSafety(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.sink = TCPSink()
+        self.addCleanup(self.sink.stop)
+
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_url(self.sink.host)
+        temlogger.config.set_port(str(self.sink.port))
+        temlogger.config.set_environment('test')
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def fork_children(self, logger):
+        pids = []
+        for index in range(CHILDREN):
+            pid = os.fork()
+            if pid == 0:
+                status = 0
+                try:
+                    logger.info('child %d', index)
+                    temlogger.flush()
+                except BaseException:
+                    status = 1
+                finally:
+                    os._exit(status)
+            pids.append(pid)
+
+        for pid in pids:
+            _, status = os.waitpid(pid, 0)
+            self.assertTrue(os.WIFEXITED(status))
+            self.assertEqual(os.WEXITSTATUS(status), 0)
+
+    def messages(self, count):
+        lines = self.sink.wait_for_lines(count)
+        return sorted(json.loads(line)['message'] for line in lines)
+
+    def assert_every_child_delivered(self, logger):
+        logger.info('parent')
+        temlogger.flush()
+        self.sink.wait_for_lines(1)
+
+        self.fork_children(logger)
+
+        expected = ['child %d' % index for index in range(CHILDREN)]
+        self.assertEqual(self.messages(CHILDREN + 1), expected + ['parent'])
+        self.assertEqual(self.sink.connections, CHILDREN + 1)
+
+    def test_direct_delivery(self):
+        logger = temlogger.getLogger('fork-direct')
+        self.assert_every_child_delivered(logger)
+
+    def test_queue_delivery(self):
+        temlogger.config.set_delivery_mode('queue')
+        logger = temlogger.getLogger('fork-queue')
+        self.assert_every_child_delivered(logger)
+
+    def test_batched_delivery(self):
+        temlogger.config.set_batch_max_records(100)
+        temlogger.config.set_batch_max_linger_ms(50)
+        logger = temlogger.getLogger('fork-batched')
+        self.assert_every_child_delivered(logger)
+
+    def test_child_does_not_resend_parent_buffer(self):
+        temlogger.config.set_batch_max_records(100)
+        logger = temlogger.getLogger('fork-buffer')
+        logger.info('parent')
+
+        self.fork_children(logger)
+        temlogger.flush()
+
+        expected = ['child %d' % index for index in range(CHILDREN)]
+        self.assertEqual(self.messages(CHILDREN + 1), expected + ['parent'])
+
+    def test_shared_handlers(self):
+        temlogger.config.set_shared_handlers(True)
+        temlogger.getLogger('fork-shared-other')
+        logger = temlogger.getLogger('fork-shared')
+        self.assert_every_child_delivered(logger)
+
+
+class TestReinitHandlersAfterFork(unittest.TestCase):
+
+    def test_calls_after_fork_of_handlers_and_filters(self):
+        handler = mock.Mock()
+        log_filter = mock.Mock()
+        handler.filters = [log_filter]
+
+        with mock.patch(
+                'temlogger.handlers.base.tracked_handlers',
+                return_value=[handler]):
+            reinit_handlers_after_fork()
+
+        handler.after_fork.assert_called_once_with()
+        log_filter.after_fork.assert_called_once_with()
+
+    def test_cloud_logging_handler_gets_new_transport(self):
+        class Transport:
+            def __init__(self, client, name):
+                self.client = client
+                self.name = name
+
+        handler = mock.Mock()
+        inherited = handler.transport = Transport(handler.client, 'python')
+
+        reinit_cloud_logging_handler(handler)
+
+        self.assertIsNot(handler.transport, inherited)
+        self.assertIs(handler.transport.client, handler.client)
+        self.assertEqual(handler.transport.name, handler.name)
+        self.assertIsNone(handler.client._http_internal)
+        self.assertIsNone(handler.client._logging_api)
+
+    def test_stackdriver_handler_gets_new_channels(self):
+        client = mock.Mock(project='project')
+        handler = StackDriverHandler(
+            client, max_batch_records=100, max_linger_ms=60000)
+        self.addCleanup(handler.close)
+        handler.handle(logging.makeLogRecord({'msg': 'parent'}))
+
+        handler.after_fork()
+
+        self.assertIsNone(client._http_internal)
+        self.assertIsNone(client._logging_api)
+        self.assertEqual(handler.get_counters()['pending'], 0)
+        self.assertIsNone(handler._writer)
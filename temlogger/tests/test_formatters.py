@@ -7,6 +7,9 @@ from ..providers.default import DefaultFormatter
 from ..providers.logstash import LogstashFormatter
 from ..providers.stackdriver import StackDriverFormatter
 from ..providers.console import ConsoleFormatter
+from ..providers.base import FormatterBase
+from ..providers.base import FormatterRouter
+from ..serializers import orjson
 
 
 class TestDefaultFormatter(unittest.TestCase):
@@ -183,3 +186,74 @@ class TestConsoleFormatter(unittest.TestCase):
         self.assertEqual(payload['extra_field'], 'Extra Field')
         self.assertEqual(message['message'], log_message)
         self.assertEqual(message['environment'], 'develop')
+
+
+class TestFormatterRouter(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Clean config between tests
+        """
+        clean_temlogger_config()
+
+    def test_route_by_logger_name_and_parents(self):
+        default = StackDriverFormatter(app_name='default')
+        payments = StackDriverFormatter(app_name='payments')
+
+        router = FormatterRouter(default)
+        router.add('payments', payments)
+
+        def app_name_for(name):
+            return router.format(logging.makeLogRecord({'name': name}))['app_name']
+
+        self.assertEqual(app_name_for('payments'), 'payments')
+        self.assertEqual(app_name_for('payments.gateway'), 'payments')
+        self.assertEqual(app_name_for('trips'), 'default')
+
+        router.remove('payments')
+
+        self.assertEqual(app_name_for('payments.gateway'), 'default')
+
+
+class TestStaticEnvelope(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+
+    def make_record(self):
+        record = logging.makeLogRecord({'msg': 'Message "quoted"'})
+        record.extra_field = 'Extra Field'
+        return record
+
+    def test_spliced_message_equals_whole_message(self):
+        for serializer in ['json', 'orjson']:
+            with self.subTest(serializer=serializer):
+                if serializer == 'orjson' and orjson is None:
+                    self.skipTest('orjson is not installed')
+
+                formatter = LogstashFormatter(
+                    app_name='app', environment='develop',
+                    serializer=serializer)
+                record = self.make_record()
+
+                data = formatter.format_json(record)
+                spliced = json.loads(data)
+                whole = FormatterBase.format(formatter, record)
+
+                self.assertEqual(spliced, whole)
+                self.assertEqual(spliced['app_name'], 'app')
+                # Spliced with the separator of the serializer
+                separator = formatter.serializer.item_separator
+                self.assertIn('"app"%s"@timestamp"' % separator, data)
+
+    def test_event_handlers_see_static_fields(self):
+        def rename_app(message):
+            message['app_name'] = message['app_name'] + '-renamed'
+            return message
+
+        formatter = LogstashFormatter(
+            app_name='app', environment='develop', event_handlers=[rename_app])
+        message = json.loads(formatter.format(self.make_record()))
+
+        self.assertEqual(message['app_name'], 'app-renamed')
+        self.assertEqual(message['environment'], 'develop')
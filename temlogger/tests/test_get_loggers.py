@@ -8,6 +8,8 @@ from unittest import mock
 from .base import clean_temlogger_config
 from .base import VALID_GOOGLE_CREDENTIALS
 from ..helpers import encode_file_as_base64
+from ..helpers import load_google_client
+from ..handlers.stackdriver import StackDriverHandler
 
 
 class TestDefaultLogger(unittest.TestCase):
@@ -66,6 +68,25 @@ class TestLogstashLogger(unittest.TestCase):
         self.assertTrue(isinstance(logger, logging.Logger))
         self.assertEqual(logger.logging_provider, 'default')
 
+    def test_switch_logger_keeps_application_handlers_open(self):
+        logger = temlogger.getLogger('switch-logger-2')
+        app_handler = logging.StreamHandler()
+        logger.addHandler(app_handler)
+
+        temlogger.config.set_provider('console')
+        logger = temlogger.getLogger('switch-logger-2')
+        temlogger_handler = logger.handlers[0]
+
+        with mock.patch.object(app_handler, 'close') as app_close, \
+                mock.patch.object(temlogger_handler, 'close') as close:
+            logger.addHandler(app_handler)
+            temlogger.config.set_provider('default')
+            temlogger.getLogger('switch-logger-2')
+
+        app_close.assert_not_called()
+        close.assert_called_once_with()
+        self.assertEqual(logger.handlers, [])
+
     def test_get_logstash_logger_passing_envs_by_environ(self):
         os.environ['TEMLOGGER_PROVIDER'] = 'logstash'
         os.environ['TEMLOGGER_URL'] = 'localhost'
@@ -162,6 +183,162 @@ class TestStackDriverLogger(unittest.TestCase):
         temlogger.config.set_provider('stackdriver')
         temlogger.getLogger('stackdriver-base64')
 
+    @mock.patch("google.cloud.logging.Client")
+    def test_stackdriver_loggers_share_client_and_handler(self, mocked_cls):
+        temlogger.config.set_provider('stackdriver')
+
+        first = temlogger.getLogger('stackdriver-shared-1')
+        second = temlogger.getLogger('stackdriver-shared-2')
+
+        mocked_cls.assert_called_once()
+        self.assertIs(first.handlers[0], second.handlers[0])
+
+    def test_stackdriver_handler_per_credentials(self):
+        valid_cred = encode_file_as_base64(VALID_GOOGLE_CREDENTIALS)
+        temlogger.config.set_provider('stackdriver')
+        temlogger.config.set_google_credentials_base64(valid_cred)
+
+        with mock.patch('temlogger.temlogger.load_google_client',
+                        wraps=load_google_client) as load_client:
+            first = temlogger.getLogger('stackdriver-cred-1')
+            second = temlogger.getLogger('stackdriver-cred-2')
+
+        load_client.assert_called_once()
+        self.assertIs(first.handlers[0], second.handlers[0])
+        self.assertIs(first.handlers[0].transport, second.handlers[0].transport)
+
+    @mock.patch("google.cloud.logging.Client")
+    def test_stackdriver_uses_default_handler_of_environment(self, mocked_cls):
+        temlogger.config.set_provider('stackdriver')
+
+        logger = temlogger.getLogger('stackdriver-default-handler')
+
+        client = mocked_cls.return_value
+        self.assertIs(logger.handlers[0], client.get_default_handler.return_value)
+
+    @mock.patch("google.cloud.logging.Client")
+    def test_stackdriver_batching(self, mocked_cls):
+        temlogger.config.set_provider('stackdriver')
+        temlogger.config.set_stackdriver_batching('true')
+        temlogger.config.set_batch_max_records(50)
+
+        logger = temlogger.getLogger('stackdriver-batching')
+        handler = logger.handlers[0]
+        self.addCleanup(handler.close)
+
+        self.assertIsInstance(handler, StackDriverHandler)
+        self.assertIs(handler.client, mocked_cls.return_value)
+        self.assertEqual(handler.max_batch_records, 50)
+        mocked_cls.return_value.get_default_handler.assert_not_called()
+
+    @mock.patch("google.cloud.logging.Client")
+    def test_stackdriver_shared_handler_keeps_event_handlers_per_logger(self, mocked_cls):
+        def add_first_key(message):
+            message['first_key'] = True
+            return message
+
+        temlogger.config.set_provider('stackdriver')
+
+        first = temlogger.getLogger(
+            'stackdriver-routes-1', event_handlers=[add_first_key])
+        temlogger.getLogger('stackdriver-routes-2')
+        router = first.handlers[0].router
+
+        first_record = logging.makeLogRecord({'name': 'stackdriver-routes-1'})
+        second_record = logging.makeLogRecord({'name': 'stackdriver-routes-2'})
+
+        self.assertTrue(router.format(first_record)['first_key'])
+        self.assertNotIn('first_key', router.format(second_record))
+
+    @mock.patch("google.cloud.logging.Client")
+    def test_switching_provider_keeps_shared_handler_open(self, mocked_cls):
+        temlogger.config.set_provider('stackdriver')
+
+        logger = temlogger.getLogger('stackdriver-switch')
+        handler = logger.handlers[0]
+
+        temlogger.config.set_provider('default')
+        with mock.patch.object(handler, 'close') as close:
+            temlogger.getLogger('stackdriver-switch')
+
+        close.assert_not_called()
+        self.assertNotIn('stackdriver-switch', handler.router.formatters)
+
+
+class TestSharedHandlers(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Clean config between tests
+        """
+        clean_temlogger_config()
+
+    def test_handlers_are_not_shared_by_default(self):
+        temlogger.config.set_provider('console')
+
+        first = temlogger.getLogger('not-shared-1')
+        second = temlogger.getLogger('not-shared-2')
+
+        self.assertIsNot(first.handlers[0], second.handlers[0])
+
+    def test_console_loggers_share_handler(self):
+        temlogger.config.set_provider('console')
+        temlogger.config.set_shared_handlers('true')
+
+        first = temlogger.getLogger('shared-console-1')
+        second = temlogger.getLogger('shared-console-2')
+
+        self.assertIs(first.handlers[0], second.handlers[0])
+
+    def test_logstash_loggers_share_handler_per_configuration(self):
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_shared_handlers(True)
+        temlogger.config.set_url('localhost')
+
+        first = temlogger.getLogger('shared-logstash-1')
+        second = temlogger.getLogger('shared-logstash-2')
+
+        temlogger.config.set_url('127.0.0.1')
+        third = temlogger.getLogger('shared-logstash-3')
+
+        self.assertIs(first.handlers[0], second.handlers[0])
+        self.assertIsNot(first.handlers[0], third.handlers[0])
+
+    def test_shared_queue_handler_formats_with_logger_event_handlers(self):
+        def add_first_key(message):
+            message['first_key'] = True
+            return message
+
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_shared_handlers(True)
+        temlogger.config.set_delivery_mode('queue')
+
+        first = temlogger.getLogger(
+            'shared-queue-1', event_handlers=[add_first_key])
+        second = temlogger.getLogger('shared-queue-2')
+        handler = first.handlers[0]
+
+        self.assertIs(handler, second.handlers[0])
+        self.assertIs(handler.target.formatter, handler.router)
+
+        record = logging.makeLogRecord({'name': 'shared-queue-1'})
+        self.assertIn('first_key', handler.router.format(record))
+
+    def test_switching_provider_removes_route_only(self):
+        temlogger.config.set_provider('console')
+        temlogger.config.set_shared_handlers(True)
+
+        first = temlogger.getLogger('shared-switch-1')
+        second = temlogger.getLogger('shared-switch-2')
+        handler = first.handlers[0]
+
+        temlogger.config.set_provider('default')
+        temlogger.getLogger('shared-switch-1')
+
+        self.assertEqual(first.handlers, [])
+        self.assertIs(second.handlers[0], handler)
+        self.assertEqual(list(handler.router.formatters), ['shared-switch-2'])
+
 
 class TestConsoleLogger(unittest.TestCase):
 
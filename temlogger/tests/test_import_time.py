@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def imported_modules(code, **env):
+    """
+    Run `code` in a new interpreter with `-X importtime` and return the
+    names of the modules it imported, with their cumulative import time in
+    microseconds.
+    """
+    environ = dict(os.environ, **env)
+    environ.pop('GOOGLE_APPLICATION_CREDENTIALS', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_ROOT,
+        env=environ,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True
+    )
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+class TestImportTime(unittest.TestCase):
+
+    def assertNotImported(self, modules, *prefixes):
+        imported = [
+            name for name in modules
+            if name.split('.')[0] in prefixes or name.startswith(prefixes)
+        ]
+        self.assertEqual(imported, [])
+
+    def test_import_loads_no_provider_sdk(self):
+        modules = imported_modules(
+            'import temlogger', TEMLOGGER_PROVIDER='console')
+
+        self.assertIn('temlogger', modules)
+        self.assertNotImported(modules, 'google', 'logstash')
+
+    def test_console_logger_loads_no_provider_sdk(self):
+        modules = imported_modules(
+            'import temlogger; temlogger.getLogger("app").info("message")',
+            TEMLOGGER_PROVIDER='console')
+
+        self.assertNotImported(modules, 'google', 'logstash')
+
+    def test_logstash_logger_loads_no_provider_sdk(self):
+        modules = imported_modules(
+            'import temlogger; temlogger.getLogger("app")',
+            TEMLOGGER_PROVIDER='logstash',
+            TEMLOGGER_URL='localhost',
+            TEMLOGGER_PORT='5000')
+
+        self.assertNotImported(modules, 'google')
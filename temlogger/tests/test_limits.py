@@ -0,0 +1,92 @@
+import json
+import logging
+import unittest
+
+import temlogger
+
+from .base import clean_temlogger_config
+from ..limits import PayloadLimits
+from ..providers.logstash import LogstashFormatter
+
+
+def make_message(**payload):
+    return {'message': 'message', 'payload': payload}
+
+
+class TestPayloadLimits(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        self.assertFalse(PayloadLimits())
+
+    def test_max_message_length(self):
+        message = {'message': 'x' * 100, 'payload': {}}
+
+        self.assertTrue(PayloadLimits(max_message_length=10).apply(message))
+        self.assertEqual(message['message'], 'x' * 10 + '...')
+        self.assertTrue(message['truncated'])
+
+    def test_untouched_message_is_not_marked(self):
+        message = make_message(field='value', items=[1, 2])
+
+        self.assertFalse(PayloadLimits(max_list_length=10).apply(message))
+        self.assertNotIn('truncated', message)
+        self.assertEqual(message['payload'], {'field': 'value', 'items': [1, 2]})
+
+    def test_max_field_length(self):
+        message = make_message(response='y' * 100, nested={'body': 'z' * 100})
+        message['stack_trace'] = 'Traceback' * 100
+
+        PayloadLimits(max_field_length=5).apply(message)
+
+        self.assertEqual(message['payload']['response'], 'yyyyy...')
+        self.assertEqual(message['payload']['nested']['body'], 'zzzzz...')
+        self.assertEqual(message['stack_trace'], 'Trace...')
+        self.assertEqual(message['message'], 'message')
+
+    def test_max_payload_depth(self):
+        message = make_message(a={'b': {'c': 1}}, items=[[1]])
+
+        PayloadLimits(max_payload_depth=2).apply(message)
+
+        self.assertEqual(
+            message['payload'], {'a': {'b': '...'}, 'items': ['...']})
+
+    def test_max_list_length(self):
+        message = make_message(
+            items=list(range(100)), mapping=dict.fromkeys(range(100)))
+
+        PayloadLimits(max_list_length=3).apply(message)
+
+        self.assertEqual(message['payload']['items'], [0, 1, 2])
+        self.assertEqual(list(message['payload']['mapping']), [0, 1, 2])
+
+    def test_max_record_bytes(self):
+        response = {'row %d' % index: 'value ' * 100 for index in range(10000)}
+        message = make_message(response=response)
+
+        PayloadLimits(max_record_bytes=2000).apply(message)
+
+        self.assertTrue(message['truncated'])
+        self.assertLess(len(json.dumps(message)), 2200)
+
+
+class TestFormatterLimits(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_configured_limits(self):
+        temlogger.config.set_max_message_length('5')
+        temlogger.config.set_max_list_length('2')
+        formatter = LogstashFormatter()
+        record = logging.makeLogRecord(
+            {'msg': 'long message', 'items': [1, 2, 3]})
+
+        message = json.loads(formatter.format(record))
+
+        self.assertEqual(message['message'], 'long ...')
+        self.assertEqual(message['payload']['items'], [1, 2])
+        self.assertTrue(message['truncated'])
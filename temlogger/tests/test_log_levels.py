@@ -0,0 +1,126 @@
+import logging
+import os
+import unittest
+
+from unittest import mock
+
+import temlogger
+
+from .base import clean_temlogger_config
+from ..temlogger import config
+from ..temlogger import parse_log_levels
+
+
+class TestParseLogLevels(unittest.TestCase):
+
+    def test_parse_string(self):
+        levels = parse_log_levels('payments=DEBUG, urllib3=warning')
+
+        self.assertEqual(
+            levels, {'payments': logging.DEBUG, 'urllib3': logging.WARNING})
+
+    def test_parse_dict(self):
+        levels = parse_log_levels({'payments': 'DEBUG', 'urllib3': logging.ERROR})
+
+        self.assertEqual(
+            levels, {'payments': logging.DEBUG, 'urllib3': logging.ERROR})
+
+    def test_parse_empty(self):
+        self.assertEqual(parse_log_levels(''), {})
+
+
+class TestLogLevelOverrides(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Clean config between tests
+        """
+        clean_temlogger_config()
+
+    def test_get_log_level_for_uses_closest_parent(self):
+        config.set_log_level('WARNING')
+        config.set_log_levels('payments=DEBUG,payments.gateway=ERROR')
+
+        self.assertEqual(config.get_log_level_for('payments'), logging.DEBUG)
+        self.assertEqual(config.get_log_level_for('payments.api'), logging.DEBUG)
+        self.assertEqual(
+            config.get_log_level_for('payments.gateway.stripe'), logging.ERROR)
+        self.assertEqual(config.get_log_level_for('trips'), logging.WARNING)
+
+    def test_logger_level_from_environment(self):
+        os.environ['TEMLOGGER_LOG_LEVELS'] = 'levels-env=DEBUG'
+        config.reload()
+
+        logger = temlogger.getLogger('levels-env.child')
+
+        self.assertEqual(logger.level, logging.DEBUG)
+
+    def test_third_party_logger_level_is_applied(self):
+        config.set_log_levels({'levels-third-party': 'ERROR'})
+
+        third_party = logging.getLogger('levels-third-party')
+
+        self.assertEqual(third_party.level, logging.ERROR)
+
+    def test_runtime_change_clears_is_enabled_for_cache(self):
+        config.set_provider('console')
+        logger = temlogger.getLogger('levels-runtime')
+
+        self.assertFalse(logger.isEnabledFor(logging.DEBUG))
+
+        config.set_log_levels('levels-runtime=DEBUG')
+
+        self.assertTrue(logger.isEnabledFor(logging.DEBUG))
+
+        config.set_log_level('ERROR')
+        config.set_log_levels('')
+
+        self.assertFalse(logger.isEnabledFor(logging.WARNING))
+
+    def test_other_settings_keep_levels_set_by_application(self):
+        config.set_provider('console')
+        logger = temlogger.getLogger('levels-app')
+        logger.setLevel(logging.DEBUG)
+
+        config.set_app_name('levels-app-name')
+        temlogger.getLogger('levels-app-other')
+
+        self.assertEqual(logger.level, logging.DEBUG)
+
+
+class TestHandlerLogLevel(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Clean config between tests
+        """
+        clean_temlogger_config()
+
+    def test_handler_level_defaults_to_notset(self):
+        config.set_provider('console')
+
+        logger = temlogger.getLogger('handler-level-1')
+
+        self.assertEqual(config.get_handler_log_level(), 'NOTSET')
+        self.assertEqual(logger.handlers[0].level, logging.NOTSET)
+
+    def test_records_below_handler_level_are_not_formatted(self):
+        config.set_provider('console')
+        config.set_log_level('DEBUG')
+        config.set_handler_log_level('WARNING')
+
+        logger = temlogger.getLogger('handler-level-2')
+        handler = logger.handlers[0]
+
+        with mock.patch.object(handler.formatter, 'format') as format_mock:
+            logger.info('Below handler level')
+
+        format_mock.assert_not_called()
+
+    def test_runtime_change_updates_handlers(self):
+        config.set_provider('console')
+
+        logger = temlogger.getLogger('handler-level-3')
+        config.set_handler_log_level('ERROR')
+
+        self.assertEqual(logger.handlers[0].level, logging.ERROR)
@@ -54,6 +54,68 @@ class TestLoggingConfig(unittest.TestCase):
         self.assertEqual(config.get_log_level_parsed(), logging.INFO)
 
         os.environ['TEMLOGGER_LOG_LEVEL'] = 'DEBUG'
+        config.reload()
 
         self.assertEqual(config.get_log_level(), 'DEBUG')
         self.assertEqual(config.get_log_level_parsed(), logging.DEBUG)
+
+    def test_set_delivery_mode_and_get_delivery_mode(self):
+
+        self.assertEqual(config.get_delivery_mode(), 'direct')
+
+        config.set_delivery_mode('QUEUE')
+
+        self.assertEqual(config.get_delivery_mode(), 'queue')
+
+    def test_queue_settings_as_environment(self):
+
+        self.assertEqual(config.get_queue_max_size(), 10000)
+        self.assertEqual(config.get_queue_overflow_policy(), 'block')
+
+        os.environ['TEMLOGGER_QUEUE_MAX_SIZE'] = '50'
+        os.environ['TEMLOGGER_QUEUE_OVERFLOW_POLICY'] = 'drop_newest'
+        config.reload()
+
+        self.assertEqual(config.get_queue_max_size(), 50)
+        self.assertEqual(config.get_queue_overflow_policy(), 'drop_newest')
+
+    def test_environment_is_read_only_on_reload(self):
+
+        self.assertEqual(config.get_app_name(), '')
+
+        os.environ['TEMLOGGER_APP_NAME'] = 'cached-app'
+
+        self.assertEqual(config.get_app_name(), '')
+
+        config.reload()
+
+        self.assertEqual(config.get_app_name(), 'cached-app')
+
+    def test_setters_invalidate_resolved_config(self):
+
+        resolved = config.resolved()
+
+        self.assertIs(config.resolved(), resolved)
+
+        config.set_url('localhost')
+
+        self.assertIsNot(config.resolved(), resolved)
+        self.assertEqual(config.resolved().url, 'localhost')
+
+    def test_resolved_config_is_immutable(self):
+
+        resolved = config.resolved()
+
+        with self.assertRaises(AttributeError):
+            resolved.provider = 'console'
+
+        with self.assertRaises(AttributeError):
+            resolved.unknown = 'value'
+
+    def test_set_serializer_and_get_serializer(self):
+
+        self.assertEqual(config.get_serializer(), 'auto')
+
+        config.set_serializer('JSON')
+
+        self.assertEqual(config.get_serializer(), 'json')
@@ -0,0 +1,267 @@
+import json
+import os
+import socket
+import tempfile
+import unittest
+
+from unittest import mock
+
+import temlogger
+
+from .base import TCPSink
+from .base import clean_temlogger_config
+from .base import make_record
+from ..handlers.logstash import LogstashDatagramHandler
+from ..handlers.logstash import LogstashTCPHandler
+from ..providers.logstash import LogstashFormatter
+
+
+class TestLogstashTCPHandler(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.sink = TCPSink()
+
+    def tearDown(self):
+        self.sink.stop()
+
+    def make_handler(self, **kwargs):
+        # Hold records until the batch fills or is flushed
+        kwargs.setdefault('max_linger_ms', 60000)
+        handler = LogstashTCPHandler(self.sink.host, self.sink.port, **kwargs)
+        handler.setFormatter(LogstashFormatter(environment='test'))
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_send_each_record_by_default(self):
+        handler = self.make_handler()
+
+        with mock.patch.object(handler, 'send', wraps=handler.send) as send:
+            handler.handle(make_record('first'))
+            handler.handle(make_record('second'))
+
+        self.assertEqual(send.call_count, 2)
+        lines = self.sink.wait_for_lines(2)
+        self.assertEqual(
+            [json.loads(line)['message'] for line in lines],
+            ['first', 'second'])
+
+    def test_flush_on_max_batch_records(self):
+        handler = self.make_handler(max_batch_records=3)
+
+        with mock.patch.object(handler, 'send', wraps=handler.send) as send:
+            for index in range(7):
+                handler.handle(make_record('message %d' % index))
+
+            self.assertEqual(send.call_count, 2)
+            self.assertEqual(handler.buffered_records, 1)
+
+        self.assertEqual(len(self.sink.wait_for_lines(6)), 6)
+
+    def test_flush_on_max_batch_bytes(self):
+        handler = self.make_handler(max_batch_records=1000, max_batch_bytes=1)
+
+        with mock.patch.object(handler, 'send', wraps=handler.send) as send:
+            handler.handle(make_record('first'))
+
+        send.assert_called_once()
+        self.assertEqual(handler.buffered_records, 0)
+
+    def test_flush_on_max_linger(self):
+        handler = self.make_handler(max_batch_records=1000, max_linger_ms=20)
+
+        handler.handle(make_record('lingering'))
+        lines = self.sink.wait_for_lines(1)
+
+        self.assertEqual(json.loads(lines[0])['message'], 'lingering')
+
+    def test_close_flushes_buffer(self):
+        handler = self.make_handler(max_batch_records=1000)
+
+        handler.handle(make_record('first'))
+        handler.handle(make_record('second'))
+        self.assertEqual(self.sink.lines(), [])
+
+        handler.close()
+
+        self.assertEqual(len(self.sink.wait_for_lines(2)), 2)
+
+    def test_temlogger_flush(self):
+        handler = self.make_handler(max_batch_records=1000)
+
+        handler.handle(make_record('first'))
+        temlogger.flush()
+
+        self.assertEqual(len(self.sink.wait_for_lines(1)), 1)
+
+
+class TestLogstashLoggerBatching(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+
+    def test_batch_settings_are_passed_to_handler(self):
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_batch_max_bytes(1024)
+        temlogger.config.set_batch_max_records(50)
+        temlogger.config.set_batch_max_linger_ms(200)
+
+        logger = temlogger.getLogger('logstash-batching-1')
+        handler = logger.handlers[0]
+
+        self.assertIsInstance(handler, LogstashTCPHandler)
+        self.assertEqual(handler.max_batch_bytes, 1024)
+        self.assertEqual(handler.max_batch_records, 50)
+        self.assertEqual(handler.max_linger, 0.2)
+
+    def test_batching_lingers_by_default(self):
+        sink = TCPSink()
+        self.addCleanup(sink.stop)
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_url(sink.host)
+        temlogger.config.set_port(str(sink.port))
+        temlogger.config.set_batch_max_records(100)
+
+        logger = temlogger.getLogger('logstash-batching-linger')
+        logger.info('alone')
+
+        self.assertEqual(logger.handlers[0].max_linger, 0.2)
+        # Sent by the linger, well before the batch fills
+        self.assertEqual(len(sink.wait_for_lines(1)), 1)
+
+    def test_unbatched_records_do_not_linger(self):
+        self.assertEqual(temlogger.config.get_batch_max_linger_ms(), 0)
+
+    def test_batching_without_linger_warns(self):
+        with self.assertWarns(RuntimeWarning):
+            handler = LogstashTCPHandler(
+                'localhost', 5000, max_batch_records=100, max_linger_ms=0)
+        handler.close()
+
+
+class UDPSink:
+    """Collect datagrams sent to a local UDP or Unix datagram socket."""
+
+    def __init__(self, family=socket.AF_INET, address=('127.0.0.1', 0)):
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.bind(address)
+        self.sock.settimeout(2)
+        self.address = self.sock.getsockname()
+
+    def receive(self, count):
+        return [self.sock.recv(65536) for _ in range(count)]
+
+    def close(self):
+        self.sock.close()
+
+
+class TestLogstashDatagramHandler(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.sink = UDPSink()
+        self.addCleanup(self.sink.close)
+
+    def make_handler(self, **kwargs):
+        # Hold records until the batch fills or is flushed
+        kwargs.setdefault('max_linger_ms', 60000)
+        host, port = self.sink.address
+        handler = LogstashDatagramHandler(host, port, **kwargs)
+        handler.setFormatter(LogstashFormatter(environment='test'))
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_send_one_datagram_per_record_by_default(self):
+        handler = self.make_handler()
+        handler.handle(make_record('first'))
+        handler.handle(make_record('second'))
+
+        datagrams = self.sink.receive(2)
+        self.assertEqual(
+            [json.loads(datagram)['message'] for datagram in datagrams],
+            ['first', 'second'])
+
+    def test_pack_records_up_to_max_datagram_bytes(self):
+        record_size = len(
+            self.make_handler().makePickle(make_record('message 0')))
+        handler = self.make_handler(
+            max_datagram_bytes=record_size * 3, max_batch_records=100)
+
+        for index in range(7):
+            handler.handle(make_record('message %d' % index))
+        handler.flush()
+
+        datagrams = self.sink.receive(3)
+        self.assertEqual(
+            [datagram.count(b'\n') for datagram in datagrams], [3, 3, 1])
+        self.assertTrue(
+            all(len(datagram) <= record_size * 3 for datagram in datagrams))
+
+    def test_truncate_oversized_message(self):
+        handler = self.make_handler(max_datagram_bytes=400)
+        handler.handle(make_record('x' * 1000 + '"' * 100))
+
+        datagram = self.sink.receive(1)[0]
+        message = json.loads(datagram)['message']
+        self.assertLessEqual(len(datagram), 400)
+        self.assertTrue(message.endswith('...'))
+        self.assertEqual(
+            handler.get_counters(), {'truncated': 1, 'dropped': 0})
+
+    def test_drop_record_that_cannot_fit(self):
+        handler = self.make_handler(max_datagram_bytes=10)
+        handler.handle(make_record('message'))
+
+        self.assertEqual(
+            handler.get_counters(), {'truncated': 0, 'dropped': 1})
+
+    def test_count_dropped_on_send_error(self):
+        handler = self.make_handler(max_batch_records=2)
+        handler.handle(make_record('first'))
+        handler.handle(make_record('second'))
+        handler.handle(make_record('third'))
+
+        handler.sock = mock.Mock()
+        handler.sock.sendto.side_effect = BlockingIOError
+        handler.handle(make_record('fourth'))
+
+        self.assertEqual(handler.dropped, 2)
+
+    def test_unix_datagram_socket(self):
+        directory = tempfile.mkdtemp()
+        address = os.path.join(directory, 'logstash.sock')
+        sink = UDPSink(socket.AF_UNIX, address)
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(os.unlink, address)
+        self.addCleanup(sink.close)
+
+        handler = LogstashDatagramHandler(address, None)
+        handler.setFormatter(LogstashFormatter(environment='test'))
+        self.addCleanup(handler.close)
+        handler.handle(make_record('over unix'))
+
+        self.assertEqual(json.loads(sink.receive(1)[0])['message'], 'over unix')
+
+    def test_unix_socket_without_listener_drops(self):
+        handler = LogstashDatagramHandler('/nonexistent/logstash.sock', None)
+        handler.setFormatter(LogstashFormatter(environment='test'))
+        self.addCleanup(handler.close)
+        handler.handle(make_record('lost'))
+
+        self.assertEqual(handler.dropped, 1)
+
+    def test_transport_setting_selects_datagram_handler(self):
+        host, port = self.sink.address
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_url(host)
+        temlogger.config.set_port(str(port))
+        temlogger.config.set_transport('udp')
+        self.addCleanup(clean_temlogger_config)
+
+        logger = temlogger.getLogger('datagram-transport')
+        self.addCleanup(logger.handlers[0].close)
+        logger.info('over udp')
+
+        self.assertIsInstance(logger.handlers[0], LogstashDatagramHandler)
+        self.assertEqual(
+            json.loads(self.sink.receive(1)[0])['message'], 'over udp')
@@ -0,0 +1,178 @@
+import threading
+import unittest
+
+import temlogger
+
+from .base import TCPSink
+from .base import clean_temlogger_config
+from .base import make_record
+from .test_queued_handler import BlockingHandler
+from .. import metrics
+from ..handlers.logstash import LogstashTCPHandler
+from ..handlers.queued import QueuedHandler
+from ..providers.logstash import LogstashFormatter
+from ..temlogger import OverflowPolicy
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_counters_of_threads_are_added_up(self):
+        def count():
+            metrics.increment('logstash', metrics.RECORDS, 2)
+
+        threads = [threading.Thread(target=count) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        metrics.increment('logstash', metrics.RECORDS)
+
+        stats = metrics.snapshot()
+
+        self.assertEqual(stats['logstash']['records'], 7)
+        # Slots of exited threads were folded, reading again keeps them
+        self.assertEqual(metrics.snapshot()['logstash']['records'], 7)
+
+    def test_slots_of_exited_threads_are_folded_without_reading(self):
+        def count():
+            metrics.increment('logstash', metrics.RECORDS)
+
+        for _ in range(50):
+            thread = threading.Thread(target=count)
+            thread.start()
+            thread.join()
+
+        # Each new thread folded the slots of the ones before it
+        self.assertLessEqual(len(metrics._slots), 1)
+        self.assertEqual(metrics.snapshot()['logstash']['records'], 50)
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.observe('logstash', metrics.SEND_TIME, 0.0000001)
+        metrics.observe('logstash', metrics.SEND_TIME, 0.003)
+        metrics.observe('logstash', metrics.SEND_TIME, 10)
+
+        histogram = metrics.snapshot()['logstash']['send_time']
+        buckets = dict(histogram['buckets'])
+
+        self.assertEqual(histogram['count'], 3)
+        self.assertAlmostEqual(histogram['sum'], 10.0030001)
+        self.assertEqual(buckets[0.000001], 1)
+        self.assertEqual(buckets[0.0025], 1)
+        self.assertEqual(buckets[0.005], 2)
+        self.assertEqual(buckets[1.0], 2)
+        self.assertEqual(buckets[float('inf')], 3)
+
+    def test_providers_without_values_report_zeros(self):
+        metrics.increment('console', metrics.RECORDS)
+
+        stats = metrics.snapshot()['console']
+
+        self.assertEqual(stats['dropped'], 0)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['format_time']['count'], 0)
+
+    def test_reset(self):
+        metrics.increment('console', metrics.RECORDS)
+        metrics.reset()
+
+        self.assertEqual(metrics.snapshot(), {})
+
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.sink = TCPSink()
+        self.addCleanup(self.sink.stop)
+
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_url(self.sink.host)
+        temlogger.config.set_port(str(self.sink.port))
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_logstash_records(self):
+        logger = temlogger.getLogger('stats-logstash')
+
+        logger.info('first')
+        logger.info('second')
+        temlogger.flush()
+
+        lines = self.sink.wait_for_lines(2)
+
+        stats = temlogger.stats()['logstash']
+        self.assertEqual(stats['records'], 2)
+        self.assertEqual(stats['bytes'], sum(len(line) for line in lines))
+        self.assertEqual(stats['format_time']['count'], 2)
+        self.assertEqual(stats['send_time']['count'], 2)
+        self.assertEqual(stats['event_handler_time']['count'], 0)
+
+    def test_event_handler_time(self):
+        logger = temlogger.getLogger(
+            'stats-event-handlers', event_handlers=[lambda message: message])
+
+        logger.info('first')
+
+        stats = temlogger.stats()['logstash']
+        self.assertEqual(stats['event_handler_time']['count'], 1)
+
+    def test_queue_depth(self):
+        temlogger.config.set_batch_max_records(100)
+        logger = temlogger.getLogger('stats-queue-depth')
+
+        logger.info('first')
+        logger.info('second')
+        self.assertEqual(temlogger.stats()['logstash']['queue_depth'], 2)
+
+        temlogger.flush()
+        self.assertEqual(temlogger.stats()['logstash']['queue_depth'], 0)
+
+    def test_reconnects(self):
+        handler = LogstashTCPHandler(self.sink.host, self.sink.port)
+        handler.setFormatter(LogstashFormatter())
+        self.addCleanup(handler.close)
+
+        handler.handle(make_record('first'))
+        # Connection lost, as after a failed send
+        handler.sock.close()
+        handler.sock = None
+        handler.handle(make_record('second'))
+
+        self.assertEqual(temlogger.stats()['logstash']['reconnects'], 1)
+
+    def test_failed_direct_sends_are_dropped(self):
+        handler = LogstashTCPHandler(
+            self.sink.host, self.sink.port, max_batch_records=2,
+            max_linger_ms=60000)
+        handler.setFormatter(LogstashFormatter())
+        self.addCleanup(handler.close)
+        self.sink.stop()
+
+        handler.handle(make_record('first'))
+        handler.handle(make_record('second'))
+
+        stats = temlogger.stats()['logstash']
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['send_time']['count'], 0)
+
+    def test_queue_drops(self):
+        target = BlockingHandler()
+        target.provider = 'logstash'
+        handler = QueuedHandler(
+            target, max_size=1, overflow_policy=OverflowPolicy.DROP_NEWEST)
+
+        handler.handle(make_record('first'))
+        target.started.wait(5)
+        handler.handle(make_record('second'))
+        handler.handle(make_record('third'))
+        target.released.set()
+        handler.close()
+
+        self.assertEqual(temlogger.stats()['logstash']['dropped'], 1)
@@ -0,0 +1,104 @@
+import json
+import logging
+import unittest
+
+from unittest import mock
+
+import temlogger
+
+from .base import clean_temlogger_config
+from ..pipeline import EventHandlerPipeline
+from ..providers.logstash import LogstashFormatter
+
+
+def add_request_id(message):
+    message['request_id'] = 'request_id_hex'
+    return message
+
+
+@temlogger.static_event_handler
+def add_tracker_id(message):
+    message['tracker_id'] = 'tracker_id_hex'
+    return message
+
+
+@temlogger.static_event_handler
+def add_service(message):
+    message['service'] = 'trips'
+    return message
+
+
+class TestEventHandlerPipeline(unittest.TestCase):
+
+    def test_empty_pipeline(self):
+        pipeline = EventHandlerPipeline()
+        message = {'message': 'value'}
+
+        self.assertEqual(len(pipeline), 0)
+        self.assertIs(pipeline(message), message)
+
+    def test_static_handler_called_once(self):
+        handler = mock.Mock(return_value={'tracker_id': 'tracker_id_hex'})
+        handler.static = True
+
+        pipeline = EventHandlerPipeline([handler])
+        first = pipeline({'message': 'first'})
+        second = pipeline({'message': 'second'})
+
+        handler.assert_called_once_with({})
+        self.assertEqual(first['tracker_id'], 'tracker_id_hex')
+        self.assertEqual(second['tracker_id'], 'tracker_id_hex')
+
+    def test_consecutive_static_handlers_are_merged(self):
+        pipeline = EventHandlerPipeline([add_tracker_id, add_service, add_request_id])
+
+        self.assertEqual(len(pipeline), 2)
+        self.assertEqual(pipeline({}), {
+            'tracker_id': 'tracker_id_hex',
+            'service': 'trips',
+            'request_id': 'request_id_hex',
+        })
+
+    def test_handler_order_is_preserved(self):
+        def overwrite_tracker_id(message):
+            message['tracker_id'] = 'overwritten'
+            return message
+
+        pipeline = EventHandlerPipeline([overwrite_tracker_id, add_tracker_id])
+        self.assertEqual(pipeline({})['tracker_id'], 'tracker_id_hex')
+
+        pipeline = EventHandlerPipeline([add_tracker_id, overwrite_tracker_id])
+        self.assertEqual(pipeline({})['tracker_id'], 'overwritten')
+
+
+class TestFormatterPipeline(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Clean config between tests
+        """
+        clean_temlogger_config()
+
+    def test_pipeline_is_rebuilt_only_on_setup(self):
+        temlogger.config.setup_event_handlers([add_tracker_id])
+        formatter = LogstashFormatter(event_handlers=[add_request_id])
+
+        pipeline = formatter.get_pipeline()
+        self.assertIs(formatter.get_pipeline(), pipeline)
+        self.assertEqual(
+            pipeline.handlers, (add_tracker_id, add_request_id))
+
+        temlogger.config.setup_event_handlers([])
+
+        self.assertIsNot(formatter.get_pipeline(), pipeline)
+        self.assertEqual(formatter.get_pipeline().handlers, (add_request_id,))
+
+    def test_static_handler_fields_in_formatted_message(self):
+        temlogger.config.setup_event_handlers([add_tracker_id])
+        formatter = LogstashFormatter(event_handlers=[add_service])
+
+        record = logging.makeLogRecord({'msg': 'Static handlers'})
+        message = json.loads(formatter.format(record))
+
+        self.assertEqual(message['tracker_id'], 'tracker_id_hex')
+        self.assertEqual(message['service'], 'trips')
@@ -0,0 +1,142 @@
+import logging
+import time
+import unittest
+import warnings
+
+import temlogger
+
+from .base import clean_temlogger_config
+from ..pipeline import EventHandlerPipeline
+from ..pipeline import static_event_handler
+from ..profiling import EventHandlerProfiler
+from ..profiling import SlowEventHandlerWarning
+from ..profiling import handler_path
+from ..profiling import profiler
+from ..providers.logstash import LogstashFormatter
+
+
+def add_user(message):
+    message['user'] = 'ana'
+    return message
+
+
+def slow_lookup(message):
+    time.sleep(0.005)
+    return message
+
+
+@static_event_handler
+def add_region(message):
+    message['region'] = 'br'
+    return message
+
+
+class AddTracker:
+    def __call__(self, message):
+        message['tracker'] = 1
+        return message
+
+
+class TestEventHandlerProfiler(unittest.TestCase):
+
+    def test_handler_path(self):
+        self.assertEqual(
+            handler_path(add_user), 'temlogger.tests.test_profiling.add_user')
+        self.assertEqual(
+            handler_path(AddTracker()),
+            'temlogger.tests.test_profiling.AddTracker')
+
+    def test_pipeline_times_handlers_called_per_record(self):
+        profiler = EventHandlerProfiler()
+        pipeline = EventHandlerPipeline(
+            [add_user, add_region, slow_lookup], profiler)
+
+        for _ in range(3):
+            message = pipeline({})
+
+        self.assertEqual(message, {'user': 'ana', 'region': 'br'})
+        report = profiler.report()
+        self.assertEqual(
+            [profile['path'] for profile in report],
+            ['temlogger.tests.test_profiling.slow_lookup',
+             'temlogger.tests.test_profiling.add_user'])
+        slowest = report[0]
+        self.assertEqual(slowest['calls'], 3)
+        self.assertGreaterEqual(slowest['p99'], 0.005)
+        self.assertGreaterEqual(slowest['max'], slowest['p99'])
+        self.assertAlmostEqual(slowest['mean'], slowest['total'] / 3)
+
+    def test_report_top(self):
+        profiler = EventHandlerProfiler()
+        EventHandlerPipeline([add_user, slow_lookup], profiler)({})
+
+        self.assertEqual(len(profiler.report(top=1)), 1)
+
+    def test_slow_handler_warns_once(self):
+        profiler = EventHandlerProfiler()
+        pipeline = EventHandlerPipeline(
+            [slow_lookup], profiler, slow_threshold_ms=1)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            pipeline({})
+            pipeline({})
+
+        self.assertEqual(len(caught), 1)
+        self.assertIs(caught[0].category, SlowEventHandlerWarning)
+        self.assertIn('slow_lookup', str(caught[0].message))
+        self.assertEqual(profiler.report()[0]['slow_calls'], 2)
+
+    def test_without_profiler_handlers_are_not_wrapped(self):
+        pipeline = EventHandlerPipeline([add_user])
+
+        self.assertIs(pipeline.steps[0][1], add_user)
+
+
+class TestProfilingConfig(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        profiler.reset()
+        self.addCleanup(profiler.reset)
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def format(self, formatter):
+        formatter.format(logging.makeLogRecord({'msg': 'message'}))
+
+    def test_disabled_by_default(self):
+        self.format(LogstashFormatter(event_handlers=[add_user]))
+
+        self.assertEqual(temlogger.event_handler_stats(), [])
+
+    def test_enabling_rebuilds_existing_pipelines(self):
+        formatter = LogstashFormatter(event_handlers=[add_user])
+        self.format(formatter)
+
+        temlogger.config.set_profile_event_handlers(True)
+        self.format(formatter)
+
+        stats, = temlogger.event_handler_stats()
+        self.assertEqual(stats['path'], 'temlogger.tests.test_profiling.add_user')
+        self.assertEqual(stats['calls'], 1)
+
+    def test_global_handlers_are_profiled(self):
+        temlogger.config.set_profile_event_handlers('true')
+        temlogger.config.setup_event_handlers([
+            'temlogger.tests.test_profiling.add_user'])
+
+        self.format(LogstashFormatter())
+
+        self.assertEqual(temlogger.event_handler_stats()[0]['calls'], 1)
+
+    def test_slow_threshold_can_be_disabled(self):
+        temlogger.config.set_profile_event_handlers(True)
+        temlogger.config.set_slow_event_handler_ms(0)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.format(LogstashFormatter(event_handlers=[slow_lookup]))
+
+        self.assertEqual(caught, [])
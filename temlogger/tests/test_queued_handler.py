@@ -0,0 +1,156 @@
+import logging
+import threading
+import unittest
+
+import temlogger
+
+from .base import clean_temlogger_config
+from .base import make_record
+from ..handlers.queued import QueuedHandler
+from ..temlogger import OverflowPolicy
+
+
+class BlockingHandler(logging.Handler):
+    """Handler that holds the listener thread until `released` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+        self.started = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.started.set()
+        self.released.wait(5)
+        self.messages.append(record.getMessage())
+
+
+class TestQueuedHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.target = BlockingHandler()
+
+    def fill_queue(self, handler):
+        # First record is held by the target, the next two fill the queue
+        handler.handle(make_record('first'))
+        self.target.started.wait(5)
+        handler.handle(make_record('second'))
+        handler.handle(make_record('third'))
+
+    def test_records_are_delivered_on_flush(self):
+        handler = QueuedHandler(self.target, max_size=10)
+        self.target.released.set()
+
+        for index in range(5):
+            handler.handle(make_record('message %d' % index))
+
+        handler.flush()
+
+        self.assertEqual(
+            self.target.messages, ['message %d' % i for i in range(5)])
+        handler.close()
+
+    def test_drop_newest_policy(self):
+        handler = QueuedHandler(
+            self.target, max_size=2,
+            overflow_policy=OverflowPolicy.DROP_NEWEST)
+        self.fill_queue(handler)
+
+        handler.handle(make_record('fourth'))
+        self.target.released.set()
+        handler.close()
+
+        self.assertEqual(handler.dropped_newest, 1)
+        self.assertEqual(handler.dropped_oldest, 0)
+        self.assertEqual(self.target.messages, ['first', 'second', 'third'])
+
+    def test_drop_oldest_policy(self):
+        handler = QueuedHandler(
+            self.target, max_size=2,
+            overflow_policy=OverflowPolicy.DROP_OLDEST)
+        self.fill_queue(handler)
+
+        handler.handle(make_record('fourth'))
+        self.target.released.set()
+        handler.close()
+
+        self.assertEqual(handler.dropped_newest, 0)
+        self.assertEqual(handler.dropped_oldest, 1)
+        self.assertEqual(self.target.messages, ['first', 'third', 'fourth'])
+
+    def test_block_policy(self):
+        handler = QueuedHandler(
+            self.target, max_size=2, overflow_policy=OverflowPolicy.BLOCK)
+        self.fill_queue(handler)
+
+        threading.Timer(0.1, self.target.released.set).start()
+        handler.handle(make_record('fourth'))
+        handler.close()
+
+        self.assertEqual(handler.blocked, 1)
+        self.assertEqual(handler.dropped, 0)
+        self.assertEqual(
+            self.target.messages, ['first', 'second', 'third', 'fourth'])
+
+    def test_close_stops_listener(self):
+        handler = QueuedHandler(self.target, max_size=10)
+        self.target.released.set()
+        handler.close()
+
+        self.assertIsNone(handler.listener._thread)
+
+    def test_records_after_close_are_dropped(self):
+        handler = QueuedHandler(
+            self.target, max_size=2, overflow_policy=OverflowPolicy.BLOCK)
+        self.target.released.set()
+        handler.close()
+
+        # With nothing draining the queue, the third one used to block
+        for index in range(3):
+            handler.handle(make_record('after close %d' % index))
+
+        self.assertEqual(handler.get_counters()['dropped_closed'], 3)
+        self.assertEqual(handler.blocked, 0)
+        self.assertEqual(self.target.messages, [])
+
+
+class TestQueueDeliveryMode(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Clean config between tests
+        """
+        clean_temlogger_config()
+
+    def test_logstash_logger_in_queue_mode(self):
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_delivery_mode('queue')
+        temlogger.config.set_queue_max_size(5)
+        temlogger.config.set_queue_overflow_policy('drop_oldest')
+
+        logger = temlogger.getLogger('queued-logstash-1')
+        handler = logger.handlers[0]
+
+        self.assertIsInstance(handler, QueuedHandler)
+        self.assertEqual(handler.queue.maxsize, 5)
+        self.assertEqual(handler.overflow_policy, 'drop_oldest')
+        handler.close()
+
+    def test_logstash_logger_in_direct_mode(self):
+        temlogger.config.set_provider('logstash')
+
+        logger = temlogger.getLogger('queued-logstash-2')
+
+        self.assertNotIsInstance(logger.handlers[0], QueuedHandler)
+
+    def test_switching_provider_closes_queue_listener(self):
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_delivery_mode('queue')
+
+        logger = temlogger.getLogger('queued-logstash-3')
+        handler = logger.handlers[0]
+
+        temlogger.config.set_provider('default')
+        temlogger.getLogger('queued-logstash-3')
+
+        self.assertIsNone(handler.listener._thread)
@@ -0,0 +1,139 @@
+import datetime
+import json
+import logging
+import sys
+import unittest
+
+from unittest import mock
+
+from .base import clean_temlogger_config
+from ..providers.logstash import LogstashFormatter
+from ..serializers import JsonSerializer
+from ..serializers import OrjsonSerializer
+from ..serializers import UjsonSerializer
+from ..serializers import get_serializer
+from ..serializers import orjson
+from ..serializers import ujson
+from ..temlogger import config
+
+
+MESSAGES = [
+    {'message': 'plain', 'payload': {}},
+    {
+        'message': 'extras',
+        'payload': {
+            'string': 'Ação / ünicode',
+            'boolean': True,
+            'none': None,
+            'float': 1.23,
+            'integer': 123,
+            'list': [1, 2, '3'],
+            'dict': {'a': 1, 'b': {'c': [None]}},
+            1: 'integer key',
+        },
+    },
+    {'message': 'big integer', 'payload': {'value': 2 ** 80}},
+]
+
+
+def available_serializers():
+    serializers = [JsonSerializer()]
+    if orjson is not None:
+        serializers.append(OrjsonSerializer())
+    if ujson is not None:
+        serializers.append(UjsonSerializer())
+    return serializers
+
+
+class TestSerializers(unittest.TestCase):
+
+    def test_same_fields_as_json(self):
+        for serializer in available_serializers():
+            for message in MESSAGES:
+                with self.subTest(serializer=serializer.name, message=message['message']):
+                    serialized = serializer.dumps(message)
+
+                    self.assertIsInstance(serialized, str)
+                    self.assertEqual(
+                        json.loads(serialized), json.loads(json.dumps(message)))
+
+    def test_unsupported_values_raise_like_json(self):
+        message = {'payload': {'when': datetime.datetime(2020, 1, 1)}}
+
+        for serializer in available_serializers():
+            with self.subTest(serializer=serializer.name):
+                with self.assertRaises(TypeError):
+                    serializer.dumps(message)
+
+    def test_non_finite_floats_are_written_like_json(self):
+        message = {
+            'message': 'ratios',
+            'payload': {'ratio': float('nan'), 'limits': [float('inf'), None]},
+        }
+
+        for serializer in available_serializers():
+            with self.subTest(serializer=serializer.name):
+                serialized = serializer.dumps(message)
+
+                self.assertIn('NaN', serialized)
+                self.assertIn('Infinity', serialized)
+
+    def test_get_serializer_by_name(self):
+        self.assertIsInstance(get_serializer('json'), JsonSerializer)
+
+        with self.assertRaises(ValueError):
+            get_serializer('pickle')
+
+    def test_auto_falls_back_to_json(self):
+        with mock.patch('temlogger.serializers.orjson', None), \
+                mock.patch('temlogger.serializers.ujson', None):
+            serializer = get_serializer('auto')
+
+        self.assertEqual(serializer.name, 'json')
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_auto_prefers_orjson(self):
+        self.assertEqual(get_serializer('auto').name, 'orjson')
+
+    def test_unavailable_serializer_raises_import_error(self):
+        with mock.patch('temlogger.serializers.orjson', None):
+            with self.assertRaises(ImportError):
+                get_serializer('orjson')
+
+
+class TestFormatterSerializer(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Clean config between tests
+        """
+        clean_temlogger_config()
+
+    def test_serializer_from_config(self):
+        config.set_serializer('json')
+
+        formatter = LogstashFormatter()
+
+        self.assertEqual(formatter.serializer.name, 'json')
+
+    def test_serializer_as_parameter(self):
+        config.set_serializer('orjson')
+
+        formatter = LogstashFormatter(serializer='json')
+
+        self.assertEqual(formatter.serializer.name, 'json')
+
+    def test_exception_record(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            exc_info = sys.exc_info()
+
+        record = logging.makeLogRecord({'msg': 'failed', 'exc_info': exc_info})
+
+        for serializer in available_serializers():
+            with self.subTest(serializer=serializer.name):
+                formatter = LogstashFormatter(serializer=serializer.name)
+                message = json.loads(formatter.format(record))
+
+                self.assertIn('ValueError: boom', message['stack_trace'])
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import temlogger
+
+from .base import TCPSink
+from .base import clean_temlogger_config
+from .. import metrics
+from ..handlers.logstash import LogstashTCPHandler
+from ..providers.logstash import LogstashFormatter
+from ..spool import DiskSpool
+
+
+def lines(start, stop):
+    return b''.join(b'record %d\n' % index for index in range(start, stop))
+
+
+class TestDiskSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_spool(self, **kwargs):
+        spool = DiskSpool(self.directory, **kwargs)
+        self.addCleanup(spool.close)
+        return spool
+
+    def drain(self, spool, chunk=65536):
+        data = b''
+        while True:
+            chunk_data = spool.peek(chunk)
+            if not chunk_data:
+                return data
+            spool.consume(chunk_data)
+            data += chunk_data
+
+    def test_replay_in_order(self):
+        spool = self.make_spool(segment_bytes=40)
+        for index in range(10):
+            spool.append(lines(index, index + 1))
+
+        self.assertEqual(spool.get_counters()['spool_records'], 10)
+        self.assertEqual(self.drain(spool, chunk=25), lines(0, 10))
+        self.assertTrue(spool.is_empty())
+        self.assertEqual(os.listdir(os.path.join(self.directory, '0')), ['lock'])
+
+    def test_peek_does_not_split_records(self):
+        spool = self.make_spool()
+        spool.append(lines(0, 3))
+
+        self.assertEqual(spool.peek(20), b'record 0\nrecord 1\n')
+        self.assertEqual(spool.peek(3), b'record 0\n')
+
+    def test_drop_oldest_segments_beyond_max_bytes(self):
+        spool = self.make_spool(segment_bytes=20, max_bytes=45)
+        for index in range(10):
+            spool.append(lines(index, index + 1))
+
+        counters = spool.get_counters()
+        self.assertLessEqual(counters['spool_bytes'], 45)
+        self.assertEqual(counters['dropped'] + counters['spool_records'], 10)
+        self.assertEqual(self.drain(spool)[-9:], b'record 9\n')
+
+    def test_drops_are_counted_in_metrics(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        spool = self.make_spool(
+            segment_bytes=20, max_bytes=45, provider='logstash')
+        for index in range(10):
+            spool.append(lines(index, index + 1))
+
+        dropped = spool.get_counters()['dropped']
+        self.assertGreater(dropped, 0)
+        self.assertEqual(metrics.snapshot()['logstash']['dropped'], dropped)
+
+    def test_counters_of_closed_spool(self):
+        spool = self.make_spool()
+        spool.append(lines(0, 2))
+        spool.close()
+
+        counters = spool.get_counters()
+        self.assertEqual(counters['spooled'], 2)
+        self.assertEqual(counters['spool_records'], 0)
+
+    def test_records_survive_reopening(self):
+        spool = self.make_spool()
+        spool.append(lines(0, 3))
+        spool.consume(spool.peek(9))
+        spool.close()
+
+        spool = self.make_spool()
+        self.assertEqual(spool.get_counters()['spool_records'], 3)
+        # Delivery is at least once: the partly replayed segment is resent
+        self.assertEqual(self.drain(spool), lines(0, 3))
+
+    def test_concurrent_spools_use_separate_directories(self):
+        first = self.make_spool()
+        second = self.make_spool()
+        first.append(lines(0, 1))
+        second.append(lines(1, 2))
+
+        self.assertNotEqual(first.directory, second.directory)
+        self.assertEqual(self.drain(first), lines(0, 1))
+        self.assertEqual(self.drain(second), lines(1, 2))
+
+
+class TestLogstashSpool(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.sink = TCPSink()
+        self.port = self.sink.port
+        self.sink.stop()
+
+    def make_handler(self):
+        handler = LogstashTCPHandler(
+            self.sink.host,
+            self.port,
+            spool=DiskSpool(self.directory),
+            spool_retry_ms=20
+        )
+        handler.retryStart = handler.retryMax = 0.01
+        handler.setFormatter(LogstashFormatter(environment='test'))
+        self.addCleanup(handler.close)
+        return handler
+
+    def log(self, handler, start, stop):
+        for index in range(start, stop):
+            handler.handle(logging.makeLogRecord(
+                {'msg': 'message %d' % index, 'levelno': logging.INFO}))
+
+    def messages(self, count):
+        return [
+            json.loads(line)['message']
+            for line in self.sink.wait_for_lines(count)
+        ]
+
+    def test_stats_report_spool_depth(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        handler = self.make_handler()
+        self.log(handler, 0, 3)
+
+        stats = metrics.snapshot([handler])['logstash']
+        self.assertEqual(stats['spool_records'], 3)
+        self.assertEqual(stats['spool_bytes'], handler.spool.size)
+
+    def test_spool_while_down_and_replay_in_order(self):
+        handler = self.make_handler()
+        self.log(handler, 0, 5)
+        self.assertEqual(handler.spool.get_counters()['spool_records'], 5)
+
+        self.sink = TCPSink(port=self.port)
+        self.addCleanup(self.sink.stop)
+        self.log(handler, 5, 7)
+
+        self.assertEqual(
+            self.messages(7), ['message %d' % index for index in range(7)])
+        handler.flush()
+        self.assertTrue(handler.spool.is_empty())
+        self.assertEqual(handler.spool.get_counters()['replayed'], 7)
+
+    def test_replay_records_left_by_a_previous_process(self):
+        handler = self.make_handler()
+        self.log(handler, 0, 3)
+        handler.close()
+
+        self.sink = TCPSink(port=self.port)
+        self.addCleanup(self.sink.stop)
+        handler = self.make_handler()
+        handler.flush()
+
+        self.assertEqual(
+            self.messages(3), ['message %d' % index for index in range(3)])
+
+    def test_spool_dir_setting(self):
+        temlogger.config.set_provider('logstash')
+        temlogger.config.set_url(self.sink.host)
+        temlogger.config.set_port(str(self.port))
+        temlogger.config.set_spool_dir(self.directory)
+        self.addCleanup(clean_temlogger_config)
+
+        logger = temlogger.getLogger('spooled')
+        handler = logger.handlers[0]
+        self.addCleanup(handler.close)
+
+        self.assertEqual(
+            handler.spool.root,
+            os.path.join(self.directory, '%s-%s' % (self.sink.host, self.port)))
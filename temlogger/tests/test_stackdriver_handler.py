@@ -0,0 +1,246 @@
+import logging
+import tempfile
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from .base import clean_temlogger_config
+from ..handlers.stackdriver import StackDriverHandler
+from ..providers.stackdriver import StackDriverFormatter
+from ..spool import DiskSpool
+
+
+def make_record(msg, levelno=logging.INFO):
+    return logging.makeLogRecord({
+        'msg': msg,
+        'levelno': levelno,
+        'levelname': logging.getLevelName(levelno),
+        'created': 1583530176.246123,
+    })
+
+
+class FakeLoggingAPI:
+    """Records `entries.write` calls instead of sending them."""
+
+    def __init__(self):
+        self.calls = []
+        self.available = True
+        self.written = threading.Event()
+
+    def write_entries(self, entries, logger_name=None, resource=None,
+                      labels=None):
+        if not self.available:
+            raise ConnectionError('logging API unavailable')
+
+        self.calls.append({
+            'entries': entries,
+            'logger_name': logger_name,
+            'resource': resource,
+            'labels': labels,
+        })
+        self.written.set()
+
+    def messages(self):
+        return [
+            [entry['jsonPayload']['message'] for entry in call['entries']]
+            for call in self.calls
+        ]
+
+
+class FakeClient:
+    project = 'temlogger-test'
+
+    def __init__(self):
+        self.logging_api = FakeLoggingAPI()
+
+
+class TestStackDriverHandler(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.client = FakeClient()
+        self.api = self.client.logging_api
+
+    def make_handler(self, **kwargs):
+        # Hold records until the batch fills or is flushed
+        kwargs.setdefault('max_linger_ms', 60000)
+        handler = StackDriverHandler(self.client, **kwargs)
+        handler.setFormatter(StackDriverFormatter(environment='test'))
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_entry_payload_is_the_formatted_message(self):
+        handler = self.make_handler(labels={'team': 'payments'})
+
+        handler.handle(make_record('first', logging.WARNING))
+        handler.flush()
+
+        call, = self.api.calls
+        entry, = call['entries']
+        self.assertEqual(call['logger_name'], 'projects/temlogger-test/logs/python')
+        self.assertEqual(call['resource'], {'type': 'global'})
+        self.assertEqual(call['labels'], {'team': 'payments'})
+        self.assertEqual(entry['severity'], 'WARNING')
+        self.assertEqual(entry['timestamp'], '2020-03-06T21:29:36.246123000Z')
+        self.assertEqual(entry['jsonPayload']['message'], 'first')
+        self.assertEqual(entry['jsonPayload']['environment'], 'test')
+        self.assertEqual(entry['jsonPayload']['level'], 'WARNING')
+
+    def test_custom_level_has_default_severity(self):
+        handler = self.make_handler()
+
+        handler.handle(make_record('custom', 25))
+        handler.flush()
+
+        self.assertEqual(self.api.calls[0]['entries'][0]['severity'], 'DEFAULT')
+
+    def test_writes_in_background_on_max_batch_records(self):
+        handler = self.make_handler(max_batch_records=3)
+
+        handler.handle(make_record('first'))
+        handler.handle(make_record('second'))
+        self.assertFalse(self.api.written.wait(0.05))
+
+        handler.handle(make_record('third'))
+
+        self.assertTrue(self.api.written.wait(2))
+        self.assertEqual(self.api.messages(), [['first', 'second', 'third']])
+
+    def test_writes_in_background_on_max_batch_bytes(self):
+        handler = self.make_handler(max_batch_records=100, max_batch_bytes=1)
+
+        handler.handle(make_record('first'))
+
+        self.assertTrue(self.api.written.wait(2))
+
+    def test_writes_in_background_after_max_linger(self):
+        handler = self.make_handler(max_batch_records=100, max_linger_ms=20)
+
+        handler.handle(make_record('first'))
+
+        self.assertTrue(self.api.written.wait(2))
+        self.assertEqual(self.api.messages(), [['first']])
+
+    def test_flush_writes_pending_entries(self):
+        handler = self.make_handler(max_batch_records=100)
+
+        for index in range(5):
+            handler.handle(make_record('message %d' % index))
+        self.assertEqual(self.api.calls, [])
+        handler.flush()
+
+        self.assertEqual(
+            self.api.messages(),
+            [['message %d' % index for index in range(5)]])
+        self.assertEqual(handler.get_counters()['written'], 5)
+
+    def test_requests_stay_below_the_api_limit(self):
+        handler = self.make_handler(max_batch_records=100)
+
+        for index in range(5):
+            handler.handle(make_record('message %d' % index))
+        size = handler.pending[0][1]
+        with mock.patch(
+                'temlogger.handlers.stackdriver.MAX_REQUEST_BYTES', size * 2):
+            handler.flush()
+
+        self.assertEqual([len(call) for call in self.api.messages()], [2, 2, 1])
+
+    def test_drops_records_beyond_max_pending_records(self):
+        handler = self.make_handler(max_batch_records=100, max_pending_records=2)
+
+        for index in range(3):
+            handler.handle(make_record('message %d' % index))
+        handler.flush()
+
+        self.assertEqual(self.api.messages(), [['message 0', 'message 1']])
+        self.assertEqual(handler.get_counters()['dropped'], 1)
+
+    def test_drops_batches_that_cant_be_written_without_spool(self):
+        handler = self.make_handler(max_batch_records=100)
+        self.api.available = False
+
+        handler.handle(make_record('lost'))
+        handler.flush()
+
+        self.assertEqual(handler.get_counters()['dropped'], 1)
+
+    def test_close_writes_pending_entries(self):
+        handler = self.make_handler(max_batch_records=100)
+
+        handler.handle(make_record('first'))
+        handler.close()
+
+        self.assertEqual(self.api.messages(), [['first']])
+
+
+class TestStackDriverHandlerSpool(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.client = FakeClient()
+        self.api = self.client.logging_api
+
+    def make_handler(self, spool_retry_ms=60000, **kwargs):
+        handler = StackDriverHandler(
+            self.client,
+            max_batch_records=100,
+            max_linger_ms=60000,
+            spool=DiskSpool(self.directory.name),
+            spool_retry_ms=spool_retry_ms,
+            **kwargs
+        )
+        handler.setFormatter(StackDriverFormatter(environment='test'))
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_failed_batches_are_spooled_and_replayed_in_order(self):
+        handler = self.make_handler()
+        self.api.available = False
+
+        handler.handle(make_record('first'))
+        handler.flush()
+        handler.handle(make_record('second'))
+        handler.flush()
+        self.assertEqual(handler.spool.get_counters()['spool_records'], 2)
+
+        self.api.available = True
+        handler.handle(make_record('third'))
+        handler.flush()
+
+        self.assertEqual(self.api.messages(), [['first', 'second'], ['third']])
+        self.assertEqual(handler.spool.get_counters()['spool_records'], 0)
+        self.assertEqual(handler.get_counters()['dropped'], 0)
+
+    def test_writer_thread_retries_the_spool(self):
+        handler = self.make_handler(spool_retry_ms=10)
+        self.api.available = False
+
+        handler.handle(make_record('first'))
+        handler.flush()
+        self.api.available = True
+        handler.handle(make_record('second'))
+
+        deadline = time.monotonic() + 2
+        while not self.api.calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(self.api.messages()[0][0], 'first')
+
+    def test_replays_records_left_by_a_previous_process(self):
+        previous = self.make_handler()
+        self.api.available = False
+        previous.handle(make_record('before restart'))
+        previous.close()
+
+        self.api.available = True
+        handler = self.make_handler()
+        handler.handle(make_record('after restart'))
+        handler.flush()
+
+        self.assertEqual(
+            self.api.messages(), [['before restart'], ['after restart']])
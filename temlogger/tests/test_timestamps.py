@@ -0,0 +1,101 @@
+import random
+import threading
+import unittest
+
+from logstash.formatter import LogstashFormatterBase
+
+import temlogger
+
+from .base import clean_temlogger_config
+from ..providers.logstash import LogstashFormatter
+from ..timestamps import EpochMillisFormatter
+from ..timestamps import Iso8601Formatter
+from ..timestamps import Rfc3339NanosFormatter
+from ..timestamps import get_timestamp_formatter
+
+
+class TestIso8601Formatter(unittest.TestCase):
+
+    def test_matches_python3_logstash(self):
+        formatter = Iso8601Formatter()
+        generator = random.Random(42)
+        timestamps = [0.0, 1583530176.246, 1583530176.9999996, 1583530177.0005]
+        timestamps += [generator.uniform(0, 2 ** 32) for _ in range(1000)]
+
+        for created in timestamps:
+            self.assertEqual(
+                formatter.format(created),
+                LogstashFormatterBase.format_timestamp(created))
+
+    def test_cache_second_prefix(self):
+        formatter = Iso8601Formatter()
+
+        self.assertEqual(formatter.format(1583530176.246), '2020-03-06T21:29:36.246Z')
+        self.assertEqual(formatter.cache, (1583530176, '2020-03-06T21:29:36'))
+        self.assertEqual(formatter.format(1583530176.5), '2020-03-06T21:29:36.500Z')
+        self.assertEqual(formatter.format(1583530177.001), '2020-03-06T21:29:37.001Z')
+
+    def test_concurrent_seconds(self):
+        formatter = Iso8601Formatter()
+        errors = []
+
+        def format_second(seconds):
+            for _ in range(2000):
+                created = seconds + 0.25
+                if formatter.format(created) != \
+                        LogstashFormatterBase.format_timestamp(created):
+                    errors.append(created)
+
+        threads = [
+            threading.Thread(target=format_second, args=(1583530176 + i,))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+
+class TestAlternateFormats(unittest.TestCase):
+
+    def test_epoch_millis(self):
+        formatter = EpochMillisFormatter()
+
+        self.assertEqual(formatter.format(1583530176.246), 1583530176246)
+        self.assertEqual(formatter.format(1583530176.9999996), 1583530177000)
+
+    def test_rfc3339_nanos(self):
+        formatter = Rfc3339NanosFormatter()
+
+        self.assertEqual(
+            formatter.format(1583530176.246123),
+            '2020-03-06T21:29:36.246123000Z')
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            get_timestamp_formatter('rfc822')
+
+
+class TestTimestampFormatSetting(unittest.TestCase):
+
+    def setUp(self):
+        clean_temlogger_config()
+
+    def tearDown(self):
+        clean_temlogger_config()
+
+    def test_formatter_uses_configured_format(self):
+        temlogger.config.set_timestamp_format('epoch_millis')
+
+        formatter = LogstashFormatter()
+
+        self.assertEqual(formatter.format_timestamp(1583530176.246), 1583530176246)
+
+    def test_explicit_format_wins(self):
+        temlogger.config.set_timestamp_format('epoch_millis')
+
+        formatter = LogstashFormatter(timestamp_format='rfc3339_nanos')
+
+        self.assertIsInstance(formatter.timestamp_formatter, Rfc3339NanosFormatter)
@@ -0,0 +1,87 @@
+import math
+import time
+
+
+class TimestampFormat:
+    ISO8601 = 'iso8601'
+    EPOCH_MILLIS = 'epoch_millis'
+    RFC3339_NANOS = 'rfc3339_nanos'
+
+
+def split_timestamp(created):
+    """
+    Split `created` into whole seconds and microseconds, rounding like
+    `datetime.utcfromtimestamp` so output matches python3-logstash.
+    """
+    fraction, seconds = math.modf(created)
+    microseconds = round(fraction * 1e6)
+    if microseconds >= 1000000:
+        seconds += 1
+        microseconds -= 1000000
+    elif microseconds < 0:
+        seconds -= 1
+        microseconds += 1000000
+    return int(seconds), microseconds
+
+
+class Iso8601Formatter:
+    """
+    `2020-03-06T21:29:36.246Z`, as python3-logstash formats it. The date and
+    time up to the second are formatted once per second and cached, so
+    records logged within the same second only format their milliseconds.
+    """
+    name = TimestampFormat.ISO8601
+
+    def __init__(self):
+        # (second, prefix) in one attribute, so threads never see a prefix
+        # that belongs to another second
+        self.cache = (None, '')
+
+    def get_prefix(self, seconds):
+        cached_seconds, prefix = self.cache
+        if cached_seconds != seconds:
+            prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))
+            self.cache = (seconds, prefix)
+        return prefix
+
+    def format(self, created):
+        seconds, microseconds = split_timestamp(created)
+        return '%s.%03dZ' % (self.get_prefix(seconds), microseconds // 1000)
+
+
+class Rfc3339NanosFormatter(Iso8601Formatter):
+    """
+    `2020-03-06T21:29:36.246123000Z`. Records carry microsecond precision,
+    the remaining digits are zeros.
+    """
+    name = TimestampFormat.RFC3339_NANOS
+
+    def format(self, created):
+        seconds, microseconds = split_timestamp(created)
+        return '%s.%06d000Z' % (self.get_prefix(seconds), microseconds)
+
+
+class EpochMillisFormatter:
+    """Milliseconds since the epoch, as an integer."""
+    name = TimestampFormat.EPOCH_MILLIS
+
+    def format(self, created):
+        seconds, microseconds = split_timestamp(created)
+        return seconds * 1000 + microseconds // 1000
+
+
+TIMESTAMP_FORMATTERS = {
+    TimestampFormat.ISO8601: Iso8601Formatter,
+    TimestampFormat.EPOCH_MILLIS: EpochMillisFormatter,
+    TimestampFormat.RFC3339_NANOS: Rfc3339NanosFormatter,
+}
+
+
+def get_timestamp_formatter(name=TimestampFormat.ISO8601):
+    """Return a timestamp formatter instance by name."""
+    try:
+        formatter_class = TIMESTAMP_FORMATTERS[name]
+    except KeyError as err:
+        raise ValueError('Unknown timestamp format "%s"' % name) from err
+
+    return formatter_class()